@@ -0,0 +1,88 @@
+"""
+Compact record of one scraped activity
+
+Activities are held by the thousand in bulk loads and backfills, where a
+dictionary per row costs several times the size of the data itself.
+Activity keeps its fields in __slots__ (no per-instance __dict__) and
+interns the category name, so the rows of a category share one string
+however many pages they come from, including after unpickling in the
+backfill's worker processes.
+"""
+
+import sys
+from typing import Dict, Optional
+
+# Columns written for every activity, besides registration_id and activity_key
+# (activities stores category as category_id, see ACTIVITY_COLUMNS)
+ACTIVITY_FIELDS = ('detail_id', 'category', 'class_name', 'schedule', 'cost',
+                   'enrollment_deadline', 'enrollment_opens_at', 'enrollment_closes_at',
+                   'vacancies', 'location', 'instructor')
+
+# ACTIVITY_FIELDS as columns of the activities table
+ACTIVITY_COLUMNS = tuple('category_id' if field == 'category' else field for field in ACTIVITY_FIELDS)
+
+# Fields filled from the details page (see FEFActivityScraper.fetch_details)
+DETAIL_FIELDS = ('vacancies', 'location', 'instructor')
+
+
+class Activity:
+    """One class of the listing; ``id`` is the activities row ID once stored"""
+
+    __slots__ = ACTIVITY_FIELDS + ('id',)
+
+    def __init__(self, category: str, class_name: str, schedule: str, cost, enrollment_deadline: str,
+                 enrollment_opens_at=None, enrollment_closes_at=None, detail_id: Optional[int] = None,
+                 vacancies: Optional[int] = None, location: Optional[str] = None,
+                 instructor: Optional[str] = None, id: Optional[int] = None):
+        self.category = sys.intern(category)
+        self.class_name = class_name
+        self.schedule = schedule
+        self.cost = cost
+        self.enrollment_deadline = enrollment_deadline
+        self.enrollment_opens_at = enrollment_opens_at
+        self.enrollment_closes_at = enrollment_closes_at
+        self.detail_id = detail_id
+        self.vacancies = vacancies
+        self.location = location
+        self.instructor = instructor
+        self.id = id
+
+    @classmethod
+    def from_values(cls, values: tuple, id: Optional[int] = None) -> 'Activity':
+        """Build an activity from values in ACTIVITY_FIELDS order (e.g. a database row)"""
+        return cls(id=id, **dict(zip(ACTIVITY_FIELDS, values)))
+
+    def values(self) -> tuple:
+        """Values in ACTIVITY_FIELDS order"""
+        return tuple(getattr(self, field) for field in ACTIVITY_FIELDS)
+
+    def as_dict(self) -> Dict:
+        """Fields by name, e.g. for JSON"""
+        return dict(zip(ACTIVITY_FIELDS, self.values()))
+
+    def update(self, changes: Dict):
+        """Set several fields at once (e.g. the details of a class)"""
+        for field, value in changes.items():
+            setattr(self, field, sys.intern(value) if field == 'category' else value)
+
+    def replace(self, **changes) -> 'Activity':
+        """Copy with some fields changed"""
+        copy = Activity.from_values(self.values(), self.id)
+        copy.update(changes)
+        return copy
+
+    def __getstate__(self):
+        return self.values() + (self.id,)
+
+    def __setstate__(self, state):
+        for field, value in zip(self.__slots__, state):
+            setattr(self, field, value)
+        self.category = sys.intern(self.category)
+
+    def __eq__(self, other):
+        if not isinstance(other, Activity):
+            return NotImplemented
+        return self.__getstate__() == other.__getstate__()
+
+    def __repr__(self):
+        return f"Activity({self.category!r}, {self.class_name!r}, detail_id={self.detail_id!r})"
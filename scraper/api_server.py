@@ -0,0 +1,428 @@
+"""
+Local JSON API over the scraped activities
+
+Loads the activities table into an in-memory index (by category, weekday
+and price) and serves filtered JSON from a single asyncio event loop, with
+no per-request database access. The index is rebuilt in the background
+when a new successful scrape appears in scraping_history (see query_cache
+for how the data version is detected) and swapped in atomically.
+
+Endpoints:
+    GET /activities   filters: category, weekday (0-6 or Seg..Dom), from/until
+                      (HH:MM, session inside the window), min_cost, max_cost, free=1
+    GET /search       q (accent-insensitive, typo-tolerant name search), limit
+    GET /categories   category names with activity counts
+    GET /health       data version, activity count and load time
+
+Usage:
+    python api_server.py --host 127.0.0.1 --port 8080
+    python api_server.py --from-html ../atividades-fef-example.html   # no MySQL
+"""
+
+import argparse
+import asyncio
+import bisect
+import os
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from mysql.connector import Error
+
+from database import get_connection
+from json_encoding import to_json_bytes
+from query_cache import QueryCache
+from schedules import format_minutes, parse_schedule_sessions, parse_time, parse_weekday
+from search_index import SearchIndex, build_documents
+
+API_HOST = os.getenv('API_HOST', '127.0.0.1')
+API_PORT = int(os.getenv('API_PORT', '8080'))
+
+# Seconds between checks for a new successful scrape
+RELOAD_INTERVAL = float(os.getenv('API_RELOAD_INTERVAL', '10'))
+
+# Value of Access-Control-Allow-Origin (unset: no CORS header)
+CORS_ORIGIN = os.getenv('API_CORS_ORIGIN')
+
+# Encoded responses kept per index version
+RESPONSE_CACHE_SIZE = 1024
+
+MAX_REQUEST_BYTES = 16 * 1024
+
+# Default and maximum number of /search results
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 200
+
+ACTIVITY_COLUMNS = ('id', 'detail_id', 'category', 'class_name', 'schedule', 'cost',
+                    'enrollment_deadline', 'enrollment_opens_at', 'enrollment_closes_at',
+                    'vacancies', 'location', 'instructor')
+
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+
+class BadRequest(ValueError):
+    """Invalid query parameter"""
+
+
+class ActivityIndex:
+    """Immutable in-memory index of activities with pre-encoded JSON rows"""
+
+    def __init__(self, activities: List[Dict], sessions: List[Tuple[int, int, int, int]],
+                 version: Optional[int] = None):
+        """
+        Build the index
+
+        Args:
+            activities: Activity dictionaries with ACTIVITY_COLUMNS keys
+            sessions: Rows (activity_id, weekday, start_minute, end_minute)
+            version: Data version (scrape ID) the activities belong to
+        """
+        self.version = version
+        self.loaded_at = datetime.now().replace(microsecond=0)
+        self.activities = sorted(activities, key=lambda a: (a['category'], a['class_name']))
+        position = {activity['id']: i for i, activity in enumerate(self.activities)}
+
+        self.sessions = [[] for _ in self.activities]
+        for activity_id, weekday, start, end in sessions:
+            i = position.get(activity_id)
+            if i is not None:
+                self.sessions[i].append((weekday, start, end))
+
+        self.by_category = {}
+        self.by_weekday = {}
+        for i, activity in enumerate(self.activities):
+            self.by_category.setdefault(activity['category'], []).append(i)
+            for weekday, _, _ in self.sessions[i]:
+                self.by_weekday.setdefault(weekday, set()).add(i)
+
+        # Positions sorted by cost, for range filters via bisect
+        self.by_cost = sorted(range(len(self.activities)), key=lambda i: self.activities[i]['cost'])
+        self.costs = [self.activities[i]['cost'] for i in self.by_cost]
+
+        self.encoded = []
+        for i, activity in enumerate(self.activities):
+            row = dict(activity)
+            row['sessions'] = [{'weekday': w, 'start': format_minutes(s), 'end': format_minutes(e)}
+                               for w, s, e in self.sessions[i]]
+            self.encoded.append(to_json_bytes(row))
+
+        self.categories = to_json_bytes([{'category': category, 'count': len(ids)}
+                                  for category, ids in sorted(self.by_category.items())])
+        self.search_index = SearchIndex()
+        self.search_index.update(build_documents(
+            (i, activity['category'], activity['class_name']) for i, activity in enumerate(self.activities)),
+            version)
+        self._responses = OrderedDict()
+
+    def __len__(self):
+        return len(self.activities)
+
+    def _cost_range(self, min_cost: Optional[float], max_cost: Optional[float]) -> set:
+        lo = 0 if min_cost is None else bisect.bisect_left(self.costs, min_cost)
+        hi = len(self.costs) if max_cost is None else bisect.bisect_right(self.costs, max_cost)
+        return set(self.by_cost[lo:hi])
+
+    def filter(self, category: str = None, weekday: int = None, start: int = None, end: int = None,
+               min_cost: float = None, max_cost: float = None) -> List[int]:
+        """
+        Positions of the activities matching every given filter, in index order
+
+        A time window (start/end, minutes from midnight) requires a session
+        inside it, on ``weekday`` if given.
+        """
+        candidates = None
+        if category is not None:
+            candidates = set(self.by_category.get(category, ()))
+        if weekday is not None:
+            days = self.by_weekday.get(weekday, set())
+            candidates = set(days) if candidates is None else candidates & days
+        if min_cost is not None or max_cost is not None:
+            priced = self._cost_range(min_cost, max_cost)
+            candidates = priced if candidates is None else candidates & priced
+
+        ids = range(len(self.activities)) if candidates is None else sorted(candidates)
+        if start is None and end is None:
+            return list(ids)
+        start = 0 if start is None else start
+        end = 24 * 60 if end is None else end
+        return [i for i in ids
+                if any((weekday is None or w == weekday) and s >= start and e <= end
+                       for w, s, e in self.sessions[i])]
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT) -> bytes:
+        """Encoded search results, best matches first, each row with its score"""
+        return b'[' + b','.join(
+            self.encoded[i][:-1] + b',"score":' + repr(score).encode('ascii') + b'}'
+            for i, score in self.search_index.search(query, limit)) + b']'
+
+    def response(self, key: tuple, build) -> bytes:
+        """Encoded response for a normalized query, built once per index"""
+        body = self._responses.get(key)
+        if body is None:
+            body = build()
+            self._responses[key] = body
+            if len(self._responses) > RESPONSE_CACHE_SIZE:
+                self._responses.popitem(last=False)
+        return body
+
+
+def load_index_from_database(version: Optional[int] = None) -> ActivityIndex:
+    """
+    Read activities and their sessions from MySQL into a new index
+
+    Raises:
+        mysql.connector.Error: If the queries fail
+    """
+    connection = get_connection()
+    try:
+        columns = ', '.join('c.name' if column == 'category' else f'a.{column}' for column in ACTIVITY_COLUMNS)
+        rows = connection.fetch_all(f"SELECT {columns} FROM activities a JOIN categories c ON c.id = a.category_id")
+        sessions = connection.fetch_all(
+            "SELECT activity_id, weekday, start_minute, end_minute FROM activity_sessions")
+    finally:
+        connection.close()
+    activities = [dict(zip(ACTIVITY_COLUMNS, row)) for row in rows]
+    for activity in activities:
+        activity['cost'] = float(activity['cost'])
+    return ActivityIndex(activities, sessions, version)
+
+
+def load_index_from_html(path: str) -> ActivityIndex:
+    """Build an index straight from a saved listing page (no database needed)"""
+    from fef_scraper import FEFActivityScraper, DB_CONFIG, unwrap_view_source
+
+    with open(path, 'r', encoding='utf-8') as f:
+        html_content = unwrap_view_source(f.read())
+    scraped = FEFActivityScraper(DB_CONFIG, use_cache=False).extract_activities(html_content, verbose=False)
+    activities, sessions = [], []
+    for activity_id, activity in enumerate(scraped, 1):
+        row = dict(activity.as_dict(), id=activity_id)
+        activities.append({column: row[column] for column in ACTIVITY_COLUMNS})
+        sessions.extend((activity_id,) + session for session in parse_schedule_sessions(activity.schedule))
+    return ActivityIndex(activities, sessions)
+
+
+def _parse_cost(params: Dict, name: str) -> Optional[float]:
+    if name not in params:
+        return None
+    try:
+        return float(params[name].replace(',', '.'))
+    except ValueError:
+        raise BadRequest(f"Invalid {name}: {params[name]}")
+
+
+def _parse_search(params: Dict) -> Tuple[str, int]:
+    """Normalize /search query parameters into (query, limit)"""
+    query = params.get('q', '').strip()
+    if not query:
+        raise BadRequest("Missing q")
+    try:
+        limit = int(params.get('limit') or SEARCH_LIMIT)
+    except ValueError:
+        raise BadRequest(f"Invalid limit: {params['limit']}")
+    if not 1 <= limit <= MAX_SEARCH_LIMIT:
+        raise BadRequest(f"limit must be between 1 and {MAX_SEARCH_LIMIT}")
+    return query, limit
+
+
+def _parse_filters(params: Dict) -> Dict:
+    """Normalize /activities query parameters into ActivityIndex.filter arguments"""
+    filters = {'category': params.get('category') or None}
+    if params.get('weekday'):
+        filters['weekday'] = parse_weekday(params['weekday'])
+        if filters['weekday'] is None:
+            raise BadRequest(f"Invalid weekday: {params['weekday']}")
+    for name, key in (('from', 'start'), ('until', 'end')):
+        if params.get(name):
+            filters[key] = parse_time(params[name])
+            if filters[key] is None:
+                raise BadRequest(f"Invalid {name}: {params[name]}")
+    filters['min_cost'] = _parse_cost(params, 'min_cost')
+    filters['max_cost'] = _parse_cost(params, 'max_cost')
+    if params.get('free') in ('1', 'true', 'yes'):
+        filters['min_cost'], filters['max_cost'] = None, 0.0
+    return filters
+
+
+class ActivityAPI:
+    """asyncio HTTP/1.1 server answering from the current ActivityIndex"""
+
+    def __init__(self, index: Optional[ActivityIndex] = None, reload_interval: float = RELOAD_INTERVAL,
+                 hot_reload: bool = True):
+        self.index = index
+        self.reload_interval = reload_interval
+        self.hot_reload = hot_reload
+        self.version_source = QueryCache(version_ttl=0) if hot_reload else None
+        self.requests_served = 0
+
+    # Loading -----------------------------------------------------------
+
+    async def reload_if_changed(self) -> bool:
+        """Rebuild the index in a worker thread if a new successful scrape appeared"""
+        loop = asyncio.get_running_loop()
+        version = await loop.run_in_executor(None, self.version_source.current_version)
+        if self.index is not None and (version is None or version == self.index.version):
+            return False
+        try:
+            index = await loop.run_in_executor(None, load_index_from_database, version)
+        except Error as e:
+            print(f"⚠ Warning: Could not load activities: {e}")
+            return False
+        self.index = index
+        print(f"✓ Loaded {len(index)} activities (data version {version})")
+        return True
+
+    async def _reload_loop(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await self.reload_if_changed()
+
+    # HTTP --------------------------------------------------------------
+
+    def route(self, method: str, target: str, headers: Dict[str, str]) -> Tuple[int, bytes, Optional[str]]:
+        """
+        Answer one request
+
+        Returns:
+            Tuple (status, body, etag)
+        """
+        if method not in ('GET', 'HEAD'):
+            return 405, to_json_bytes({'error': 'Only GET is supported'}), None
+        index = self.index
+        if index is None:
+            return 503, to_json_bytes({'error': 'Activities not loaded yet'}), None
+
+        url = urlsplit(target)
+        params = dict(parse_qsl(url.query))
+        path = url.path.rstrip('/') or '/'
+
+        if path == '/health':
+            return 200, to_json_bytes({'status': 'ok', 'version': index.version, 'activities': len(index),
+                                'loaded_at': index.loaded_at, 'requests': self.requests_served}), None
+
+        if path == '/categories':
+            body = index.categories
+        elif path == '/activities':
+            try:
+                filters = _parse_filters(params)
+            except BadRequest as e:
+                return 400, to_json_bytes({'error': str(e)}), None
+            key = tuple(sorted(filters.items()))
+            body = index.response(key, lambda: b'[' + b','.join(
+                index.encoded[i] for i in index.filter(**filters)) + b']')
+        elif path == '/search':
+            try:
+                query, limit = _parse_search(params)
+            except BadRequest as e:
+                return 400, to_json_bytes({'error': str(e)}), None
+            body = index.response(('search', query.lower(), limit), lambda: index.search(query, limit))
+        else:
+            return 404, to_json_bytes({'error': f"Unknown path: {path}"}), None
+
+        etag = f'"{index.version or 0}-{zlib.crc32(body):08x}"'
+        if headers.get('if-none-match') == etag:
+            return 304, b'', etag
+        return 200, body, etag
+
+    def _encode_response(self, status: int, body: bytes, etag: Optional[str], keep_alive: bool,
+                         head: bool) -> bytes:
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                 "Content-Type: application/json; charset=utf-8",
+                 f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if etag:
+            lines.append(f"ETag: {etag}")
+        if CORS_ORIGIN:
+            lines.append(f"Access-Control-Allow-Origin: {CORS_ORIGIN}")
+        head_bytes = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        return head_bytes if head or status == 304 else head_bytes + body
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one (possibly keep-alive) connection"""
+        try:
+            while True:
+                try:
+                    raw = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(self._encode_response(413, b'', None, False, False))
+                    break
+
+                lines = raw.decode('latin-1').split('\r\n')
+                parts = lines[0].split(' ')
+                if len(parts) != 3:
+                    writer.write(self._encode_response(400, to_json_bytes({'error': 'Malformed request'}),
+                                                       None, False, False))
+                    break
+                method, target, version = parts
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                # Request bodies are not used; skip them to keep the connection in sync
+                length = int(headers.get('content-length') or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                connection_header = headers.get('connection', '').lower()
+                keep_alive = connection_header != 'close' if version == 'HTTP/1.1' \
+                    else connection_header == 'keep-alive'
+
+                status, body, etag = self.route(method, target, headers)
+                self.requests_served += 1
+                writer.write(self._encode_response(status, body, etag, keep_alive, method == 'HEAD'))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = API_HOST, port: int = API_PORT):
+        """Load the index (unless given) and serve until cancelled"""
+        if self.index is None:
+            await self.reload_if_changed()
+        server = await asyncio.start_server(self.handle_connection, host, port,
+                                            limit=MAX_REQUEST_BYTES)
+        reloader = asyncio.ensure_future(self._reload_loop()) if self.hot_reload else None
+        count = len(self.index) if self.index is not None else 0
+        print(f"✓ Serving {count} activities on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if reloader:
+                reloader.cancel()
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="JSON API over the scraped FEF activities")
+    parser.add_argument('--host', default=API_HOST, help="Address to bind (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=API_PORT, help="Port to bind (default: %(default)s)")
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL,
+                        help="Seconds between checks for new scrapes (default: %(default)s)")
+    parser.add_argument('--from-html', metavar='PATH',
+                        help="Serve activities parsed from a saved listing page instead of MySQL")
+    args = parser.parse_args()
+
+    if args.from_html:
+        api = ActivityAPI(load_index_from_html(args.from_html), hot_reload=False)
+    else:
+        api = ActivityAPI(reload_interval=args.reload_interval)
+
+    try:
+        asyncio.run(api.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n✓ API server stopped")
+
+
+if __name__ == "__main__":
+    main()
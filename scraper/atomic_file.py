@@ -0,0 +1,48 @@
+"""
+Atomic file replacement
+
+New content is written to a temporary file next to the target and moved
+into place with os.replace, so readers see the old or the new file, never
+a partial one, and a failed write leaves the old file alone.
+"""
+
+import json
+import os
+import tempfile
+from typing import Optional
+
+
+def write_atomic(path: str, data: bytes, mode: Optional[int] = None):
+    """
+    Replace a file with ``data`` atomically
+
+    Args:
+        path: File to replace (its directory must exist)
+        data: New content
+        mode: Permissions to give the file (default: mkstemp's 0600)
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_text_atomic(path: str, text: str, mode: Optional[int] = None):
+    """Replace a file with UTF-8 text atomically (see write_atomic)"""
+    write_atomic(path, text.encode('utf-8'), mode)
+
+
+def write_json_atomic(path: str, data, indent: Optional[int] = None):
+    """Replace a file with JSON atomically (see write_atomic)"""
+    write_text_atomic(path, json.dumps(data, ensure_ascii=False, indent=indent))
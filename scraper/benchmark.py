@@ -0,0 +1,648 @@
+"""
+Performance benchmarks for the FEF scraper
+
+"writes" measures the database write path with synthetic activities. By
+default the writes go to a TEMPORARY copy of the activities table in the
+configured MySQL database (it shadows the real table for the benchmark's
+session only and disappears when the connection closes); --sqlite uses an
+in-memory SQLite stand-in instead, for machines without MySQL.
+
+"parse" times extract_activities for each parser backend on the example
+page inflated by repeating its listing tables.
+
+"suite" runs the whole parse -> normalize -> save pipeline on the example
+page inflated 1x, 10x and 100x (add 1000 with --scales), timing each stage
+separately and recording its peak memory with tracemalloc (in a second run,
+so tracing does not slow the timed one). The results go to a JSON report;
+with --baseline the run is compared against an earlier report and exits
+with status 1 if any stage got slower than the threshold allows.
+
+"timetable" counts and lists clash-free combinations of the example
+page's classes (see timetable.TimetablePlanner) under typical constraints.
+
+Usage:
+    python benchmark.py writes --sizes 200,20000,200000 --batch-sizes 1,500
+    python benchmark.py writes --sqlite
+    python benchmark.py parse --scales 1,10,100 --backends bs4,lxml
+    python benchmark.py suite --sqlite --output bench.json
+    python benchmark.py suite --sqlite --baseline bench.json --threshold 0.2
+    python benchmark.py timetable
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import sqlite3
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+from activity import Activity
+from fef_scraper import (FEFActivityScraper, DB_CONFIG, BATCH_SIZE, PARSER_BACKEND, PARSER_BACKENDS,
+                         activity_key, unwrap_view_source)
+from schedules import parse_schedule_sessions
+from timetable import Candidate, TimetablePlanner, parse_busy_blocks
+
+EXAMPLE_HTML = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'atividades-fef-example.html')
+
+sqlite3.register_adapter(Decimal, float)
+
+SQLITE_SCHEMA = """
+    CREATE TABLE categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name VARCHAR(255) NOT NULL UNIQUE
+    );
+    CREATE TABLE activities (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        registration_id INTEGER NULL,
+        activity_key VARCHAR(64) NOT NULL UNIQUE,
+        detail_id INTEGER NULL,
+        category_id INTEGER NOT NULL REFERENCES categories (id),
+        class_name VARCHAR(255) NOT NULL,
+        schedule TEXT NOT NULL,
+        cost DECIMAL(10, 2) NOT NULL,
+        enrollment_deadline VARCHAR(255) NOT NULL,
+        enrollment_opens_at TIMESTAMP NULL,
+        enrollment_closes_at TIMESTAMP NULL,
+        vacancies INTEGER NULL,
+        location VARCHAR(255) NULL,
+        instructor VARCHAR(255) NULL,
+        scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE activity_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        activity_id INTEGER NOT NULL REFERENCES activities (id) ON DELETE CASCADE,
+        weekday INTEGER NOT NULL,
+        start_minute INTEGER NOT NULL,
+        end_minute INTEGER NOT NULL
+    );
+    CREATE INDEX idx_weekday_time ON activity_sessions (weekday, start_minute, end_minute);
+    CREATE INDEX idx_activity ON activity_sessions (activity_id);
+    CREATE TABLE activity_versions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        activity_key VARCHAR(64) NOT NULL,
+        registration_id INTEGER NULL,
+        detail_id INTEGER NULL,
+        category VARCHAR(255) NOT NULL,
+        class_name VARCHAR(255) NOT NULL,
+        schedule TEXT NOT NULL,
+        cost DECIMAL(10, 2) NOT NULL,
+        enrollment_deadline VARCHAR(255) NOT NULL,
+        enrollment_opens_at TIMESTAMP NULL,
+        enrollment_closes_at TIMESTAMP NULL,
+        vacancies INTEGER NULL,
+        location VARCHAR(255) NULL,
+        instructor VARCHAR(255) NULL,
+        valid_from TIMESTAMP NOT NULL,
+        valid_to TIMESTAMP NOT NULL
+    );
+    CREATE INDEX idx_key_to ON activity_versions (activity_key, valid_to);
+    CREATE INDEX idx_registration_open ON activity_versions (registration_id, valid_to);
+    CREATE TABLE scraping_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        registration_id INTEGER NULL,
+        total_activities INTEGER NOT NULL,
+        status VARCHAR(50) NOT NULL,
+        error_message TEXT,
+        page_hash CHAR(64) NULL,
+        data_hash CHAR(64) NULL
+    );
+    CREATE TABLE activity_stats (
+        scrape_id INTEGER NOT NULL,
+        category VARCHAR(255) NOT NULL,
+        total_activities INTEGER NOT NULL,
+        free_activities INTEGER NOT NULL,
+        avg_cost DECIMAL(10, 2) NULL,
+        min_cost DECIMAL(10, 2) NULL,
+        max_cost DECIMAL(10, 2) NULL,
+        PRIMARY KEY (scrape_id, category)
+    );
+    CREATE TABLE scrape_stage_metrics (
+        scrape_id INTEGER NOT NULL,
+        stage VARCHAR(32) NOT NULL,
+        wall_seconds DOUBLE NOT NULL,
+        cpu_seconds DOUBLE NOT NULL,
+        bytes_fetched INTEGER NOT NULL DEFAULT 0,
+        rows_parsed INTEGER NOT NULL DEFAULT 0,
+        rows_written INTEGER NOT NULL DEFAULT 0,
+        db_round_trips INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (scrape_id, stage)
+    );
+"""
+
+CATEGORIES = ['Artes Marciais', 'ATLETISMO', 'Dança', 'Ginástica', 'Lutas', 'Musculação',
+              'Natação - Atividades Aquáticas', 'Pilates', 'Yoga', 'Esporte De Raquete']
+SCHEDULES = ['Seg, Qua - 18:00 às 19:00', 'Ter, Qui - 07:00 às 08:00', 'Sex - 16:00 às 18:00',
+             'Seg - 18:00 às 19:30 Qua - 18:30 às 19:30', 'Online - 13:00 às 23:59']
+
+
+def _sqlite_query(query: str) -> str:
+    """Translate the MySQL dialect the scraper writes into SQLite's"""
+    query = query.replace('%s', '?').replace('<=>', 'IS')
+    # SQLite serializes writers, so row locks are implied
+    query = re.sub(r'\s+FOR UPDATE\b', '', query)
+    if 'ON DUPLICATE KEY UPDATE' in query:
+        # Only activities is upserted, on its natural key
+        query = query.replace('ON DUPLICATE KEY UPDATE', 'ON CONFLICT (activity_key) DO UPDATE SET')
+        query = re.sub(r'VALUES\((\w+)\)', r'excluded.\1', query)
+    return query
+
+
+class _SQLiteCursor:
+    """Cursor wrapper translating mysql-connector's %s placeholders, <=> operator and upserts"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, query, params=()):
+        self._cursor.execute(_sqlite_query(query), tuple(params))
+
+    def executemany(self, query, seq_params):
+        self._cursor.executemany(_sqlite_query(query), seq_params)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteStandIn:
+    """Minimal stand-in for a mysql-connector connection over in-memory SQLite"""
+
+    def __init__(self):
+        self._db = sqlite3.connect(':memory:', detect_types=sqlite3.PARSE_DECLTYPES)
+        self._db.executescript(SQLITE_SCHEMA)
+        self._db.execute("PRAGMA foreign_keys = ON")
+
+    def cursor(self):
+        return _SQLiteCursor(self._db.cursor())
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def is_connected(self):
+        return True
+
+    def fetch_all(self, query, params=()):
+        """Run a query and fetch all rows (see database.PooledConnection.fetch_all)"""
+        cursor = self.cursor()
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def close(self):
+        self._db.close()
+
+
+def synthetic_activities(count: int) -> List[Activity]:
+    """Generate ``count`` distinct activities shaped like extract_activities output"""
+    return [Activity(category=CATEGORIES[i % len(CATEGORIES)],
+                     class_name=f"{chr(65 + i % 26)} - Turma Sintética {i}",
+                     schedule=SCHEDULES[i % len(SCHEDULES)],
+                     cost=float(100 + i % 280),
+                     enrollment_deadline='07/08/25 às 08:00 até 30/09/25 às 23:55',
+                     enrollment_opens_at=datetime(2025, 8, 7, 8, 0),
+                     enrollment_closes_at=datetime(2025, 9, 30, 23, 55),
+                     detail_id=100000 + i)
+            for i in range(count)]
+
+
+def open_benchmark_connection(use_sqlite: bool):
+    """Open the connection the write benchmark runs against"""
+    if use_sqlite:
+        return SQLiteStandIn()
+    import mysql.connector
+    connection = mysql.connector.connect(**DB_CONFIG)
+    cursor = connection.cursor()
+    # Shadow the real tables for this session only
+    cursor.execute("CREATE TEMPORARY TABLE categories LIKE categories")
+    cursor.execute("CREATE TEMPORARY TABLE activities LIKE activities")
+    cursor.execute("CREATE TEMPORARY TABLE activity_sessions LIKE activity_sessions")
+    cursor.execute("CREATE TEMPORARY TABLE activity_versions LIKE activity_versions")
+    cursor.close()
+    return connection
+
+
+def benchmark_writes(sizes: List[int], batch_sizes: List[int], use_sqlite: bool = False) -> List[Dict]:
+    """
+    Time FEFActivityScraper.replace_activities for each size and batch size
+
+    Returns:
+        List of result dictionaries (rows, batch_size, seconds, rows_per_sec)
+    """
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False)
+    results = []
+    for size in sizes:
+        activities = synthetic_activities(size)
+        for batch_size in batch_sizes:
+            scraper.connection = open_benchmark_connection(use_sqlite)
+            try:
+                start = time.perf_counter()
+                ok = scraper.replace_activities(activities, registration_id=0, batch_size=batch_size)
+                elapsed = time.perf_counter() - start
+            finally:
+                scraper.connection.close()
+            if not ok:
+                raise RuntimeError(f"Write benchmark failed for {size} rows")
+            results.append({
+                'rows': size,
+                'batch_size': batch_size,
+                'seconds': elapsed,
+                'rows_per_sec': size / elapsed if elapsed else float('inf')
+            })
+    return results
+
+
+def load_example_html() -> str:
+    """Load the example listing page as raw markup"""
+    with open(EXAMPLE_HTML, 'r', encoding='utf-8') as f:
+        return unwrap_view_source(f.read())
+
+
+def inflate_page(html_content: str, factor: int) -> str:
+    """
+    Repeat the listing tables of a page ``factor`` times
+
+    Only the <table> blocks themselves are repeated: the markup between them
+    opens <div>s that are closed after the last table, and repeating it would
+    nest every copy one level deeper than the previous one.
+    """
+    tables = re.findall(r'<table\b.*?</table>', html_content, re.S)
+    start = html_content.find('<table')
+    end = html_content.rfind('</table>') + len('</table>')
+    if not tables or factor <= 1:
+        return html_content
+    return html_content[:start] + ''.join(tables) * factor + html_content[end:]
+
+
+def benchmark_parse(scales: List[int], backends: List[str], repeat: int = 3) -> List[Dict]:
+    """
+    Time extract_activities on inflated copies of the example page
+
+    Returns:
+        List of result dictionaries (backend, scale, bytes, activities, seconds)
+        with the best time of ``repeat`` runs
+    """
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False)
+    base_html = load_example_html()
+    results = []
+    for scale in scales:
+        html_content = inflate_page(base_html, scale)
+        for backend in backends:
+            best = None
+            for _ in range(max(1, repeat)):
+                start = time.perf_counter()
+                activities = scraper.extract_activities(html_content, parser=backend, verbose=False)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results.append({
+                'backend': backend,
+                'scale': scale,
+                'bytes': len(html_content.encode('utf-8')),
+                'activities': len(activities),
+                'seconds': best
+            })
+    return results
+
+
+def example_candidates() -> List[Candidate]:
+    """Classes of the example page as timetable candidates (id = position on the page)"""
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False)
+    activities = scraper.extract_activities(load_example_html(), verbose=False)
+    return [Candidate(i, activity.category, activity.class_name, Decimal(str(activity.cost)),
+                      tuple(parse_schedule_sessions(activity.schedule)), activity.schedule)
+            for i, activity in enumerate(activities)]
+
+
+# Constraint sets of the timetable benchmark
+TIMETABLE_SCENARIOS = (
+    ('any combination', {}),
+    ('up to 3 classes', {'max_size': 3}),
+    ('budget R$ 800', {'max_cost': Decimal('800')}),
+    ('weekday evenings only', {'busy': parse_busy_blocks(['Seg, Ter, Qua, Qui, Sex - 00:00 às 18:00'])}),
+    ('2-4 classes with class 0', {'required': [0], 'min_size': 2, 'max_size': 4}),
+)
+
+
+def benchmark_timetable(repeat: int = 3, listed: int = 50) -> List[Dict]:
+    """
+    Time counting and listing clash-free combinations of the example page's classes
+
+    Returns:
+        List of result dictionaries (scenario, candidates, combinations,
+        count_seconds, list_seconds) with the best time of ``repeat`` runs;
+        list_seconds is the time to the first ``listed`` combinations
+    """
+    candidates = example_candidates()
+    results = []
+    for name, constraints in TIMETABLE_SCENARIOS:
+        count_best = list_best = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            planner = TimetablePlanner(candidates, **constraints)
+            total = planner.count()
+            elapsed = time.perf_counter() - start
+            count_best = elapsed if count_best is None else min(count_best, elapsed)
+
+            start = time.perf_counter()
+            list(TimetablePlanner(candidates, **constraints).combinations(listed))
+            elapsed = time.perf_counter() - start
+            list_best = elapsed if list_best is None else min(list_best, elapsed)
+        results.append({
+            'scenario': name,
+            'candidates': len(planner.candidates),
+            'combinations': total,
+            'count_seconds': count_best,
+            'list_seconds': list_best
+        })
+    return results
+
+
+# Stages of the pipeline suite, in run order
+SUITE_STAGES = ('extract', 'parse_schedule', 'parse_cost', 'save')
+
+# Allowed slowdown before a stage counts as a regression (0.25 = 25% slower)
+REGRESSION_THRESHOLD = 0.25
+
+# Timing differences below this many seconds are treated as noise
+NOISE_SECONDS = 0.005
+
+
+def distinct_copies(activities: List[Activity]) -> List[Activity]:
+    """
+    Make the activities of an inflated page unique
+
+    Every copy of a repeated table yields the same activity keys, which the
+    activities table would reject; later copies get a numbered class name
+    and no detail ID.
+    """
+    seen = {}
+    result = []
+    for activity in activities:
+        key = activity_key(activity)
+        copy = seen.get(key, 0)
+        seen[key] = copy + 1
+        result.append(activity.replace(class_name=f"{activity.class_name} #{copy}", detail_id=None)
+                      if copy else activity)
+    return result
+
+
+def _measure(run: Callable, repeat: int, setup: Callable = None) -> Tuple[float, int]:
+    """
+    Best wall time of ``repeat`` calls, then the peak traced memory of one more
+
+    Args:
+        run: Called with the value returned by setup (or without arguments)
+        repeat: Timed runs, the fastest is kept
+        setup: Optional untimed preparation before each run (e.g. a fresh connection)
+
+    Returns:
+        Tuple (seconds, peak_bytes)
+    """
+    def once(traced: bool) -> float:
+        state = setup() if setup else None
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            run(state) if setup else run()
+            return time.perf_counter() - start
+        finally:
+            if traced:
+                once.peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            if state is not None and hasattr(state, 'close'):
+                state.close()
+
+    best = min(once(False) for _ in range(max(1, repeat)))
+    once(True)
+    return best, once.peak
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_suite(scales: List[int], use_sqlite: bool = False, parser: str = None,
+                    repeat: int = 3) -> Dict:
+    """
+    Time each pipeline stage on inflated copies of the example page
+
+    Stages: extract (extract_activities, which also normalizes every row),
+    parse_schedule and parse_cost (over the raw cell text of every row) and
+    save (save_to_database into a fresh TEMPORARY table or SQLite stand-in).
+    Fetching is network bound and left out.
+
+    Args:
+        scales: Inflation factors of the example page
+        use_sqlite: Save into the in-memory SQLite stand-in instead of MySQL
+        parser: Parser backend (default: the scraper's)
+        repeat: Timed runs per stage, the fastest is kept
+
+    Returns:
+        Report dictionary with environment details and one result per scale and stage
+    """
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, parser=parser or PARSER_BACKEND)
+    base_html = load_example_html()
+    results = []
+
+    def save(connection, activities):
+        scraper.connection = connection
+        if not scraper.save_to_database(activities, registration_id=0):
+            raise RuntimeError(f"Save benchmark failed for {len(activities)} rows")
+
+    for scale in scales:
+        html_content = inflate_page(base_html, scale)
+        size = len(html_content.encode('utf-8'))
+        rows = list(scraper._extract_rows_lxml(html_content) if scraper.parser == 'lxml'
+                    else scraper._extract_rows_bs4(html_content))
+        activities = distinct_copies(scraper.extract_activities(html_content, verbose=False))
+
+        stages = {
+            'extract': lambda: scraper.extract_activities(html_content, verbose=False),
+            'parse_schedule': lambda: [scraper.parse_schedule(row[2]) for row in rows],
+            'parse_cost': lambda: [scraper.parse_cost(row[3]) for row in rows],
+        }
+        for stage, run in stages.items():
+            seconds, peak = _measure(run, repeat)
+            results.append({'scale': scale, 'stage': stage, 'bytes': size, 'items': len(rows),
+                            'seconds': seconds, 'peak_bytes': peak})
+
+        seconds, peak = _measure(lambda connection: save(connection, activities), repeat,
+                                 setup=lambda: open_benchmark_connection(use_sqlite))
+        results.append({'scale': scale, 'stage': 'save', 'bytes': size, 'items': len(activities),
+                        'seconds': seconds, 'peak_bytes': peak})
+        print(f"  ✓ Scale {scale}: {len(rows)} activities, {size / 1e6:.2f} MB")
+
+    scraper.connection = None
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parser': scraper.parser,
+        'database': 'sqlite' if use_sqlite else 'mysql',
+        'repeat': repeat,
+        'results': results
+    }
+
+
+def compare_reports(report: Dict, baseline: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """
+    Find stages that got slower than a baseline report allows
+
+    A stage regresses when it is more than ``threshold`` slower than in the
+    baseline and by more than NOISE_SECONDS. The save stage is only compared
+    when both reports used the same database.
+
+    Returns:
+        One description per regression (empty if none)
+    """
+    previous = {(r['scale'], r['stage']): r for r in baseline.get('results', [])}
+    same_database = report.get('database') == baseline.get('database')
+    regressions = []
+    for result in report['results']:
+        old = previous.get((result['scale'], result['stage']))
+        if old is None or (result['stage'] == 'save' and not same_database) or not old['seconds']:
+            continue
+        ratio = result['seconds'] / old['seconds']
+        if ratio > 1 + threshold and result['seconds'] - old['seconds'] > NOISE_SECONDS:
+            regressions.append(f"{result['stage']} at scale {result['scale']}: "
+                               f"{old['seconds']:.4f}s → {result['seconds']:.4f}s ({ratio:.2f}x)")
+    return regressions
+
+
+def _print_suite(report: Dict, baseline: Optional[Dict] = None):
+    previous = {(r['scale'], r['stage']): r for r in (baseline or {}).get('results', [])}
+    print("\n" + "="*72)
+    print(f"Pipeline benchmark ({report['parser']}, {report['database']}, commit {report['commit'] or '?'})")
+    print("="*72)
+    print(f"{'scale':>6} {'stage':>15} {'items':>8} {'seconds':>9} {'µs/item':>9} {'peak MB':>8} {'vs base':>8}")
+    for result in report['results']:
+        old = previous.get((result['scale'], result['stage']))
+        change = f"{result['seconds'] / old['seconds']:.2f}x" if old and old['seconds'] else '-'
+        per_item = result['seconds'] / result['items'] * 1e6 if result['items'] else 0.0
+        print(f"{result['scale']:>6} {result['stage']:>15} {result['items']:>8} {result['seconds']:>9.4f} "
+              f"{per_item:>9.1f} {result['peak_bytes'] / 1e6:>8.2f} {change:>8}")
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="FEF scraper benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    writes = subparsers.add_parser('writes', help="Database write throughput")
+    writes.add_argument('--sizes', type=_int_list, default=[200, 20000, 200000],
+                        help="Comma separated activity counts (default: 200,20000,200000)")
+    writes.add_argument('--batch-sizes', type=_int_list, default=[1, BATCH_SIZE],
+                        help=f"Comma separated rows per INSERT (default: 1,{BATCH_SIZE})")
+    writes.add_argument('--sqlite', action='store_true', help="Use the in-memory SQLite stand-in")
+
+    parse = subparsers.add_parser('parse', help="extract_activities time per parser backend")
+    parse.add_argument('--scales', type=_int_list, default=[1, 10, 100],
+                       help="Comma separated inflation factors of the example page (default: 1,10,100)")
+    parse.add_argument('--backends', type=lambda v: v.split(','), default=list(PARSER_BACKENDS),
+                       help="Comma separated parser backends (default: bs4,lxml)")
+    parse.add_argument('--repeat', type=int, default=3, help="Runs per measurement, best is kept")
+
+    suite = subparsers.add_parser('suite', help="Time and memory per pipeline stage, JSON report")
+    suite.add_argument('--scales', type=_int_list, default=[1, 10, 100],
+                       help="Comma separated inflation factors of the example page (default: 1,10,100)")
+    suite.add_argument('--parser', choices=PARSER_BACKENDS, help="Parser backend (default: SCRAPER_PARSER)")
+    suite.add_argument('--sqlite', action='store_true', help="Save into the in-memory SQLite stand-in")
+    suite.add_argument('--repeat', type=int, default=3, help="Timed runs per stage, best is kept")
+    suite.add_argument('--output', metavar='PATH', help="Write the JSON report to PATH")
+    suite.add_argument('--baseline', metavar='PATH', help="Compare against an earlier JSON report")
+    suite.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                       help="Allowed slowdown per stage before failing (default: %(default)s)")
+
+    timetable = subparsers.add_parser('timetable', help="Clash-free class combinations on the example page")
+    timetable.add_argument('--repeat', type=int, default=3, help="Runs per measurement, best is kept")
+
+    args = parser.parse_args()
+
+    if args.command == 'writes':
+        results = benchmark_writes(args.sizes, args.batch_sizes, args.sqlite)
+        print("\n" + "="*60)
+        print(f"Write benchmark ({'SQLite stand-in' if args.sqlite else 'MySQL'})")
+        print("="*60)
+        print(f"{'rows':>10} {'batch':>7} {'seconds':>10} {'rows/sec':>12}")
+        for result in results:
+            print(f"{result['rows']:>10} {result['batch_size']:>7} "
+                  f"{result['seconds']:>10.3f} {result['rows_per_sec']:>12.0f}")
+
+    elif args.command == 'parse':
+        results = benchmark_parse(args.scales, args.backends, args.repeat)
+        print("\n" + "="*60)
+        print("Parse benchmark (example page inflated)")
+        print("="*60)
+        print(f"{'backend':>8} {'scale':>6} {'MB':>8} {'activities':>11} {'seconds':>9}")
+        for result in results:
+            print(f"{result['backend']:>8} {result['scale']:>6} {result['bytes'] / 1e6:>8.2f} "
+                  f"{result['activities']:>11} {result['seconds']:>9.3f}")
+
+    elif args.command == 'timetable':
+        results = benchmark_timetable(args.repeat)
+        print("\n" + "="*72)
+        print("Timetable benchmark (example page)")
+        print("="*72)
+        print(f"{'scenario':<26} {'classes':>7} {'combinations':>14} {'count ms':>9} {'first 50 ms':>11}")
+        for result in results:
+            print(f"{result['scenario']:<26} {result['candidates']:>7} {result['combinations']:>14.4g} "
+                  f"{result['count_seconds'] * 1000:>9.1f} {result['list_seconds'] * 1000:>11.1f}")
+
+    elif args.command == 'suite':
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        report = benchmark_suite(args.scales, args.sqlite, args.parser, args.repeat)
+        _print_suite(report, baseline)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"\n✓ Report written to {args.output}")
+        if baseline is not None:
+            regressions = compare_reports(report, baseline, args.threshold)
+            if regressions:
+                print(f"\n✗ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+                for regression in regressions:
+                    print(f"   • {regression}")
+                sys.exit(1)
+            print(f"\n✓ No regressions over {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Long-running scraper daemon with adaptive polling
+
+Instead of a cron job that starts a fresh interpreter for every run, the
+daemon keeps the process, the HTTP session and the pooled database
+connection alive and decides after each run when to poll next from the
+enrollment windows ("Inscrições") of the stored activities: every minute
+around an opening or closing, every quarter hour while some enrollment is
+open, and every few hours otherwise. SIGTERM or SIGINT lets the current run
+finish and then stops the loop. The daemon's state is kept in a JSON status
+file that a health check (``fef_scraper.py --health-check``) can read.
+"""
+
+import json
+import os
+import signal
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from atomic_file import write_json_atomic
+from schedules import site_now
+
+# Seconds between polls around an enrollment opening or closing
+POLL_MIN_INTERVAL = float(os.getenv('SCRAPER_POLL_MIN_INTERVAL', '60'))
+
+# Seconds between polls while some enrollment window is open
+POLL_OPEN_INTERVAL = float(os.getenv('SCRAPER_POLL_OPEN_INTERVAL', '900'))
+
+# Seconds between polls when no enrollment window is open or near
+POLL_IDLE_INTERVAL = float(os.getenv('SCRAPER_POLL_IDLE_INTERVAL', str(6 * 3600)))
+
+# Seconds before and after an opening or closing that are polled at POLL_MIN_INTERVAL
+POLL_WINDOW_MARGIN = float(os.getenv('SCRAPER_POLL_WINDOW_MARGIN', '1800'))
+
+# JSON file the daemon writes its state to
+STATUS_FILE = os.getenv('SCRAPER_STATUS_FILE',
+                        os.path.join(os.path.dirname(os.path.abspath(__file__)), '.daemon_status.json'))
+
+# Seconds a run may take before the health check counts it as stuck (plus HEALTH_GRACE)
+RUN_TIMEOUT = float(os.getenv('SCRAPER_RUN_TIMEOUT', '1800'))
+
+# Seconds a poll or a run may be overdue before the health check fails
+HEALTH_GRACE = float(os.getenv('SCRAPER_HEALTH_GRACE', '600'))
+
+# Enrollment window: (opens_at, closes_at), either may be None
+Window = Tuple[Optional[datetime], Optional[datetime]]
+
+
+class Poll(NamedTuple):
+    """When to poll next, and why"""
+    delay: float
+    reason: str
+
+
+class PollPolicy:
+    """Picks the delay before the next poll from the enrollment windows"""
+
+    def __init__(self, min_interval: float = POLL_MIN_INTERVAL, open_interval: float = POLL_OPEN_INTERVAL,
+                 idle_interval: float = POLL_IDLE_INTERVAL, margin: float = POLL_WINDOW_MARGIN):
+        """
+        Args:
+            min_interval: Delay around an opening or closing
+            open_interval: Delay while some enrollment window is open
+            idle_interval: Delay when no window is open or near
+            margin: Seconds before and after an opening or closing counted as near it
+        """
+        self.min_interval = min_interval
+        self.open_interval = max(min_interval, open_interval)
+        self.idle_interval = max(self.open_interval, idle_interval)
+        self.margin = margin
+
+    def next_poll(self, windows: Iterable[Window], now: datetime = None) -> Poll:
+        """
+        Get the delay before the next poll
+
+        A delay never runs past the start of the margin of the next opening
+        or closing, so polling tightens in time for it.
+
+        Args:
+            windows: Enrollment windows of the scraped activities
+            now: Current time in the site's time zone (default: now)
+
+        Returns:
+            Poll with the delay in seconds and a readable reason
+        """
+        now = now or site_now()
+        windows = list(windows)
+        boundaries = sorted({(moment, label) for opens_at, closes_at in windows
+                             for moment, label in ((opens_at, 'opens'), (closes_at, 'closes'))
+                             if moment is not None})
+
+        for moment, label in boundaries:
+            if abs((moment - now).total_seconds()) <= self.margin:
+                return Poll(self.min_interval, f"enrollment {label} {moment:%d/%m/%Y %H:%M}")
+
+        if any((opens_at is None or opens_at <= now) and closes_at is not None and now < closes_at
+               for opens_at, closes_at in windows):
+            poll = Poll(self.open_interval, "enrollment open")
+        else:
+            poll = Poll(self.idle_interval, "no enrollment open")
+
+        upcoming = [(moment, label) for moment, label in boundaries if moment > now]
+        if upcoming:
+            moment, label = upcoming[0]
+            until_margin = (moment - now).total_seconds() - self.margin
+            if until_margin < poll.delay:
+                poll = Poll(max(self.min_interval, until_margin),
+                            f"enrollment {label} {moment:%d/%m/%Y %H:%M}")
+        return poll
+
+
+def write_status(path: str, status: Dict):
+    """Write the daemon status as JSON, replacing the file atomically"""
+    write_json_atomic(path, status, indent=2)
+
+
+def check_status(path: str = STATUS_FILE, now: datetime = None, grace: float = HEALTH_GRACE) -> Tuple[bool, str]:
+    """
+    Check a daemon status file
+
+    The daemon is healthy while it runs and neither its next poll nor the
+    end of the current run is overdue by more than ``grace`` seconds.
+
+    Returns:
+        Tuple (healthy, message)
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            status = json.load(f)
+    except (OSError, ValueError) as e:
+        return False, f"Cannot read status file {path}: {e}"
+
+    if status.get('state') == 'stopped':
+        return False, f"Daemon stopped at {status.get('updated_at')}"
+    if status.get('state') == 'sleeping' and status.get('next_poll_at'):
+        deadline = datetime.fromisoformat(status['next_poll_at']) + timedelta(seconds=grace)
+        if (now or site_now()) > deadline:
+            return False, f"Poll due at {status['next_poll_at']} is overdue"
+    if status.get('state') == 'scraping' and status.get('run_deadline_at'):
+        deadline = datetime.fromisoformat(status['run_deadline_at']) + timedelta(seconds=grace)
+        if (now or site_now()) > deadline:
+            return False, f"Run due to finish by {status['run_deadline_at']} is overdue"
+    return True, (f"Daemon {status.get('state')}, last run at {status.get('last_run_at')} "
+                  f"({'success' if status.get('last_success') else 'failure'})")
+
+
+class ScraperDaemon:
+    """Runs the scraper in a loop, sleeping as the poll policy decides"""
+
+    def __init__(self, run_once: Callable[[], bool], load_windows: Callable[[], List[Window]],
+                 policy: PollPolicy = None, status_file: Optional[str] = STATUS_FILE,
+                 clock: Callable[[], datetime] = site_now, run_timeout: float = RUN_TIMEOUT):
+        """
+        Args:
+            run_once: Runs one scrape and returns its success
+            load_windows: Returns the enrollment windows to plan the next poll from
+            policy: Poll policy (default: intervals from the environment)
+            status_file: JSON status file (None: no file)
+            clock: Current time in the site's time zone
+            run_timeout: Seconds a run may take before health checks fail
+        """
+        self.run_once = run_once
+        self.load_windows = load_windows
+        self.policy = policy or PollPolicy()
+        self.status_file = status_file
+        self._clock = clock
+        self.run_timeout = run_timeout
+        self._stop = threading.Event()
+        self.status = {
+            'pid': os.getpid(),
+            'state': 'starting',
+            'started_at': self._now(),
+            'updated_at': None,
+            'runs': 0,
+            'failures': 0,
+            'consecutive_failures': 0,
+            'last_run_at': None,
+            'last_success': None,
+            'last_success_at': None,
+            'run_deadline_at': None,
+            'next_poll_at': None,
+            'next_poll_reason': None,
+        }
+
+    def _now(self) -> str:
+        return self._clock().isoformat(timespec='seconds')
+
+    def _update(self, **changes):
+        """Update the status and write the status file (failures only warn)"""
+        self.status.update(changes, updated_at=self._now())
+        if not self.status_file:
+            return
+        try:
+            write_status(self.status_file, self.status)
+        except OSError as e:
+            print(f"⚠ Warning: Could not write daemon status: {e}")
+
+    def stop(self, signum=None, frame=None):
+        """Ask the loop to stop after the current run (usable as a signal handler)"""
+        if signum is not None:
+            print(f"\nReceived signal {signum}, stopping after the current run...")
+        self._stop.set()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def install_signal_handlers(self):
+        """Stop gracefully on SIGTERM and SIGINT"""
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.stop)
+
+    def _plan(self, success: bool) -> Poll:
+        """Pick the next poll; a failed run is retried at least at the open interval"""
+        try:
+            windows = self.load_windows()
+        except Exception as e:
+            print(f"⚠ Warning: Could not load enrollment windows: {e}")
+            windows = []
+        poll = self.policy.next_poll(windows, self._clock())
+        if not success and poll.delay > self.policy.open_interval:
+            poll = Poll(self.policy.open_interval, "retrying after a failed run")
+        return poll
+
+    def run(self, max_runs: int = None) -> int:
+        """
+        Poll until stopped
+
+        Args:
+            max_runs: Stop after this many runs (default: run until stopped)
+
+        Returns:
+            Number of runs made
+        """
+        runs = 0
+        try:
+            while not self.stopping:
+                run_deadline_at = self._clock() + timedelta(seconds=self.run_timeout)
+                self._update(state='scraping', run_deadline_at=run_deadline_at.isoformat(timespec='seconds'))
+                try:
+                    success = bool(self.run_once())
+                except Exception as e:
+                    print(f"✗ Unexpected error during scraping: {e}")
+                    success = False
+                runs += 1
+                failures = 0 if success else self.status['consecutive_failures'] + 1
+                self._update(run_deadline_at=None, runs=self.status['runs'] + 1,
+                             failures=self.status['failures'] + (not success),
+                             consecutive_failures=failures, last_run_at=self._now(),
+                             last_success=success,
+                             last_success_at=self._now() if success else self.status['last_success_at'])
+                if max_runs is not None and runs >= max_runs:
+                    break
+
+                poll = self._plan(success)
+                next_poll_at = self._clock() + timedelta(seconds=poll.delay)
+                self._update(state='sleeping', next_poll_at=next_poll_at.isoformat(timespec='seconds'),
+                             next_poll_reason=poll.reason)
+                print(f"⏲ Next poll at {next_poll_at:%d/%m/%Y %H:%M:%S} ({poll.reason})")
+                self._stop.wait(poll.delay)
+        finally:
+            self._update(state='stopped', run_deadline_at=None, next_poll_at=None, next_poll_reason=None)
+        return runs
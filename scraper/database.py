@@ -0,0 +1,322 @@
+"""
+Shared MySQL access layer for the FEF scraper and query tool
+
+Connections come from a mysql.connector connection pool instead of a new
+TCP + auth handshake per call. A checkout waits up to DB_POOL_TIMEOUT
+seconds for a free connection, and every pool keeps metrics (checkouts,
+waits, peak use) to help size it under load. Frequently run queries can go
+through fetch_all, which reuses one server-side prepared statement per
+query and connection. Each checked-out connection also counts its round
+trips to the server, so callers can attribute database time to their
+own stages.
+
+Set DB_POOL_STATS=1 to print the metrics of every pool on exit.
+"""
+
+import atexit
+import os
+import re
+import threading
+import time
+import weakref
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from mysql.connector import Error
+from mysql.connector.errors import InterfaceError, OperationalError, PoolError
+from mysql.connector.pooling import CNX_POOL_MAXSIZE, MySQLConnectionPool
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Database configuration
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'database': os.getenv('DB_NAME', 'fef_activities'),
+    'user': os.getenv('DB_USER', 'root'),
+    'password': os.getenv('DB_PASSWORD', ''),
+    'charset': 'utf8mb4',
+    'collation': 'utf8mb4_unicode_ci'
+}
+
+# activity_stats.category value of the row aggregating all categories
+STATS_ALL_CATEGORIES = ''
+
+# Connections per pool (mysql.connector allows at most 32)
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+
+# Seconds a checkout waits for a free connection before giving up
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+_INSERT = re.compile(r'\s*INSERT\b', re.IGNORECASE)
+
+# Errors after which a prepared statement is run again: server gone away, lost
+# connection, connection unavailable, and a statement handle the server forgot
+_RETRY_ERRNOS = (2006, 2013, 2055, 1243)
+
+
+def _should_retry(error: Error) -> bool:
+    """Check whether a failed prepared statement may succeed when prepared again"""
+    return isinstance(error, (OperationalError, InterfaceError)) or error.errno in _RETRY_ERRNOS
+
+
+class CountingCursor:
+    """
+    Cursor that adds the statements it sends to its connection's round_trips
+
+    executemany() of an INSERT is sent as one multi-row statement by
+    mysql.connector; other statements go to the server once per parameter set.
+    """
+
+    def __init__(self, owner: 'PooledConnection', cursor):
+        self._owner = owner
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, operation, params=(), *args, **kwargs):
+        self._owner.round_trips += 1
+        return self._cursor.execute(operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params):
+        seq_params = list(seq_params)
+        self._owner.round_trips += 1 if _INSERT.match(operation) else len(seq_params)
+        return self._cursor.executemany(operation, seq_params)
+
+
+class PooledConnection:
+    """
+    Connection checked out of a ConnectionPool
+
+    Behaves like a mysql.connector connection; close() hands it back to the
+    pool (and is safe to call more than once). ``round_trips`` counts the
+    statements, commits and rollbacks sent through it.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', connection):
+        self._pool = pool
+        self._connection = connection
+        self._closed = False
+        self.round_trips = 0
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs) -> CountingCursor:
+        """Open a cursor whose statements count towards round_trips"""
+        return CountingCursor(self, self._connection.cursor(*args, **kwargs))
+
+    def commit(self):
+        self.round_trips += 1
+        self._connection.commit()
+
+    def rollback(self):
+        self.round_trips += 1
+        self._connection.rollback()
+
+    def fetch_all(self, query: str, params: tuple = ()) -> List[tuple]:
+        """
+        Run a query through a cached prepared statement and fetch all rows
+
+        Args:
+            query: SQL with %s placeholders
+            params: Query parameters
+
+        Returns:
+            List of result rows
+        """
+        cursor = self._pool._prepared_cursor(self._connection, query)
+        self.round_trips += 1
+        try:
+            cursor.execute(query, params)
+        except Error as e:
+            # The statement may be gone after a reconnect; prepare it again once.
+            # Other errors (syntax, permissions) would only fail twice.
+            if not _should_retry(e):
+                raise
+            cursor = self._pool._prepared_cursor(self._connection, query, refresh=True)
+            cursor.execute(query, params)
+        return cursor.fetchall()
+
+    def close(self):
+        """Return the connection to the pool"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            # End the read snapshot so the next user sees fresh data
+            if self._connection.is_connected() and self._connection.in_transaction:
+                self._connection.rollback()
+        except Error:
+            pass
+        finally:
+            try:
+                self._connection.close()
+            finally:
+                self._pool._release()
+
+
+class ConnectionPool:
+    """mysql.connector pool with checkout waiting, metrics and a prepared statement cache"""
+
+    _counter = 0
+
+    def __init__(self, config: Dict, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        """
+        Initialize the pool; connections are opened on first use
+
+        Args:
+            config: mysql.connector connection arguments
+            size: Maximum number of connections
+            timeout: Seconds a checkout waits for a free connection
+        """
+        ConnectionPool._counter += 1
+        self.name = f"fef_pool_{ConnectionPool._counter}"
+        self.config = dict(config)
+        self.size = max(1, min(size, CNX_POOL_MAXSIZE))
+        self.timeout = timeout
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        # Prepared cursors by underlying connection, then by query
+        self._statements = weakref.WeakKeyDictionary()
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'in_use': 0,
+            'peak_in_use': 0,
+            'statements_prepared': 0,
+            'statement_cache_hits': 0,
+        }
+
+    def _get_pool(self) -> MySQLConnectionPool:
+        with self._lock:
+            if self._pool is None:
+                # Sessions are not reset on return so prepared statements survive;
+                # PooledConnection.close() ends any open transaction instead.
+                self._pool = MySQLConnectionPool(pool_name=self.name, pool_size=self.size,
+                                                 pool_reset_session=False, **self.config)
+            return self._pool
+
+    def get_connection(self) -> PooledConnection:
+        """
+        Check out a connection, waiting up to ``timeout`` seconds for a free one
+
+        Raises:
+            PoolError: If no connection became free in time
+            mysql.connector.Error: If connecting fails
+        """
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['waits'] += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                raise PoolError(f"No free connection in pool {self.name} after {self.timeout:g}s")
+        waited = time.perf_counter() - start
+
+        try:
+            connection = self._get_pool().get_connection()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            stats = self._stats
+            stats['checkouts'] += 1
+            stats['wait_seconds'] += waited
+            stats['max_wait_seconds'] = max(stats['max_wait_seconds'], waited)
+            stats['in_use'] += 1
+            stats['peak_in_use'] = max(stats['peak_in_use'], stats['in_use'])
+        return PooledConnection(self, connection)
+
+    def _release(self):
+        with self._lock:
+            self._stats['in_use'] -= 1
+        self._slots.release()
+
+    def _prepared_cursor(self, pooled, query: str, refresh: bool = False):
+        """Get (or prepare) the cached statement for a query on a pooled connection"""
+        # PooledMySQLConnection wraps the real connection, which outlives checkouts
+        raw = getattr(pooled, '_cnx', pooled)
+        with self._lock:
+            cursors = self._statements.setdefault(raw, {})
+            cursor = None if refresh else cursors.get(query)
+            if cursor is not None:
+                self._stats['statement_cache_hits'] += 1
+                return cursor
+        cursor = raw.cursor(prepared=True)
+        with self._lock:
+            cursors[query] = cursor
+            self._stats['statements_prepared'] += 1
+        return cursor
+
+    def stats(self) -> Dict:
+        """
+        Get the pool metrics
+
+        Returns:
+            Dictionary with size, checkouts, waits, timeouts, wait_seconds,
+            max_wait_seconds, avg_wait_seconds, in_use, peak_in_use,
+            statements_prepared and statement_cache_hits
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['size'] = self.size
+        stats['avg_wait_seconds'] = stats['wait_seconds'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        return stats
+
+    def format_stats(self) -> str:
+        """One-line summary of the pool metrics"""
+        stats = self.stats()
+        return (f"{self.name}: size {stats['size']}, peak in use {stats['peak_in_use']}, "
+                f"{stats['checkouts']} checkouts, {stats['waits']} waited "
+                f"(avg {stats['avg_wait_seconds'] * 1000:.1f} ms, max {stats['max_wait_seconds'] * 1000:.1f} ms), "
+                f"{stats['timeouts']} timeouts, {stats['statements_prepared']} statements prepared, "
+                f"{stats['statement_cache_hits']} cache hits")
+
+
+def get_pool(config: Optional[Dict] = None) -> ConnectionPool:
+    """
+    Get the shared pool for a connection configuration
+
+    Args:
+        config: mysql.connector connection arguments (default: DB_CONFIG)
+
+    Returns:
+        The ConnectionPool for that configuration, created on first use
+    """
+    config = DB_CONFIG if config is None else config
+    key = tuple(sorted((name, str(value)) for name, value in config.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(config)
+        return pool
+
+
+def get_connection(config: Optional[Dict] = None) -> PooledConnection:
+    """Check out a connection from the shared pool (see ConnectionPool.get_connection)"""
+    return get_pool(config).get_connection()
+
+
+def _print_pool_stats():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        print(f"📊 {pool.format_stats()}")
+
+
+if os.getenv('DB_POOL_STATS'):
+    atexit.register(_print_pool_stats)
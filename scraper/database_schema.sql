@@ -1,31 +1,134 @@
 -- Database schema for FEF UNICAMP activities
+-- Running it drops and recreates every table; to upgrade an existing database in
+-- place, use migrations.sql instead.
 -- Create database if it doesn't exist
 CREATE DATABASE IF NOT EXISTS fef_activities CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
 
 USE fef_activities;
 
--- Drop table if exists (for development/testing)
+-- Drop tables if they exist (for development/testing)
+DROP TABLE IF EXISTS activity_sessions;
+DROP TABLE IF EXISTS activity_stats;
+DROP TABLE IF EXISTS scrape_stage_metrics;
+DROP TABLE IF EXISTS activity_versions;
 DROP TABLE IF EXISTS activities;
+DROP TABLE IF EXISTS categories;
+DROP TABLE IF EXISTS scraping_history;
+
+-- Category names, stored once and referenced by activities.category_id. Names
+-- compare exactly (utf8mb4_bin): each distinct header of the listing is one row.
+CREATE TABLE categories (
+    id SMALLINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+    UNIQUE KEY uq_category_name (name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Create activities table
 CREATE TABLE activities (
     id INT AUTO_INCREMENT PRIMARY KEY,
-    category VARCHAR(255) NOT NULL,
+    registration_id INT NULL,
+    activity_key VARCHAR(64) NOT NULL,
+    detail_id INT NULL,
+    category_id SMALLINT UNSIGNED NOT NULL,
     class_name VARCHAR(255) NOT NULL,
     schedule TEXT NOT NULL,
     cost DECIMAL(10, 2) NOT NULL,
     enrollment_deadline VARCHAR(255) NOT NULL,
+    enrollment_opens_at DATETIME NULL,
+    enrollment_closes_at DATETIME NULL,
+    vacancies INT NULL,
+    location VARCHAR(255) NULL,
+    instructor VARCHAR(255) NULL,
     scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_category (category),
-    INDEX idx_scraped_at (scraped_at)
+    UNIQUE KEY uq_activity_key (activity_key),
+    INDEX idx_registration (registration_id),
+    INDEX idx_category (category_id),
+    INDEX idx_enrollment_window (enrollment_closes_at, enrollment_opens_at),
+    INDEX idx_scraped_at (scraped_at),
+    CONSTRAINT fk_activity_category FOREIGN KEY (category_id) REFERENCES categories (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Weekly sessions parsed from activities.schedule (Monday = 0, minutes from midnight).
+-- Schedules that cannot be parsed have no rows here and are only kept as text.
+CREATE TABLE activity_sessions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    activity_id INT NOT NULL,
+    weekday TINYINT NOT NULL,
+    start_minute SMALLINT NOT NULL,
+    end_minute SMALLINT NOT NULL,
+    INDEX idx_weekday_time (weekday, start_minute, end_minute),
+    INDEX idx_activity (activity_id),
+    CONSTRAINT fk_session_activity FOREIGN KEY (activity_id)
+        REFERENCES activities (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Every version of every activity, valid from valid_from (inclusive) to valid_to
+-- (exclusive). Current versions end at 9999-12-31 23:59:59 rather than NULL, so
+-- as-of lookups (valid_to > t AND valid_from <= t) are a range scan of idx_validity.
+-- A new version is only written when a value of the activity changes.
+CREATE TABLE activity_versions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    activity_key VARCHAR(64) NOT NULL,
+    registration_id INT NULL,
+    detail_id INT NULL,
+    category VARCHAR(255) NOT NULL,
+    class_name VARCHAR(255) NOT NULL,
+    schedule TEXT NOT NULL,
+    cost DECIMAL(10, 2) NOT NULL,
+    enrollment_deadline VARCHAR(255) NOT NULL,
+    enrollment_opens_at DATETIME NULL,
+    enrollment_closes_at DATETIME NULL,
+    vacancies INT NULL,
+    location VARCHAR(255) NULL,
+    instructor VARCHAR(255) NULL,
+    valid_from DATETIME NOT NULL,
+    valid_to DATETIME NOT NULL,
+    INDEX idx_validity (valid_to, valid_from),
+    INDEX idx_valid_from (valid_from),
+    INDEX idx_key_from (activity_key, valid_from),
+    INDEX idx_key_to (activity_key, valid_to),
+    INDEX idx_registration_open (registration_id, valid_to)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Create a table to track scraping history
 CREATE TABLE scraping_history (
     id INT AUTO_INCREMENT PRIMARY KEY,
     scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    registration_id INT NULL,
     total_activities INT NOT NULL,
     status VARCHAR(50) NOT NULL,
     error_message TEXT,
+    page_hash CHAR(64) NULL,
+    data_hash CHAR(64) NULL,
+    INDEX idx_registration_status (registration_id, status),
+    INDEX idx_status (status),
     INDEX idx_scraped_at (scraped_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Aggregates of the activities table stored by every successful scrape, in the
+-- same transaction as its data (category '' holds the totals over all categories)
+CREATE TABLE activity_stats (
+    scrape_id INT NOT NULL,
+    category VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+    total_activities INT NOT NULL,
+    free_activities INT NOT NULL,
+    avg_cost DECIMAL(10, 2) NULL,
+    min_cost DECIMAL(10, 2) NULL,
+    max_cost DECIMAL(10, 2) NULL,
+    PRIMARY KEY (scrape_id, category)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Per-stage timings and counters of every run, stored after its scraping_history
+-- row (stage 'total' covers the whole run)
+CREATE TABLE scrape_stage_metrics (
+    scrape_id INT NOT NULL,
+    stage VARCHAR(32) NOT NULL,
+    wall_seconds DOUBLE NOT NULL,
+    cpu_seconds DOUBLE NOT NULL,
+    bytes_fetched BIGINT NOT NULL DEFAULT 0,
+    rows_parsed INT NOT NULL DEFAULT 0,
+    rows_written INT NOT NULL DEFAULT 0,
+    db_round_trips INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (scrape_id, stage),
+    INDEX idx_stage (stage, scrape_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -11,43 +11,366 @@ Requirements:
 
 import requests
 from bs4 import BeautifulSoup
-import mysql.connector
 from mysql.connector import Error
 import re
-from datetime import datetime
-from typing import List, Dict, Optional
+import argparse
+import sqlite3
+import hashlib
+import json
+import threading
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Iterable, Iterator, List, Dict, NamedTuple, Optional
+from urllib.parse import urlparse
 import os
 from dotenv import load_dotenv
 
+from activity import ACTIVITY_COLUMNS, ACTIVITY_FIELDS, DETAIL_FIELDS, Activity
+from daemon import STATUS_FILE, PollPolicy, ScraperDaemon, Window, check_status
+from database import DB_CONFIG, STATS_ALL_CATEGORIES, get_pool
+from http_cache import ResponseCache, TLS_UNVERIFIED, TLS_VERIFIED
+from http_retry import (CONNECT_TIMEOUT, READ_TIMEOUT, RETRY_STATUSES, CircuitBreaker, CircuitOpenError,
+                        RetryPolicy)
+from metrics import METRICS_FILE, PROMETHEUS_FILE, STAGE_FIELDS, RunMetrics, export_runs
+from page_archive import PageArchive
+from query_cache import publish_version
+from schedules import parse_date, parse_enrollment_window, parse_schedule_sessions, site_now
+from snapshot import SNAPSHOT_COLUMNS, SNAPSHOT_DIR, SNAPSHOT_GZIP, write_snapshot
+from stream_parser import iter_activity_rows, iter_file_chunks
+from versions import OPEN_VERSION_END, compact_versions, diff_versions, replay_snapshots
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # Optional C-backed parser backend
+    etree = None
+    lxml_html = None
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Database configuration
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'database': os.getenv('DB_NAME', 'fef_activities'),
-    'user': os.getenv('DB_USER', 'root'),
-    'password': os.getenv('DB_PASSWORD', ''),
-    'charset': 'utf8mb4',
-    'collation': 'utf8mb4_unicode_ci'
+# Target URLs
+REGISTRATIONS_URL = "https://sistemas.fef.unicamp.br/extensao/registrations/showOpenRegistrations"
+SCRAPER_URL = f"{REGISTRATIONS_URL}/26"
+
+DETAILS_URL = "https://sistemas.fef.unicamp.br/extensao/registrations/showOpenRegistrationsDetails"
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Crawl mode concurrency (see FEFActivityScraper.scrape_many)
+CRAWL_WORKERS = int(os.getenv('SCRAPER_CRAWL_WORKERS', '8'))
+PER_HOST_LIMIT = int(os.getenv('SCRAPER_PER_HOST_LIMIT', '4'))
+
+# Detail stage concurrency (see FEFActivityScraper.fetch_details)
+DETAIL_WORKERS = int(os.getenv('SCRAPER_DETAIL_WORKERS', '8'))
+
+# HTML parser backend for extract_activities: 'bs4' (BeautifulSoup) or 'lxml'
+PARSER_BACKENDS = ('bs4', 'lxml')
+PARSER_BACKEND = os.getenv('SCRAPER_PARSER', 'bs4')
+
+# Rows per multi-row INSERT statement
+BATCH_SIZE = int(os.getenv('SCRAPER_BATCH_SIZE', '500'))
+
+# Characters per chunk fed to the incremental parser in streaming mode
+STREAM_CHUNK_SIZE = int(os.getenv('SCRAPER_STREAM_CHUNK_SIZE', str(64 * 1024)))
+
+# ACTIVITY_FIELDS read from activities (alias a) joined with categories (alias c)
+_JOINED_FIELDS = ', '.join('c.name' if field == 'category' else f'a.{field}' for field in ACTIVITY_FIELDS)
+_CATEGORY_JOIN = "JOIN categories c ON c.id = a.category_id"
+
+_CATEGORY_INDEX = ACTIVITY_FIELDS.index('category')
+_COST_INDEX = ACTIVITY_FIELDS.index('cost')
+
+# Labels used on showOpenRegistrationsDetails pages for each of DETAIL_FIELDS,
+# accent-folded and lower-cased
+DETAIL_LABELS = {
+    'vacancies': ('vagas', 'numero de vagas'),
+    'location': ('local', 'localizacao'),
+    'instructor': ('professor', 'professora', 'professor(a)', 'professores', 'instrutor',
+                   'instrutora', 'responsavel', 'docente'),
 }
 
-# Target URL
-SCRAPER_URL = "https://sistemas.fef.unicamp.br/extensao/registrations/showOpenRegistrations/26"
+
+def registration_url(registration_id: int) -> str:
+    """Build the listing URL for a registration list ID"""
+    return f"{REGISTRATIONS_URL}/{registration_id}"
+
+
+def registration_id_from_url(url: str) -> Optional[int]:
+    """Extract the registration list ID from a listing URL, if present"""
+    match = re.search(r'/showOpenRegistrations/(\d+)', url)
+    return int(match.group(1)) if match else None
+
+
+def detail_url(detail_id: int) -> str:
+    """Build the details URL for an activity's detail ID"""
+    return f"{DETAILS_URL}/{detail_id}"
+
+
+def _fold_label(text: str) -> str:
+    """Lower-case a label and strip accents and the trailing colon"""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return text.strip().rstrip(':').strip().lower()
+
+
+def _match_detail_label(label: str) -> Optional[str]:
+    """Map a label from a detail page to the activity field it describes"""
+    folded = _fold_label(label)
+    if not folded or len(folded) > 40:
+        return None
+    first_word = folded.split()[0]
+    for field, labels in DETAIL_LABELS.items():
+        if folded in labels or first_word in labels:
+            return field
+    return None
+
+
+def parse_activity_details(html_content: str) -> Dict:
+    """
+    Extract per-class details from a showOpenRegistrationsDetails page
+    
+    The page is read as a sequence of text lines. A recognised label is
+    either followed by its value on the same line ("Vagas: 20") or by the
+    next non-empty line (label and value in separate cells).
+    
+    Args:
+        html_content: HTML content of the detail page
+        
+    Returns:
+        Dictionary with the vacancies, location and instructor found
+    """
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for tag in soup(['script', 'style']):
+        tag.decompose()
+    lines = [line.strip() for line in soup.get_text(separator='\n').splitlines()]
+    lines = [line for line in lines if line]
+    
+    details = {}
+    pending_field = None
+    for line in lines:
+        if pending_field:
+            if _match_detail_label(line) is None:
+                details.setdefault(pending_field, line)
+            pending_field = None
+            continue
+        
+        label, _, value = line.partition(':')
+        field = _match_detail_label(label)
+        if field is None:
+            continue
+        if value.strip():
+            details.setdefault(field, value.strip())
+        else:
+            pending_field = field
+    
+    if 'vacancies' in details:
+        match = re.search(r'\d+', details['vacancies'])
+        details['vacancies'] = int(match.group()) if match else None
+    for field in ('location', 'instructor'):
+        if field in details:
+            details[field] = details[field][:255]
+    
+    return details
+
+
+def activity_key(activity: Activity, registration_id: int = None) -> str:
+    """
+    Build the stable natural key of an activity
+    
+    The showOpenRegistrationsDetails ID identifies a class across runs. Rows
+    without one fall back to a hash of category and class name within their
+    registration list.
+    """
+    if activity.detail_id is not None:
+        return f"d:{activity.detail_id}"
+    name = f"{activity.category}\x1f{activity.class_name}"
+    digest = hashlib.sha1(name.encode('utf-8')).hexdigest()
+    return f"n:{registration_id if registration_id is not None else ''}:{digest}"
+
+
+def _normalized_values(values: tuple) -> tuple:
+    """Values in ACTIVITY_FIELDS order (e.g. a database row), normalized for comparison"""
+    cost = values[_COST_INDEX]
+    if cost is None:
+        return tuple(values)
+    return (tuple(values[:_COST_INDEX]) + (Decimal(str(cost)).quantize(Decimal('0.01')),)
+            + tuple(values[_COST_INDEX + 1:]))
+
+
+def _activity_values(activity: Activity) -> tuple:
+    """Values of ACTIVITY_FIELDS for an activity, normalized for comparison"""
+    return _normalized_values(activity.values())
+
+
+def _column_values(values: tuple, category_ids: Dict[str, int]) -> tuple:
+    """ACTIVITY_FIELDS values as ACTIVITY_COLUMNS values (category name replaced by its ID)"""
+    return values[:_CATEGORY_INDEX] + (category_ids[values[_CATEGORY_INDEX]],) + values[_CATEGORY_INDEX + 1:]
+
+
+if etree is not None:
+    # Compiled selectors mirroring the BeautifulSoup lookups in extract_activities
+    _XPATH_BORDERED_TABLES = etree.XPath("//table[contains(@class, 'table-bordered')]")
+    _XPATH_TABLES = etree.XPath("//table")
+    _XPATH_CATEGORY_CELL = etree.XPath("(.//td[contains(@style, '#153975')])[1]")
+    _XPATH_TBODIES = etree.XPath(".//tbody")
+    _XPATH_CENTERED_ROW = etree.XPath("(.//tr[contains(@class, 'text-center')])[1]")
+    _XPATH_FIRST_ROW = etree.XPath("(.//tr)[1]")
+    _XPATH_CELLS = etree.XPath(".//td")
+    _XPATH_TEXT = etree.XPath(".//text()")
+    _LXML_PARSER = lxml_html.HTMLParser(huge_tree=True)
+
+
+def _lxml_text(element, separator: str = '') -> str:
+    """Equivalent of BeautifulSoup's get_text(separator, strip=True) for lxml elements"""
+    parts = (text.strip() for text in _XPATH_TEXT(element))
+    return separator.join(part for part in parts if part)
+
+
+def unwrap_view_source(html_content: str) -> str:
+    """
+    Recover the original markup from a browser "view-source" dump
+    
+    atividades-fef-example.html was saved from the browser's source view, so
+    the listing markup is stored as escaped text inside <body id="viewsource">.
+    Pages that are not such dumps are returned unchanged.
+    """
+    if 'id="viewsource"' not in html_content[:4096]:
+        return html_content
+    return BeautifulSoup(html_content, 'html.parser').body.get_text()
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    """Split a list into consecutive chunks of at most ``size`` items"""
+    size = max(1, size)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def page_fingerprint(html_content: str) -> str:
+    """
+    Fingerprint a page ignoring whitespace-only differences
+    
+    Returns:
+        SHA-256 hex digest of the page with whitespace runs collapsed
+    """
+    normalized = re.sub(r'\s+', ' ', html_content).strip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def activities_fingerprint(activities: List[Activity]) -> str:
+    """
+    Fingerprint an extracted activity set independently of row order
+    
+    Returns:
+        SHA-256 hex digest of the canonical JSON form of the activities
+    """
+    rows = sorted(json.dumps(activity.as_dict(), sort_keys=True, ensure_ascii=False, default=str)
+                  for activity in activities)
+    return hashlib.sha256('\n'.join(rows).encode('utf-8')).hexdigest()
+
+
+def _counted_chunks(chunks: Iterable[str], stage: Dict) -> Iterator[str]:
+    """Pass text chunks through, adding their UTF-8 size to a stage's bytes_fetched"""
+    for chunk in chunks:
+        stage['bytes_fetched'] += len(chunk.encode('utf-8'))
+        yield chunk
+
+
+def _parse_archived_page(job: tuple) -> List[Activity]:
+    """Extract the activities of an archived page (runs in a backfill worker process)"""
+    archive_dir, sha256, parser = job
+    html_content = PageArchive(archive_dir).get(sha256)
+    scraper = FEFActivityScraper({}, use_cache=False, parser=parser, use_archive=False)
+    return scraper.extract_activities(unwrap_view_source(html_content), verbose=False)
+
+
+def parse_registration_ids(spec: str) -> List[int]:
+    """
+    Parse a registration ID specification
+    
+    Args:
+        spec: Comma separated IDs and inclusive ranges (e.g., "20-26,30")
+        
+    Returns:
+        Sorted list of unique registration IDs
+    """
+    ids = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+            if start > end:
+                start, end = end, start
+            ids.update(range(start, end + 1))
+        else:
+            ids.add(int(part))
+    return sorted(ids)
+
+
+class FetchResult(NamedTuple):
+    """Outcome of a page fetch"""
+    text: str
+    status_code: int
+    not_modified: bool = False
+    size: int = 0  # Bytes received (0 for a 304 answer)
 
 
 class FEFActivityScraper:
     """Scraper for FEF UNICAMP physical activities"""
     
-    def __init__(self, db_config: Dict):
-        """Initialize the scraper with database configuration"""
+    def __init__(self, db_config: Dict, use_cache: bool = True, full_reload: bool = False,
+                 parser: str = PARSER_BACKEND, metrics_file: Optional[str] = METRICS_FILE,
+                 prometheus_file: Optional[str] = PROMETHEUS_FILE, use_archive: bool = True,
+                 snapshot_dir: Optional[str] = SNAPSHOT_DIR):
+        """
+        Initialize the scraper with database configuration
+        
+        Args:
+            db_config: MySQL connection settings
+            use_cache: Whether to keep the on-disk HTTP response cache
+                       (conditional requests and remembered TLS mode)
+            full_reload: Replace each list's rows wholesale (atomic delete and
+                         batched insert) instead of the incremental sync
+            parser: HTML parser backend, 'bs4' or 'lxml' (falls back to
+                    'bs4' when lxml is not installed)
+            metrics_file: JSON-lines file to append each run's stage metrics to
+            prometheus_file: Prometheus textfile to write after each invocation
+            use_archive: Whether to keep every downloaded page in the page archive
+            snapshot_dir: Directory to write JSON snapshots for the PHP front end
+                          to after each successful run (None: no snapshots)
+        """
         self.db_config = db_config
         self.connection = None
+        self.full_reload = full_reload
+        self.parser = parser
+        self.response_cache = ResponseCache() if use_cache else None
+        self.archive = PageArchive() if use_archive else None
+        self.snapshot_dir = snapshot_dir
+        self.session = None
+        self._session_lock = threading.Lock()
+        self._host_limits = {}
+        self._host_limits_lock = threading.Lock()
+        self.retry_policy = RetryPolicy()
+        self._breakers = {}
+        self.metrics_file = metrics_file
+        self.prometheus_file = prometheus_file
+        # Metrics of the run being processed, and of every run of the current invocation
+        self.metrics = None
+        self.runs = []
         
     def connect_to_database(self) -> bool:
-        """Establish connection to MySQL database"""
+        """Check out a connection to the MySQL database from the shared pool"""
         try:
-            self.connection = mysql.connector.connect(**self.db_config)
+            self.connection = get_pool(self.db_config).get_connection()
             if self.connection.is_connected():
                 print(f"✓ Successfully connected to MySQL database: {self.db_config['database']}")
                 return True
@@ -57,48 +380,287 @@ class FEFActivityScraper:
         return False
     
     def close_connection(self):
-        """Close database connection"""
-        if self.connection and self.connection.is_connected():
+        """Return the database connection to the pool"""
+        if self.connection:
             self.connection.close()
+            self.connection = None
             print("✓ Database connection closed")
     
-    def fetch_webpage(self, url: str) -> Optional[str]:
+    def get_session(self) -> requests.Session:
         """
-        Fetch the webpage content
+        Get the shared HTTP session
+        
+        The session keeps connections alive between requests and its pool is
+        sized so every crawl or detail worker can hold its own connection.
+        """
+        with self._session_lock:
+            if self.session is None:
+                pool_size = max(CRAWL_WORKERS, DETAIL_WORKERS)
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+                self.session = requests.Session()
+                self.session.headers.update(REQUEST_HEADERS)
+                self.session.mount('https://', adapter)
+                self.session.mount('http://', adapter)
+            return self.session
+    
+    def close_session(self):
+        """Close the shared HTTP session"""
+        with self._session_lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+    
+    def _breaker(self, host: str) -> CircuitBreaker:
+        """Get the circuit breaker of a host"""
+        with self._host_limits_lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker()
+            return self._breakers[host]
+    
+    def _request(self, url: str, headers: Dict = None, verify: bool = True,
+                 stream: bool = False) -> requests.Response:
+        """
+        GET a URL over the shared session with retries and the host's circuit breaker
+        
+        Connection errors, timeouts and 5xx/429 answers are retried after a
+        jittered exponential backoff (at least the answer's Retry-After).
+        The last retryable answer is returned as is, so the caller's
+        raise_for_status() reports it. With ``stream`` only the request is
+        retried, not reading the body.
+        
+        Raises:
+            CircuitOpenError: If the host's circuit is open
+            requests.exceptions.SSLError: On certificate errors (not retried)
+            requests.exceptions.RequestException: If the last attempt fails
+        """
+        host = urlparse(url).netloc
+        breaker = self._breaker(host)
+        session = self.get_session()
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {host} after repeated failures")
+            try:
+                response = session.get(url, headers=headers, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                                       verify=verify, stream=stream)
+            except requests.exceptions.SSLError:
+                # The host answered; certificate handling is up to the caller
+                breaker.record_success()
+                raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                breaker.record_failure()
+                delay = self.retry_policy.delay(attempt)
+                if delay is None:
+                    raise
+                reason = type(e).__name__
+            except requests.exceptions.RequestException:
+                # The host answered (e.g. too many redirects); retrying will not help
+                breaker.record_success()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return response
+                breaker.record_failure()
+                delay = self.retry_policy.delay(attempt, response.headers.get('Retry-After'))
+                if delay is None:
+                    return response
+                response.close()
+                reason = f"Status {response.status_code}"
+            
+            attempt += 1
+            print(f"⚠ {reason} from {host}, retry {attempt}/{self.retry_policy.max_retries} "
+                  f"in {delay:.1f}s")
+            time.sleep(delay)
+    
+    def fetch(self, url: str, verbose: bool = True) -> Optional[FetchResult]:
+        """
+        Fetch a webpage, revalidating it against the response cache
+        
+        When the URL is cached, the request carries If-None-Match /
+        If-Modified-Since and a 304 answer returns the cached body with
+        ``not_modified`` set. A 304 without a cached body (e.g. the entry was
+        removed after the headers were built) is treated as a miss and the
+        page is requested again without validators. Hosts known to need ``verify=False`` skip the
+        verified attempt.
         
         Args:
             url: The URL to fetch
+            verbose: Whether to print progress messages (errors are always printed)
             
         Returns:
-            HTML content as string or None if failed
+            FetchResult or None if failed
         """
+        cache = self.response_cache
+        host = urlparse(url).netloc
+        headers = cache.conditional_headers(url) if cache else {}
+        # Note: verify=True is the default, but some sites may have certificate issues.
+        # Hosts that previously failed verification go straight to verify=False.
+        verify = not (cache and cache.get_tls_mode(host) == TLS_UNVERIFIED)
+        
         try:
-            print(f"Fetching webpage: {url}")
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            # Note: verify=True is the default, but some sites may have certificate issues
-            # If you encounter SSL errors, you can set verify=False (not recommended for production)
-            response = requests.get(url, headers=headers, timeout=30, verify=True)
+            if verbose:
+                print(f"Fetching webpage: {url}")
+            try:
+                response = self._request(url, headers, verify)
+            except requests.exceptions.SSLError:
+                if not verify:
+                    raise
+                if verbose:
+                    print("⚠ SSL Certificate error. Retrying without verification...")
+                verify = False
+                try:
+                    response = self._request(url, headers, verify=False)
+                except requests.exceptions.RequestException as e2:
+                    print(f"✗ Error fetching webpage even without SSL verification: {e2}")
+                    return None
+            
+            if cache:
+                cache.set_tls_mode(host, TLS_VERIFIED if verify else TLS_UNVERIFIED)
+            
+            if response.status_code == 304:
+                entry = cache.get(url) if cache else None
+                if entry:
+                    if verbose:
+                        print("✓ Webpage not modified since last fetch (Status: 304)")
+                    return FetchResult(entry['body'], 304, True)
+                # The cached body is gone (or was never sent for): a 304 has no body to store
+                if verbose:
+                    print("⚠ Not modified, but no cached copy. Fetching the full page...")
+                response = self._request(url, None, verify)
+                if response.status_code == 304:
+                    print("✗ Error fetching webpage: 304 Not Modified to an unconditional request")
+                    return None
+            
             response.raise_for_status()
             response.encoding = 'utf-8'
-            print(f"✓ Successfully fetched webpage (Status: {response.status_code})")
-            return response.text
-        except requests.exceptions.SSLError as e:
-            print(f"⚠ SSL Certificate error. Retrying without verification...")
-            try:
-                response = requests.get(url, headers=headers, timeout=30, verify=False)
-                response.raise_for_status()
-                response.encoding = 'utf-8'
+            if cache:
+                cache.put(url, response.text, response.headers.get('ETag'),
+                          response.headers.get('Last-Modified'))
+            if self.archive:
+                self._archive_page(url, response.text)
+            if verbose:
                 print(f"✓ Successfully fetched webpage (Status: {response.status_code})")
-                return response.text
-            except requests.exceptions.RequestException as e2:
-                print(f"✗ Error fetching webpage even without SSL verification: {e2}")
-                return None
+            return FetchResult(response.text, response.status_code, size=len(response.content))
         except requests.exceptions.RequestException as e:
             print(f"✗ Error fetching webpage: {e}")
             return None
     
+    def _archive_page(self, url: str, text: str):
+        """Keep a downloaded page in the archive (failures only print a warning)"""
+        try:
+            self.archive.put(url, text, registration_id_from_url(url), site_now())
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠ Warning: Could not archive {url}: {e}")
+    
+    def fetch_stream(self, url: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+        """
+        Stream a webpage as decoded text chunks
+        
+        The response body is never held in memory as a whole. Streaming
+        bypasses the response cache, since caching would need the full body.
+        
+        Args:
+            url: The URL to fetch
+            chunk_size: Bytes per chunk read from the connection
+            
+        Yields:
+            Text chunks of the page
+            
+        Raises:
+            requests.exceptions.RequestException: If the request fails
+        """
+        host = urlparse(url).netloc
+        verify = not (self.response_cache and self.response_cache.get_tls_mode(host) == TLS_UNVERIFIED)
+        print(f"Streaming webpage: {url}")
+        try:
+            response = self._request(url, verify=verify, stream=True)
+        except requests.exceptions.SSLError:
+            if not verify:
+                raise
+            print("⚠ SSL Certificate error. Retrying without verification...")
+            response = self._request(url, verify=False, stream=True)
+            if self.response_cache:
+                self.response_cache.set_tls_mode(host, TLS_UNVERIFIED)
+        
+        with response:
+            response.raise_for_status()
+            response.encoding = 'utf-8'
+            yield from response.iter_content(chunk_size=chunk_size, decode_unicode=True)
+    
+    def stream_activities(self, chunks: Iterable[str], verbose: bool = False) -> Iterator[Activity]:
+        """
+        Extract activities incrementally from text chunks of a listing
+        
+        Produces the same activities as extract_activities, one at a time.
+        
+        Args:
+            chunks: Text chunks of the page (see fetch_stream / iter_file_chunks)
+            verbose: Whether to print each extracted activity
+            
+        Yields:
+            Activity records
+        """
+        for row in iter_activity_rows(chunks):
+            activity = self._make_activity(*row)
+            if verbose:
+                print(f"  ✓ Extracted: {activity.category} - {activity.class_name}")
+            yield activity
+    
+    def fetch_webpage(self, url: str, verbose: bool = True) -> Optional[str]:
+        """
+        Fetch the webpage content
+        
+        Args:
+            url: The URL to fetch
+            verbose: Whether to print progress messages (errors are always printed)
+            
+        Returns:
+            HTML content as string or None if failed
+        """
+        result = self.fetch(url, verbose)
+        return result.text if result else None
+    
+    def _host_semaphore(self, url: str, limit: int) -> threading.BoundedSemaphore:
+        """Get the semaphore capping concurrent requests to the URL's host"""
+        host = urlparse(url).netloc
+        with self._host_limits_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(limit)
+            return self._host_limits[host]
+    
+    def _fetch_limited(self, url: str, per_host_limit: int,
+                       metrics: RunMetrics = None) -> Optional[FetchResult]:
+        """Fetch a webpage while respecting the per-host concurrency cap"""
+        with self._host_semaphore(url, per_host_limit):
+            return self._fetch_measured(url, metrics)
+    
+    def _fetch_measured(self, url: str, metrics: RunMetrics = None) -> Optional[FetchResult]:
+        """Fetch a webpage as the 'fetch' stage of a run (default: the current run)"""
+        with self._stage('fetch', metrics, count_db=False) as stage:
+            result = self.fetch(url)
+            stage['bytes_fetched'] += result.size if result else 0
+        return result
+    
+    def _round_trips(self) -> int:
+        return getattr(self.connection, 'round_trips', 0)
+    
+    def _stage(self, name: str, metrics: RunMetrics = None, count_db: bool = True):
+        """
+        Time a stage of a run (see RunMetrics.stage)
+        
+        Args:
+            name: Stage name
+            metrics: Run to record into (default: the current run; without
+                     one the stage is not recorded)
+            count_db: Whether to count database round trips (only safe on
+                      the thread that owns the connection)
+        """
+        metrics = metrics or self.metrics
+        if metrics is None:
+            return nullcontext({})
+        return metrics.stage(name, self._round_trips if count_db else None)
+    
     def parse_schedule(self, schedule_text: str) -> str:
         """
         Parse and clean schedule text
@@ -134,18 +696,9 @@ class FEFActivityScraper:
         except ValueError:
             return 0.0
     
-    def extract_activities(self, html_content: str) -> List[Dict]:
-        """
-        Extract activity information from HTML content
-        
-        Args:
-            html_content: HTML content of the webpage
-            
-        Returns:
-            List of dictionaries containing activity information
-        """
+    def _extract_rows_bs4(self, html_content: str) -> Iterable[tuple]:
+        """Yield raw activity rows using BeautifulSoup and html.parser"""
         soup = BeautifulSoup(html_content, 'html.parser')
-        activities = []
         
         # Find all tables - handle both direct tables and tables with Bootstrap classes
         tables = soup.find_all('table', class_=lambda c: c and 'table-bordered' in c if c else False)
@@ -179,38 +732,168 @@ class FEFActivityScraper:
                 tds = tr.find_all('td')
                 
                 if len(tds) >= 4:
-                    # Extract data from each column
-                    class_name = tds[0].get_text(strip=True)
-                    schedule_html = str(tds[1])
-                    schedule = self.parse_schedule(tds[1].get_text(separator=' ', strip=True))
-                    cost_text = tds[2].get_text(strip=True)
-                    cost = self.parse_cost(cost_text)
-                    enrollment_deadline = tds[3].get_text(strip=True)
-                    
-                    activity = {
-                        'category': category,
-                        'class_name': class_name,
-                        'schedule': schedule,
-                        'cost': cost,
-                        'enrollment_deadline': enrollment_deadline
-                    }
-                    
-                    activities.append(activity)
-                    print(f"  ✓ Extracted: {category} - {class_name}")
+                    yield (category,
+                           tds[0].get_text(strip=True),
+                           tds[1].get_text(separator=' ', strip=True),
+                           tds[2].get_text(strip=True),
+                           tds[3].get_text(strip=True),
+                           tr.get('onclick', ''))
+    
+    def _extract_rows_lxml(self, html_content: str) -> Iterable[tuple]:
+        """Yield raw activity rows using lxml and precompiled XPath selectors"""
+        if not html_content.strip():
+            return
+        # huge_tree lifts libxml2's depth and text size limits for archive-sized pages
+        try:
+            document = lxml_html.document_fromstring(html_content, parser=_LXML_PARSER)
+        except ValueError:
+            # lxml refuses str input carrying an XML encoding declaration
+            document = lxml_html.document_fromstring(
+                html_content.encode('utf-8'),
+                parser=lxml_html.HTMLParser(encoding='utf-8', huge_tree=True))
+        
+        tables = _XPATH_BORDERED_TABLES(document) or _XPATH_TABLES(document)
+        
+        for table in tables:
+            category_cells = _XPATH_CATEGORY_CELL(table)
+            if not category_cells:
+                continue
+            category = _lxml_text(category_cells[0])
+            
+            for tbody in _XPATH_TBODIES(table):
+                rows = _XPATH_CENTERED_ROW(tbody) or _XPATH_FIRST_ROW(tbody)
+                if not rows:
+                    continue
+                tr = rows[0]
+                
+                tds = _XPATH_CELLS(tr)
+                if len(tds) >= 4:
+                    yield (category,
+                           _lxml_text(tds[0]),
+                           _lxml_text(tds[1], ' '),
+                           _lxml_text(tds[2]),
+                           _lxml_text(tds[3]),
+                           tr.get('onclick', ''))
+    
+    def _make_activity(self, category: str, class_name: str, schedule_text: str, cost_text: str,
+                       enrollment_deadline: str, onclick: str) -> Activity:
+        """Build an activity record from the raw text of a listing row"""
+        # The row links to its details page via onClick="goToURL('.../<id>')"
+        detail_match = re.search(r'showOpenRegistrationsDetails/(\d+)', onclick or '')
+        opens_at, closes_at = parse_enrollment_window(enrollment_deadline)
+        
+        return Activity(category, class_name, self.parse_schedule(schedule_text), self.parse_cost(cost_text),
+                        enrollment_deadline, opens_at, closes_at,
+                        int(detail_match.group(1)) if detail_match else None)
+    
+    def extract_activities(self, html_content: str, parser: str = None,
+                           verbose: bool = True) -> List[Activity]:
+        """
+        Extract activity information from HTML content
+        
+        Args:
+            html_content: HTML content of the webpage
+            parser: Parser backend override ('bs4' or 'lxml'); both produce
+                    identical output
+            verbose: Whether to print each extracted activity
+            
+        Returns:
+            List of activity records
+        """
+        parser = parser or self.parser
+        if parser not in PARSER_BACKENDS:
+            raise ValueError(f"Unknown parser backend: {parser}")
+        if parser == 'lxml' and lxml_html is None:
+            print("⚠ lxml is not installed, falling back to BeautifulSoup")
+            parser = 'bs4'
+        
+        rows = self._extract_rows_lxml(html_content) if parser == 'lxml' \
+            else self._extract_rows_bs4(html_content)
+        
+        activities = []
+        for row in rows:
+            activity = self._make_activity(*row)
+            activities.append(activity)
+            if verbose:
+                print(f"  ✓ Extracted: {activity.category} - {activity.class_name}")
         
         return activities
     
-    def clear_existing_data(self) -> bool:
+    def fetch_details(self, activities: List[Activity], max_workers: int = DETAIL_WORKERS,
+                      per_host_limit: int = PER_HOST_LIMIT) -> int:
+        """
+        Fetch the details page of each activity and merge its data into the row
+        
+        Pages are fetched concurrently over the shared keep-alive session,
+        sharing the per-host cap of crawl mode (the cap of whichever run
+        first contacted the host applies).
+        Only DETAIL_FIELDS are merged. Activities without a detail ID, or
+        whose page fails to load, are left with those fields empty.
+        
+        Args:
+            activities: List of activity records (updated in place)
+            max_workers: Number of concurrent detail requests
+            per_host_limit: Maximum concurrent requests per host
+            
+        Returns:
+            Number of activities enriched with details
+        """
+        detail_ids = sorted({a.detail_id for a in activities if a.detail_id is not None})
+        if not detail_ids:
+            print("⚠ No detail links found")
+            return 0
+        
+        print(f"\nFetching {len(detail_ids)} detail pages with {max_workers} workers...")
+        
+        def fetch_one(detail_id):
+            url = detail_url(detail_id)
+            with self._host_semaphore(url, max(1, per_host_limit)):
+                html_content = self.fetch_webpage(url, verbose=False)
+            return parse_activity_details(html_content) if html_content else None
+        
+        details_by_id = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {executor.submit(fetch_one, detail_id): detail_id for detail_id in detail_ids}
+            for future in as_completed(futures):
+                try:
+                    details = future.result()
+                except Exception as e:
+                    print(f"✗ Error parsing details {futures[future]}: {e}")
+                    continue
+                if details:
+                    details_by_id[futures[future]] = details
+        
+        enriched = 0
+        for activity in activities:
+            details = details_by_id.get(activity.detail_id)
+            if details:
+                activity.update({field: details[field] for field in DETAIL_FIELDS if field in details})
+                enriched += 1
+        
+        print(f"✓ Fetched details for {len(details_by_id)}/{len(detail_ids)} pages")
+        return enriched
+    
+    def clear_existing_data(self, registration_id: int = None, commit: bool = True) -> bool:
         """
         Clear existing data from the activities table
         
+        Args:
+            registration_id: Only clear activities from this registration list
+                             (default: clear everything)
+            commit: Whether to commit right away (False leaves the delete
+                    pending in the current transaction)
+        
         Returns:
             True if successful, False otherwise
         """
         try:
             cursor = self.connection.cursor()
-            cursor.execute("DELETE FROM activities")
-            self.connection.commit()
+            if registration_id is None:
+                cursor.execute("DELETE FROM activities")
+            else:
+                cursor.execute("DELETE FROM activities WHERE registration_id = %s", (registration_id,))
+            if commit:
+                self.connection.commit()
             deleted_count = cursor.rowcount
             cursor.close()
             print(f"✓ Cleared {deleted_count} existing records from database")
@@ -219,150 +902,1326 @@ class FEFActivityScraper:
             print(f"✗ Error clearing existing data: {e}")
             return False
     
-    def save_to_database(self, activities: List[Dict]) -> bool:
+    def _category_ids(self, cursor, names: Iterable[str],
+                      known: Dict[str, int] = None) -> Dict[str, int]:
         """
-        Save activities to MySQL database
+        Look up category IDs, adding the categories not stored yet
         
         Args:
-            activities: List of activity dictionaries
+            cursor: Cursor to execute on (inside the caller's transaction)
+            names: Category names that must have an ID
+            known: Result of an earlier call in the same transaction; it is
+                   extended in place instead of reading the table again
             
         Returns:
-            True if successful, False otherwise
+            IDs of every stored category by name (not only ``names``)
         """
-        if not activities:
-            print("⚠ No activities to save")
-            return False
+        if known is None:
+            cursor.execute("SELECT name, id FROM categories")
+            ids = dict(cursor.fetchall())
+        else:
+            ids = known
+        for name in sorted(set(names) - ids.keys()):
+            cursor.execute("INSERT INTO categories (name) VALUES (%s)", (name,))
+            ids[name] = cursor.lastrowid
+        return ids
+    
+    def _insert_batch(self, cursor, batch: List[Activity], category_ids: Dict[str, int],
+                      registration_id: int = None, upsert: bool = False):
+        """
+        Insert a batch of activities with one multi-row INSERT statement
+        
+        Args:
+            cursor: Cursor to execute on
+            batch: Activities to insert
+            category_ids: Category IDs loaded once per transaction (see _category_ids);
+                          categories new to it are added
+            registration_id: Registration list the activities were scraped from
+            upsert: Overwrite rows whose activity_key already exists
+        """
+        columns = ('registration_id', 'activity_key') + ACTIVITY_COLUMNS
+        row_placeholder = f"({', '.join(['%s'] * len(columns))})"
+        self._category_ids(cursor, {activity.category for activity in batch}, category_ids)
+        params = []
+        for activity in batch:
+            params.extend((registration_id, activity_key(activity, registration_id))
+                          + _column_values(_activity_values(activity), category_ids))
+        query = f"""
+            INSERT INTO activities 
+            ({', '.join(columns)})
+            VALUES {', '.join([row_placeholder] * len(batch))}
+        """
+        if upsert:
+            query += f"""
+            ON DUPLICATE KEY UPDATE
+            {', '.join(f'{column} = VALUES({column})' for column in columns)}
+            """
+        cursor.execute(query, params)
+    
+    def _write_sessions(self, cursor, schedules: Dict[str, str]):
+        """
+        Rebuild the activity_sessions rows of some activities
+        
+        Args:
+            cursor: Cursor to execute on (inside the caller's transaction)
+            schedules: Schedule text by activity_key of rows just written
+        """
+        for keys in _chunks(list(schedules), BATCH_SIZE):
+            cursor.execute(
+                f"SELECT id, activity_key FROM activities WHERE activity_key IN ({', '.join(['%s'] * len(keys))})",
+                tuple(keys))
+            ids = {key: row_id for row_id, key in cursor.fetchall()}
+            if not ids:
+                continue
+            cursor.execute(
+                f"DELETE FROM activity_sessions WHERE activity_id IN ({', '.join(['%s'] * len(ids))})",
+                tuple(ids.values()))
+            params = []
+            for key, row_id in ids.items():
+                for session in parse_schedule_sessions(schedules[key]):
+                    params.extend((row_id,) + session)
+            if params:
+                cursor.execute(f"""
+                    INSERT INTO activity_sessions (activity_id, weekday, start_minute, end_minute)
+                    VALUES {', '.join(['(%s, %s, %s, %s)'] * (len(params) // 4))}
+                """, params)
+    
+    def rebuild_sessions(self) -> bool:
+        """
+        Re-parse the schedule of every stored activity into activity_sessions
+        
+        Needed once after adding the activity_sessions table, since unchanged
+        rows are not rewritten by later scrapes.
         
+        Returns:
+            True if successful, False otherwise
+        """
         try:
             cursor = self.connection.cursor()
-            
-            insert_query = """
-                INSERT INTO activities 
-                (category, class_name, schedule, cost, enrollment_deadline)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            
-            for activity in activities:
-                cursor.execute(insert_query, (
-                    activity['category'],
-                    activity['class_name'],
-                    activity['schedule'],
-                    activity['cost'],
-                    activity['enrollment_deadline']
-                ))
-            
+            cursor.execute("SELECT activity_key, schedule FROM activities")
+            schedules = dict(cursor.fetchall())
+            self._write_sessions(cursor, schedules)
             self.connection.commit()
-            print(f"✓ Successfully saved {len(activities)} activities to database")
             cursor.close()
+            print(f"✓ Rebuilt schedule sessions of {len(schedules)} activities")
             return True
-            
         except Error as e:
-            print(f"✗ Error saving to database: {e}")
+            print(f"✗ Error rebuilding schedule sessions: {e}")
             self.connection.rollback()
             return False
     
-    def log_scraping_history(self, total_activities: int, status: str, error_message: str = None) -> bool:
+    def _write_versions(self, cursor, incoming: Dict[str, tuple], registration_id: int = None,
+                        delete_missing: bool = True) -> Dict[str, int]:
         """
-        Log scraping attempt to history table
+        Record the activities whose values changed in activity_versions
+        
+        The current version of every new or changed activity ends now and a
+        new one starts; unchanged activities are not touched.
         
         Args:
-            total_activities: Number of activities scraped
-            status: Status of the scraping (success/failure)
-            error_message: Optional error message
+            cursor: Cursor to execute on (inside the caller's transaction)
+            incoming: Values of ACTIVITY_FIELDS by activity_key (see _activity_values)
+            registration_id: Registration list the activities were scraped from
+            delete_missing: Whether the list's activities missing from ``incoming`` end
+                            (without it only the versions of ``incoming`` are read)
             
+        Returns:
+            Dictionary with opened/closed version counts
+        """
+        query = f"""
+            SELECT activity_key, {', '.join(ACTIVITY_FIELDS)}
+            FROM activity_versions
+            WHERE registration_id <=> %s AND valid_to = %s
+        """
+        if delete_missing:
+            cursor.execute(query, (registration_id, OPEN_VERSION_END))
+            rows = cursor.fetchall()
+        else:
+            rows = []
+            for keys in _chunks(list(incoming), BATCH_SIZE):
+                cursor.execute(query + f" AND activity_key IN ({', '.join(['%s'] * len(keys))})",
+                               (registration_id, OPEN_VERSION_END) + tuple(keys))
+                rows.extend(cursor.fetchall())
+        current = {row[0]: _normalized_values(row[1:]) for row in rows}
+        changed, removed = diff_versions(current, incoming, delete_missing)
+        now = site_now().replace(microsecond=0)
+        
+        self._end_versions(cursor, changed + removed, now)
+        
+        columns = ('activity_key', 'registration_id') + ACTIVITY_FIELDS + ('valid_from', 'valid_to')
+        row_placeholder = f"({', '.join(['%s'] * len(columns))})"
+        for keys in _chunks(changed, BATCH_SIZE):
+            params = []
+            for key in keys:
+                params.extend((key, registration_id) + incoming[key] + (now, OPEN_VERSION_END))
+            cursor.execute(f"""
+                INSERT INTO activity_versions ({', '.join(columns)})
+                VALUES {', '.join([row_placeholder] * len(keys))}
+            """, params)
+        
+        if changed or removed:
+            print(f"✓ Recorded {len(changed)} new activity versions, {len(removed)} ended")
+        return {'opened': len(changed), 'closed': len(removed)}
+    
+    def _end_versions(self, cursor, keys: List[str], now: datetime):
+        """
+        End the current versions of some activities
+        
+        Also ends versions a moved activity still has under another list.
+        """
+        for chunk in _chunks(keys, BATCH_SIZE):
+            cursor.execute(f"""
+                UPDATE activity_versions SET valid_to = %s
+                WHERE valid_to = %s AND activity_key IN ({', '.join(['%s'] * len(chunk))})
+            """, (now, OPEN_VERSION_END) + tuple(chunk))
+    
+    def init_versions(self) -> bool:
+        """
+        Record versions for stored activities that have no current version yet
+        
+        Needed once after adding the activity_versions table, since scrapes
+        of unchanged pages do not write. Safe to run again.
+        
         Returns:
             True if successful, False otherwise
         """
         try:
             cursor = self.connection.cursor()
-            insert_query = """
-                INSERT INTO scraping_history 
-                (total_activities, status, error_message)
-                VALUES (%s, %s, %s)
-            """
-            cursor.execute(insert_query, (total_activities, status, error_message))
+            cursor.execute(f"SELECT a.registration_id, a.activity_key, {_JOINED_FIELDS} FROM activities a {_CATEGORY_JOIN}")
+            by_list = {}
+            for row in cursor.fetchall():
+                by_list.setdefault(row[0], {})[row[1]] = _normalized_values(row[2:])
+            opened = sum(self._write_versions(cursor, incoming, registration_id)['opened']
+                         for registration_id, incoming in by_list.items())
             self.connection.commit()
             cursor.close()
+            print(f"✓ Versions initialized: {opened} opened for {sum(map(len, by_list.values()))} activities")
             return True
         except Error as e:
-            print(f"⚠ Warning: Could not log scraping history: {e}")
+            print(f"✗ Error initializing activity versions: {e}")
+            self.connection.rollback()
             return False
     
-    def scrape(self, url: str = None, clear_existing: bool = True) -> bool:
+    def compact_history(self) -> bool:
         """
-        Main scraping method
+        Merge redundant rows of activity_versions
+        
+        Drops zero-length versions and folds versions that repeat their
+        predecessor's values into it (see versions.compact_versions).
         
-        Args:
-            url: URL to scrape (default: SCRAPER_URL)
-            clear_existing: Whether to clear existing data before inserting new data
-            
         Returns:
             True if successful, False otherwise
         """
-        if url is None:
-            url = SCRAPER_URL
-        
-        print("="*60)
-        print("FEF UNICAMP Activities Scraper")
-        print("="*60)
-        
-        # Connect to database
-        if not self.connect_to_database():
-            return False
-        
         try:
-            # Fetch webpage
-            html_content = self.fetch_webpage(url)
-            if not html_content:
-                self.log_scraping_history(0, 'failure', 'Failed to fetch webpage')
-                return False
-            
-            # Extract activities
-            print("\nExtracting activities...")
-            activities = self.extract_activities(html_content)
+            cursor = self.connection.cursor()
+            cursor.execute(f"""
+                SELECT id, activity_key, valid_from, valid_to, {', '.join(ACTIVITY_FIELDS)}
+                FROM activity_versions
+                ORDER BY activity_key, valid_from, id
+            """)
+            rows = [row[:4] + (_normalized_values(row[4:]),) for row in cursor.fetchall()]
+            extend, delete = compact_versions(rows)
+            if extend:
+                cursor.executemany("UPDATE activity_versions SET valid_to = %s WHERE id = %s",
+                                   [(valid_to, row_id) for row_id, valid_to in extend])
+            for ids in _chunks(delete, BATCH_SIZE):
+                cursor.execute(f"DELETE FROM activity_versions WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                               tuple(ids))
+            self.connection.commit()
+            cursor.close()
+            print(f"✓ Compacted activity history: {len(delete)} of {len(rows)} versions removed")
+            return True
+        except Error as e:
+            print(f"✗ Error compacting activity history: {e}")
+            self.connection.rollback()
+            return False
+    
+    def backfill(self, since: datetime = None, max_workers: int = None) -> bool:
+        """
+        Rebuild activity_versions by re-parsing archived listing pages
+        
+        Each distinct archived page is parsed once, in a process pool using
+        every core. The pages of each registration list are then replayed in
+        fetch order (see versions.replay_snapshots) and the list's history
+        from its first replayed fetch on is replaced with the result using
+        multi-row inserts, all in one transaction. Versions that started
+        earlier are cut at that point, and compact_history merges the seams.
+        Detail fields (vacancies, location, instructor) are not archived with
+        the listing and stay empty in replayed versions.
+        
+        Args:
+            since: Only replay fetches from this time on (site-local)
+            max_workers: Worker processes (default: one per core)
             
+        Returns:
+            True if successful, False otherwise
+        """
+        archive = self.archive or PageArchive()
+        pages = archive.pages(listings_only=True, since=since)
+        if not pages:
+            print("⚠ No archived listing pages to backfill from")
+            return False
+        
+        addresses = sorted({page.sha256 for page in pages})
+        workers = max_workers or os.cpu_count() or 1
+        print(f"Re-parsing {len(addresses)} distinct pages of {len(pages)} archived fetches "
+              f"with {workers} processes...")
+        jobs = [(archive.archive_dir, sha256, self.parser) for sha256 in addresses]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = dict(zip(addresses, executor.map(_parse_archived_page, jobs,
+                                                      chunksize=max(1, len(jobs) // (workers * 4)))))
+        
+        snapshots_by_list = {}
+        for page in pages:
+            activities = parsed[page.sha256]
             if not activities:
+                # Error pages and empty listings say nothing about the classes
+                continue
+            snapshot = {activity_key(activity, page.registration_id): _activity_values(activity)
+                        for activity in activities}
+            snapshots_by_list.setdefault(page.registration_id, []).append((page.fetched_at, snapshot))
+        
+        columns = ('activity_key', 'registration_id') + ACTIVITY_FIELDS + ('valid_from', 'valid_to')
+        row_placeholder = f"({', '.join(['%s'] * len(columns))})"
+        try:
+            cursor = self.connection.cursor()
+            total = 0
+            for registration_id, snapshots in snapshots_by_list.items():
+                start = snapshots[0][0]
+                cursor.execute("""
+                    UPDATE activity_versions SET valid_to = %s
+                    WHERE registration_id <=> %s AND valid_from < %s AND valid_to > %s
+                """, (start, registration_id, start, start))
+                cursor.execute("DELETE FROM activity_versions WHERE registration_id <=> %s AND valid_from >= %s",
+                               (registration_id, start))
+                history = replay_snapshots(snapshots)
+                for batch in _chunks(history, BATCH_SIZE):
+                    params = []
+                    for key, values, valid_from, valid_to in batch:
+                        params.extend((key, registration_id) + values + (valid_from, valid_to))
+                    cursor.execute(f"""
+                        INSERT INTO activity_versions ({', '.join(columns)})
+                        VALUES {', '.join([row_placeholder] * len(batch))}
+                    """, params)
+                total += len(history)
+                print(f"  ✓ Registration list {registration_id}: {len(snapshots)} snapshots, "
+                      f"{len(history)} versions")
+            self.connection.commit()
+            cursor.close()
+        except Error as e:
+            print(f"✗ Error loading backfilled versions: {e}")
+            self.connection.rollback()
+            return False
+        
+        print(f"✓ Backfilled {total} versions of {len(snapshots_by_list)} registration lists")
+        return self.compact_history()
+    
+    def save_to_database(self, activities: List[Activity], registration_id: int = None,
+                         batch_size: int = BATCH_SIZE, commit: bool = True) -> bool:
+        """
+        Save activities to MySQL database
+        
+        Rows are written with multi-row INSERT statements of up to
+        ``batch_size`` rows each.
+        
+        Args:
+            activities: List of activity records
+            registration_id: Registration list the activities were scraped from
+            batch_size: Rows per INSERT statement
+            commit: Whether to commit right away (False leaves the inserts
+                    pending in the current transaction)
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not activities:
+            print("⚠ No activities to save")
+            return False
+        
+        try:
+            cursor = self.connection.cursor()
+            category_ids = self._category_ids(cursor, {activity.category for activity in activities})
+            
+            for batch in _chunks(activities, batch_size):
+                self._insert_batch(cursor, batch, category_ids, registration_id)
+                self._write_sessions(cursor, {activity_key(activity, registration_id): activity.schedule
+                                              for activity in batch})
+            
+            if commit:
+                self.connection.commit()
+            print(f"✓ Successfully saved {len(activities)} activities to database")
+            cursor.close()
+            return True
+            
+        except Error as e:
+            print(f"✗ Error saving to database: {e}")
+            self.connection.rollback()
+            return False
+    
+    def replace_activities(self, activities: List[Activity], registration_id: int = None,
+                           batch_size: int = BATCH_SIZE, commit: bool = True) -> bool:
+        """
+        Atomically replace a registration list's activities
+        
+        The delete, the batched inserts and the activity_versions update run
+        in one transaction, so a failed insert rolls back to the previous
+        rows instead of leaving the table empty, and readers never see the
+        intermediate state.
+        
+        Args:
+            activities: List of activity records
+            registration_id: Registration list the activities were scraped from
+            batch_size: Rows per INSERT statement
+            commit: Whether to commit right away (False leaves the transaction
+                    open so more writes can join it)
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.clear_existing_data(registration_id, commit=False):
+            self.connection.rollback()
+            return False
+        if not self.save_to_database(activities, registration_id, batch_size, commit=False):
+            return False
+        try:
+            cursor = self.connection.cursor()
+            self._write_versions(cursor, {activity_key(activity, registration_id): _activity_values(activity)
+                                          for activity in activities}, registration_id)
+            cursor.close()
+            if commit:
+                self.connection.commit()
+            return True
+        except Error as e:
+            print(f"✗ Error committing activities: {e}")
+            self.connection.rollback()
+            return False
+    
+    def save_activity_stream(self, activities: Iterable[Activity], registration_id: int = None,
+                             batch_size: int = BATCH_SIZE, commit: bool = True) -> Optional[int]:
+        """
+        Synchronize a registration list's activities from a stream
+        
+        Activities are consumed lazily and upserted on their activity_key in
+        batches, so only one batch (and the keys seen so far) is held in
+        memory at a time and row IDs stay stable like with sync_activities.
+        Rows missing from the stream are deleted at the end; every batch, the
+        delete and the activity_versions update run in one transaction. When
+        the same activity appears more than once (for example in
+        concatenated snapshots) the last occurrence wins.
+        
+        Args:
+            activities: Iterable of activity records
+            registration_id: Registration list the activities were scraped from
+            batch_size: Rows per INSERT statement
+            commit: Whether to commit right away (False leaves the transaction open)
+            
+        Returns:
+            Number of activities written, or None if failed
+        """
+        try:
+            cursor = self.connection.cursor()
+            category_ids = self._category_ids(cursor, ())
+            total = 0
+            seen = set()
+            batch = []
+            for activity in activities:
+                batch.append(activity)
+                if len(batch) >= batch_size:
+                    self._write_stream_batch(cursor, batch, registration_id, seen, category_ids)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                self._write_stream_batch(cursor, batch, registration_id, seen, category_ids)
+                total += len(batch)
+            
+            if not total:
                 print("⚠ No activities found")
-                self.log_scraping_history(0, 'failure', 'No activities found in webpage')
-                return False
+                self.connection.rollback()
+                cursor.close()
+                return None
+            
+            # Rows no longer listed go (of every list without a registration ID);
+            # their sessions go with them (ON DELETE CASCADE)
+            if registration_id is None:
+                cursor.execute("SELECT id, activity_key FROM activities")
+            else:
+                cursor.execute("SELECT id, activity_key FROM activities WHERE registration_id = %s",
+                               (registration_id,))
+            missing = [row_id for row_id, key in cursor.fetchall() if key not in seen]
+            for ids in _chunks(missing, BATCH_SIZE):
+                cursor.execute(f"DELETE FROM activities WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                               tuple(ids))
+            if missing:
+                print(f"✓ Deleted {len(missing)} activities no longer listed")
+            
+            # Their versions end, scoped the same way
+            if registration_id is None:
+                cursor.execute("SELECT activity_key FROM activity_versions WHERE valid_to = %s",
+                               (OPEN_VERSION_END,))
+            else:
+                cursor.execute("""
+                    SELECT activity_key FROM activity_versions
+                    WHERE registration_id = %s AND valid_to = %s
+                """, (registration_id, OPEN_VERSION_END))
+            removed = [key for (key,) in cursor.fetchall() if key not in seen]
+            self._end_versions(cursor, removed, site_now().replace(microsecond=0))
+            if removed:
+                print(f"✓ Ended {len(removed)} activity versions")
+            
+            if commit:
+                self.connection.commit()
+            cursor.close()
+            print(f"✓ Streamed {total} activities into database")
+            return total
+        except Error as e:
+            print(f"✗ Error saving streamed activities: {e}")
+            self.connection.rollback()
+            return None
+    
+    def _write_stream_batch(self, cursor, batch: List[Activity], registration_id: int, seen: set,
+                            category_ids: Dict[str, int]):
+        """Upsert one batch of save_activity_stream with its sessions and versions"""
+        by_key = {activity_key(activity, registration_id): activity for activity in batch}
+        values = {key: _activity_values(activity) for key, activity in by_key.items()}
+        self._insert_batch(cursor, batch, category_ids, registration_id, upsert=True)
+        self._write_sessions(cursor, {key: activity.schedule for key, activity in by_key.items()})
+        self._write_versions(cursor, values, registration_id, delete_missing=False)
+        seen.update(values)
+    
+    def sync_activities(self, activities: List[Activity], registration_id: int = None,
+                        delete_missing: bool = True, commit: bool = True) -> Optional[Dict[str, int]]:
+        """
+        Synchronize the activities table with a freshly scraped list
+        
+        Rows are matched on their natural key (see activity_key). Only new
+        rows are inserted, only rows whose values changed are updated and only
+        rows that vanished from the page are deleted, all in one transaction,
+        so row IDs stay stable and readers never see a partial table. The same
+        changes are recorded in activity_versions.
+        
+        Args:
+            activities: List of activity records
+            registration_id: Registration list the activities were scraped from
+            delete_missing: Whether to delete rows no longer on the page
+            commit: Whether to commit right away (False leaves the transaction open)
+            
+        Returns:
+            Dictionary with inserted/updated/deleted/unchanged counts, or None if failed
+        """
+        if not activities:
+            print("⚠ No activities to save")
+            return None
+        
+        incoming = {}
+        for activity in activities:
+            key = activity_key(activity, registration_id)
+            if key in incoming:
+                print(f"⚠ Duplicate activity skipped: {activity.category} - {activity.class_name}")
+                continue
+            incoming[key] = _activity_values(activity)
+        
+        try:
+            cursor = self.connection.cursor()
             
-            print(f"\n✓ Total activities extracted: {len(activities)}")
+            category_ids = self._category_ids(cursor, {values[_CATEGORY_INDEX] for values in incoming.values()})
+            category_names = {category_id: name for name, category_id in category_ids.items()}
             
-            # Clear existing data if requested
-            if clear_existing:
-                print("\nClearing existing data...")
-                self.clear_existing_data()
+            # Lock this list's rows so the diff cannot race another writer
+            cursor.execute(f"""
+                SELECT id, activity_key, {', '.join(ACTIVITY_COLUMNS)}
+                FROM activities
+                WHERE registration_id <=> %s
+                FOR UPDATE
+            """, (registration_id,))
+            existing = {}
+            for row in cursor.fetchall():
+                values = row[2:2 + _CATEGORY_INDEX] + (category_names[row[2 + _CATEGORY_INDEX]],) \
+                    + row[3 + _CATEGORY_INDEX:]
+                existing[row[1]] = (row[0], _normalized_values(values))
+            
+            to_insert = [(registration_id, key) + _column_values(values, category_ids)
+                         for key, values in incoming.items() if key not in existing]
+            to_update = [_column_values(values, category_ids) + (existing[key][0],)
+                         for key, values in incoming.items()
+                         if key in existing and existing[key][1] != values]
+            to_delete = [row_id for key, (row_id, _) in existing.items()
+                         if key not in incoming] if delete_missing else []
+            
+            # A key may already exist under another registration list; take it over
+            insert_query = f"""
+                INSERT INTO activities
+                (registration_id, activity_key, {', '.join(ACTIVITY_COLUMNS)})
+                VALUES ({', '.join(['%s'] * (len(ACTIVITY_COLUMNS) + 2))})
+                ON DUPLICATE KEY UPDATE
+                registration_id = VALUES(registration_id),
+                {', '.join(f'{column} = VALUES({column})' for column in ACTIVITY_COLUMNS)}
+            """
+            for batch in _chunks(to_insert, BATCH_SIZE):
+                cursor.executemany(insert_query, batch)
             
-            # Save to database
-            print("\nSaving to database...")
-            success = self.save_to_database(activities)
+            if to_update:
+                cursor.executemany(f"""
+                    UPDATE activities
+                    SET {', '.join(f'{column} = %s' for column in ACTIVITY_COLUMNS)},
+                        scraped_at = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                """, to_update)
+            
+            if to_delete:
+                cursor.execute(
+                    f"DELETE FROM activities WHERE id IN ({', '.join(['%s'] * len(to_delete))})",
+                    tuple(to_delete))
+            
+            # Sessions of deleted rows go with them (ON DELETE CASCADE)
+            schedule_index = ACTIVITY_FIELDS.index('schedule')
+            self._write_sessions(cursor, {key: values[schedule_index]
+                                          for key, values in incoming.items()
+                                          if key not in existing or existing[key][1] != values})
+            
+            self._write_versions(cursor, incoming, registration_id, delete_missing)
+            
+            if commit:
+                self.connection.commit()
+            cursor.close()
+            
+            counts = {
+                'inserted': len(to_insert),
+                'updated': len(to_update),
+                'deleted': len(to_delete),
+                'unchanged': len(incoming) - len(to_insert) - len(to_update)
+            }
+            print(f"✓ Synchronized activities: {counts['inserted']} inserted, {counts['updated']} updated, "
+                  f"{counts['deleted']} deleted, {counts['unchanged']} unchanged")
+            return counts
+            
+        except Error as e:
+            print(f"✗ Error synchronizing database: {e}")
+            self.connection.rollback()
+            return None
+    
+    def _insert_history(self, cursor, total_activities: int, status: str, error_message: str = None,
+                        registration_id: int = None, page_hash: str = None,
+                        data_hash: str = None) -> int:
+        """Insert a scraping_history row and return its ID"""
+        cursor.execute("""
+            INSERT INTO scraping_history 
+            (registration_id, total_activities, status, error_message, page_hash, data_hash)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (registration_id, total_activities, status, error_message, page_hash, data_hash))
+        return cursor.lastrowid
+    
+    def _write_statistics(self, cursor, scrape_id: int):
+        """
+        Store per-category and overall aggregates of the activities table
+        
+        Args:
+            cursor: Cursor to execute on (inside the caller's transaction)
+            scrape_id: scraping_history ID the statistics belong to
+        """
+        aggregates = """
+            COUNT(*),
+            SUM(cost = 0),
+            AVG(CASE WHEN cost > 0 THEN cost END),
+            MIN(CASE WHEN cost > 0 THEN cost END),
+            MAX(CASE WHEN cost > 0 THEN cost END)
+        """
+        cursor.execute(f"""
+            INSERT INTO activity_stats
+            (scrape_id, category, total_activities, free_activities, avg_cost, min_cost, max_cost)
+            SELECT %s, c.name, {aggregates} FROM activities a {_CATEGORY_JOIN} GROUP BY c.id, c.name
+            UNION ALL
+            SELECT %s, %s, {aggregates} FROM activities a
+        """, (scrape_id, scrape_id, STATS_ALL_CATEGORIES))
+    
+    def commit_successful_run(self, total_activities: int, registration_id: int = None,
+                              page_hash: str = None, data_hash: str = None) -> bool:
+        """
+        Log a successful run with fresh statistics and commit the pending data load
+        
+        The history row, the activity_stats rows and the activity writes left
+        open by the caller all become visible in the same commit. The new
+        history ID is then published to query caches (see query_cache) and
+        the JSON snapshots for the PHP front end are rewritten.
+        
+        Args:
+            total_activities: Number of activities scraped
+            registration_id: Registration list the run refers to
+            page_hash: Fingerprint of the fetched page
+            data_hash: Fingerprint of the extracted activities
+            
+        Returns:
+            True if successful, False otherwise (everything is rolled back)
+        """
+        try:
+            cursor = self.connection.cursor()
+            scrape_id = self._insert_history(cursor, total_activities, 'success',
+                                             registration_id=registration_id,
+                                             page_hash=page_hash, data_hash=data_hash)
+            self._write_statistics(cursor, scrape_id)
+            self.connection.commit()
+            cursor.close()
+            self._record_history(scrape_id, 'success')
+        except Error as e:
+            print(f"✗ Error committing scrape results: {e}")
+            self.connection.rollback()
+            return False
+        
+        # Let query caches know new data landed
+        try:
+            publish_version(scrape_id)
+        except OSError as e:
+            print(f"⚠ Warning: Could not publish data version: {e}")
+        if self.snapshot_dir:
+            self.export_snapshot(scrape_id)
+        return True
+    
+    def export_snapshot(self, scrape_id: int = None) -> bool:
+        """
+        Write the stored activities as JSON snapshots for the PHP front end (see snapshot)
+        
+        A failure is only reported: the data is already committed and the
+        previous snapshot stays in place until the next successful run.
+        
+        Args:
+            scrape_id: Data version of the snapshot (default: the latest successful run)
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.snapshot_dir:
+            print("✗ No snapshot directory configured")
+            return False
+        try:
+            cursor = self.connection.cursor()
+            if scrape_id is None:
+                cursor.execute("SELECT MAX(id) FROM scraping_history WHERE status = 'success'")
+                scrape_id = cursor.fetchone()[0]
+            columns = ', '.join('c.name' if column == 'category' else f'a.{column}' for column in SNAPSHOT_COLUMNS)
+            cursor.execute(f"SELECT {columns} FROM activities a {_CATEGORY_JOIN}")
+            activities = [dict(zip(SNAPSHOT_COLUMNS, row)) for row in cursor.fetchall()]
+            cursor.close()
+        except Error as e:
+            print(f"⚠ Warning: Could not read activities for the snapshot: {e}")
+            return False
+        try:
+            written = write_snapshot(activities, scrape_id, self.snapshot_dir, SNAPSHOT_GZIP)
+        except OSError as e:
+            print(f"⚠ Warning: Could not write snapshot to {self.snapshot_dir}: {e}")
+            return False
+        print(f"✓ Snapshot of {len(activities)} activities written to {self.snapshot_dir} "
+              f"({written} files changed)")
+        return True
+    
+    def log_scraping_history(self, total_activities: int, status: str, error_message: str = None,
+                             registration_id: int = None, page_hash: str = None,
+                             data_hash: str = None) -> bool:
+        """
+        Log scraping attempt to history table
+        
+        Args:
+            total_activities: Number of activities scraped
+            status: Status of the scraping (success/failure/not_modified/unchanged)
+            error_message: Optional error message
+            registration_id: Registration list the attempt refers to
+            page_hash: Fingerprint of the fetched page
+            data_hash: Fingerprint of the extracted activities
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            cursor = self.connection.cursor()
+            scrape_id = self._insert_history(cursor, total_activities, status, error_message,
+                                             registration_id, page_hash, data_hash)
+            self.connection.commit()
+            cursor.close()
+            self._record_history(scrape_id, status)
+            return True
+        except Error as e:
+            print(f"⚠ Warning: Could not log scraping history: {e}")
+            return False
+    
+    def _record_history(self, scrape_id: int, status: str):
+        """Remember the committed history row of the current run for its metrics"""
+        if self.metrics is not None:
+            self.metrics.scrape_id = scrape_id
+            self.metrics.status = status
+    
+    def save_run_metrics(self, metrics: RunMetrics) -> bool:
+        """
+        Store the stage metrics of a run in scrape_stage_metrics
+        
+        Args:
+            metrics: Finished run with a committed history row
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if metrics.scrape_id is None or self.connection is None:
+            return False
+        try:
+            cursor = self.connection.cursor()
+            cursor.executemany(f"""
+                INSERT INTO scrape_stage_metrics (scrape_id, stage, {', '.join(STAGE_FIELDS)})
+                VALUES ({', '.join(['%s'] * (len(STAGE_FIELDS) + 2))})
+            """, [(metrics.scrape_id,) + row for row in metrics.rows()])
+            self.connection.commit()
+            cursor.close()
+            return True
+        except Error as e:
+            print(f"⚠ Warning: Could not store run metrics: {e}")
+            self.connection.rollback()
+            return False
+    
+    def _finish_run(self, metrics: RunMetrics, success: bool):
+        """Stop a run's clock, store its metrics and keep them for export"""
+        metrics.finish(success)
+        self.save_run_metrics(metrics)
+        self.runs.append(metrics)
+        if metrics is self.metrics:
+            self.metrics = None
+        print(f"⏱ {metrics.format_summary()}")
+    
+    def export_metrics(self):
+        """Write the runs of this invocation to the configured metrics files"""
+        export_runs(self.runs, self.metrics_file, self.prometheus_file)
+    
+    def _last_run_succeeded(self, registration_id: int = None) -> bool:
+        """
+        Check whether the latest run for a registration list stored its data
+        
+        Successful runs without a data fingerprint (streaming mode) do not
+        count: they did not load the cached page, so its 304 says nothing
+        about the table.
+        """
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("""
+                SELECT status, data_hash FROM scraping_history
+                WHERE registration_id <=> %s
+                ORDER BY id DESC LIMIT 1
+            """, (registration_id,))
+            row = cursor.fetchone()
+            cursor.close()
+            return bool(row) and (row[0] in ('not_modified', 'unchanged')
+                                  or (row[0] == 'success' and row[1] is not None))
+        except Error as e:
+            print(f"⚠ Warning: Could not read scraping history: {e}")
+            return False
+    
+    def _last_fingerprints(self, registration_id: int = None) -> Optional[tuple]:
+        """
+        Get the fingerprints stored by the latest run that wrote or confirmed the data
+        
+        Runs that stored no fingerprints (streaming mode) leave NULL hashes,
+        which match no page, so the next scrape writes again.
+        
+        Returns:
+            Tuple (page_hash, data_hash, total_activities) or None
+        """
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("""
+                SELECT page_hash, data_hash, total_activities FROM scraping_history
+                WHERE registration_id <=> %s
+                  AND status IN ('success', 'unchanged')
+                ORDER BY id DESC LIMIT 1
+            """, (registration_id,))
+            row = cursor.fetchone()
+            cursor.close()
+            return tuple(row) if row else None
+        except Error as e:
+            print(f"⚠ Warning: Could not read scraping history: {e}")
+            return None
+    
+    def _handle_fetch_result(self, result: Optional[FetchResult], registration_id: int = None,
+                             clear_existing: bool = True, fetch_details: bool = False,
+                             force: bool = False) -> bool:
+        """
+        Run the rest of the pipeline for a fetched page
+        
+        A 304 answer short-circuits parsing and database writes, unless the
+        previous run for the same list did not store its data or details are
+        fetched (detail pages change while the listing stays the same).
+        """
+        if not result:
+            self.log_scraping_history(0, 'failure', 'Failed to fetch webpage', registration_id)
+            return False
+        
+        if result.not_modified and not (force or fetch_details) and self._last_run_succeeded(registration_id):
+            print("✓ Page not modified since the last successful run, skipping update")
+            self.log_scraping_history(0, 'not_modified', registration_id=registration_id)
+            return True
+        
+        return self._process_page(result.text, registration_id, clear_existing, fetch_details, force)
+    
+    def _process_page(self, html_content: str, registration_id: int = None,
+                      clear_existing: bool = True, fetch_details: bool = False,
+                      force: bool = False) -> bool:
+        """
+        Extract activities from a fetched page and store them
+        
+        The page and the extracted activity set are fingerprinted. When either
+        matches the latest successful run for the same list, the run is logged
+        as 'unchanged' and the activities table is left alone. With
+        ``fetch_details`` only the activity set counts, since it includes the
+        details pages.
+        
+        Args:
+            html_content: HTML content of the listing page
+            registration_id: Registration list the page belongs to
+            clear_existing: Whether to delete activities that are no longer on the page
+            fetch_details: Whether to fetch each activity's details page
+            force: Rewrite the data even if the fingerprints match
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        with self._stage('parse') as stage:
+            page_hash = page_fingerprint(html_content)
+            previous = None if force else self._last_fingerprints(registration_id)
+            page_unchanged = bool(previous) and previous[0] == page_hash and not fetch_details
+            
+            if not page_unchanged:
+                # Extract activities
+                print("\nExtracting activities...")
+                activities = self.extract_activities(html_content)
+                stage['rows_parsed'] += len(activities)
+        
+        if page_unchanged:
+            print("✓ Page content unchanged since the last successful run, skipping update")
+            self.log_scraping_history(previous[2], 'unchanged', registration_id=registration_id,
+                                      page_hash=page_hash, data_hash=previous[1])
+            return True
+        
+        if not activities:
+            print("⚠ No activities found")
+            self.log_scraping_history(0, 'failure', 'No activities found in webpage', registration_id,
+                                      page_hash=page_hash)
+            return False
+        
+        print(f"\n✓ Total activities extracted: {len(activities)}")
+        
+        if fetch_details:
+            with self._stage('details', count_db=False) as stage:
+                stage['rows_parsed'] += self.fetch_details(activities)
+        
+        data_hash = activities_fingerprint(activities)
+        if previous and previous[1] == data_hash:
+            print("✓ Activities unchanged since the last successful run, skipping update")
+            self.log_scraping_history(len(activities), 'unchanged', registration_id=registration_id,
+                                      page_hash=page_hash, data_hash=data_hash)
+            return True
+        
+        with self._stage('write') as stage:
+            if self.full_reload:
+                # Replace the whole list in one transaction
+                print("\nReloading activities...")
+                success = self.replace_activities(activities, registration_id, commit=False)
+                stage['rows_written'] += len(activities) if success else 0
+            else:
+                # Save to database, touching only the rows that changed
+                print("\nSynchronizing database...")
+                counts = self.sync_activities(activities, registration_id,
+                                              delete_missing=clear_existing, commit=False)
+                success = counts is not None
+                stage['rows_written'] += counts['inserted'] + counts['updated'] + counts['deleted'] \
+                    if success else 0
+        
+        # Log scraping history and statistics in the same transaction as the data
+        if success:
+            with self._stage('commit'):
+                success = self.commit_successful_run(len(activities), registration_id,
+                                                     page_hash=page_hash, data_hash=data_hash)
+        if not success:
+            self.log_scraping_history(0, 'failure', 'Failed to save to database', registration_id,
+                                      page_hash=page_hash)
+        
+        return success
+    
+    def scrape(self, url: str = None, clear_existing: bool = True, fetch_details: bool = False,
+               force: bool = False) -> bool:
+        """
+        Main scraping method
+        
+        Args:
+            url: URL to scrape (default: SCRAPER_URL)
+            clear_existing: Whether to delete activities that are no longer on the page
+            fetch_details: Whether to fetch each activity's details page
+            force: Rewrite the data even if the page is unchanged
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if url is None:
+            url = SCRAPER_URL
+        registration_id = registration_id_from_url(url)
+        
+        print("="*60)
+        print("FEF UNICAMP Activities Scraper")
+        print("="*60)
+        
+        # Connect to database
+        if not self.connect_to_database():
+            return False
+        
+        self.runs = []
+        metrics = self.metrics = RunMetrics(registration_id)
+        success = False
+        try:
+            # Fetch webpage
+            result = self._fetch_measured(url)
+            success = self._handle_fetch_result(result, registration_id, clear_existing, fetch_details,
+                                                force)
             
-            # Log scraping history
             if success:
-                self.log_scraping_history(len(activities), 'success')
                 print("\n" + "="*60)
                 print("✓ Scraping completed successfully!")
                 print("="*60)
-            else:
-                self.log_scraping_history(0, 'failure', 'Failed to save to database')
             
             return success
             
         except Exception as e:
             print(f"\n✗ Unexpected error during scraping: {e}")
-            self.log_scraping_history(0, 'failure', str(e))
+            self.log_scraping_history(0, 'failure', str(e), registration_id)
+            return False
+        
+        finally:
+            self._finish_run(metrics, success)
+            self.close_connection()
+            self.export_metrics()
+    
+    def scrape_stream(self, source: str = None, registration_id: int = None) -> bool:
+        """
+        Scrape a listing in streaming mode with bounded memory
+        
+        The page is parsed incrementally as it arrives and activities are
+        written in batches (see save_activity_stream), so peak memory stays
+        flat regardless of the listing size. Meant for all-period archive
+        pages and concatenated snapshots; change detection needs the full
+        page and is not used.
+        
+        Args:
+            source: URL or local HTML file (optionally .gz) to read (default: SCRAPER_URL)
+            registration_id: Registration list to sync (default: taken from the URL;
+                             None syncs the whole table)
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if source is None:
+            source = SCRAPER_URL
+        is_url = source.startswith(('http://', 'https://'))
+        if registration_id is None and is_url:
+            registration_id = registration_id_from_url(source)
+        
+        print("="*60)
+        print("FEF UNICAMP Activities Scraper (streaming)")
+        print("="*60)
+        
+        if not self.connect_to_database():
+            return False
+        
+        self.runs = []
+        metrics = self.metrics = RunMetrics(registration_id)
+        success = False
+        try:
+            # Fetching, parsing and writing are interleaved, so they form one stage
+            with self._stage('stream') as stage:
+                chunks = self.fetch_stream(source) if is_url else iter_file_chunks(source, STREAM_CHUNK_SIZE)
+                total = self.save_activity_stream(self.stream_activities(_counted_chunks(chunks, stage)),
+                                                  registration_id, commit=False)
+                stage['rows_parsed'] += total or 0
+                stage['rows_written'] += total or 0
+            
+            if total:
+                with self._stage('commit'):
+                    success = self.commit_successful_run(total, registration_id)
+            if success:
+                print("\n" + "="*60)
+                print("✓ Scraping completed successfully!")
+                print("="*60)
+                return True
+            
+            self.log_scraping_history(0, 'failure', 'No activities streamed' if not total
+                                      else 'Failed to save to database', registration_id)
+            return False
+        
+        except (requests.exceptions.RequestException, OSError) as e:
+            print(f"✗ Error streaming {source}: {e}")
+            self.connection.rollback()
+            self.log_scraping_history(0, 'failure', str(e), registration_id)
+            return False
+        
+        except Exception as e:
+            print(f"\n✗ Unexpected error during scraping: {e}")
+            self.connection.rollback()
+            self.log_scraping_history(0, 'failure', str(e), registration_id)
             return False
         
         finally:
+            self._finish_run(metrics, success)
+            self.close_connection()
+            self.export_metrics()
+    
+    def scrape_many(self, registration_ids: Iterable[int], clear_existing: bool = True,
+                    max_workers: int = CRAWL_WORKERS,
+                    per_host_limit: int = PER_HOST_LIMIT,
+                    fetch_details: bool = False, force: bool = False) -> Dict[int, bool]:
+        """
+        Crawl several registration lists concurrently
+        
+        Pages are fetched by a thread pool, with at most ``per_host_limit``
+        requests in flight per host. Each page is then parsed and stored on
+        the main thread as soon as it arrives, and gets its own history row,
+        so a dead or empty list only fails its own entry.
+        
+        Args:
+            registration_ids: Registration list IDs to crawl
+            clear_existing: Whether to delete each list's activities that are no longer on its page
+            max_workers: Number of fetch threads
+            per_host_limit: Maximum concurrent requests per host
+            fetch_details: Whether to fetch each activity's details page
+            force: Rewrite the data even if a page is unchanged
+            
+        Returns:
+            Dictionary mapping each registration ID to its success flag
+        """
+        ids = sorted(set(registration_ids))
+        
+        print("="*60)
+        print(f"FEF UNICAMP Activities Scraper - crawling {len(ids)} registration lists")
+        print("="*60)
+        
+        if not self.connect_to_database():
+            return {registration_id: False for registration_id in ids}
+        
+        self.runs = []
+        results = {}
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                # Each list's fetch stage is recorded by its worker thread
+                run_metrics = {registration_id: RunMetrics(registration_id) for registration_id in ids}
+                futures = {
+                    executor.submit(self._fetch_limited, registration_url(registration_id),
+                                    max(1, per_host_limit), run_metrics[registration_id]): registration_id
+                    for registration_id in ids
+                }
+                
+                for future in as_completed(futures):
+                    registration_id = futures[future]
+                    self.metrics = run_metrics[registration_id]
+                    print(f"\n--- Registration list {registration_id} ---")
+                    try:
+                        results[registration_id] = self._handle_fetch_result(
+                            future.result(), registration_id, clear_existing, fetch_details, force)
+                    except Exception as e:
+                        print(f"✗ Unexpected error scraping registration list {registration_id}: {e}")
+                        self.log_scraping_history(0, 'failure', str(e), registration_id)
+                        results[registration_id] = False
+                    self._finish_run(run_metrics[registration_id], results[registration_id])
+        finally:
+            self.metrics = None
             self.close_connection()
+            self.export_metrics()
+        
+        succeeded = sorted(rid for rid, ok in results.items() if ok)
+        failed = sorted(rid for rid, ok in results.items() if not ok)
+        print("\n" + "="*60)
+        print(f"✓ Crawl finished: {len(succeeded)} succeeded, {len(failed)} failed")
+        if failed:
+            print(f"  Failed lists: {', '.join(str(rid) for rid in failed)}")
+        print("="*60)
+        
+        return results
+    
+    def enrollment_windows(self, registration_ids: Iterable[int] = None) -> List[Window]:
+        """
+        Get the distinct enrollment windows of the stored activities
+        
+        Windows that closed more than a day ago are left out.
+        
+        Args:
+            registration_ids: Only these registration lists (default: all)
+            
+        Returns:
+            List of (enrollment_opens_at, enrollment_closes_at)
+        """
+        query = """
+            SELECT DISTINCT enrollment_opens_at, enrollment_closes_at FROM activities
+            WHERE (enrollment_closes_at IS NULL OR enrollment_closes_at >= %s)
+              AND (enrollment_opens_at IS NOT NULL OR enrollment_closes_at IS NOT NULL)
+        """
+        params = [site_now() - timedelta(days=1)]
+        ids = sorted(set(registration_ids or ()))
+        if ids:
+            query += f" AND registration_id IN ({', '.join(['%s'] * len(ids))})"
+            params.extend(ids)
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params)
+            return [tuple(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    
+    def run_daemon(self, url: str = None, registration_ids: Iterable[int] = None,
+                   status_file: Optional[str] = STATUS_FILE, policy: PollPolicy = None,
+                   max_runs: int = None, **crawl_options) -> int:
+        """
+        Scrape in a loop, polling adaptively around enrollment windows
+        
+        The HTTP session, response cache and circuit breakers live as long as
+        the process and the database connection is kept in the shared pool
+        between runs. SIGTERM and SIGINT stop the loop after the current run.
+        
+        Args:
+            url: Listing URL to scrape (default: SCRAPER_URL)
+            registration_ids: Crawl these registration lists instead of ``url``
+            status_file: JSON status file for health checks (None: no file)
+            policy: Poll policy (default: intervals from the environment)
+            max_runs: Stop after this many runs (default: run until stopped)
+            **crawl_options: Passed to scrape() or scrape_many()
+            
+        Returns:
+            Number of runs made
+        """
+        ids = sorted(set(registration_ids)) if registration_ids else None
+        if ids:
+            scope = ids
+            run_once = lambda: any(self.scrape_many(ids, **crawl_options).values())
+        else:
+            url = url or SCRAPER_URL
+            registration_id = registration_id_from_url(url)
+            scope = [registration_id] if registration_id is not None else None
+            run_once = lambda: self.scrape(url, **crawl_options)
+        
+        def load_windows() -> List[Window]:
+            if not self.connect_to_database():
+                return []
+            try:
+                return self.enrollment_windows(scope)
+            finally:
+                self.close_connection()
+        
+        daemon = ScraperDaemon(run_once, load_windows, policy, status_file)
+        daemon.install_signal_handlers()
+        print(f"Scraper daemon started (pid {os.getpid()})")
+        try:
+            return daemon.run(max_runs)
+        finally:
+            self.close_session()
+            if self.archive is not None:
+                self.archive.close()
+            print("✓ Scraper daemon stopped")
 
 
 def main():
     """Main entry point for the scraper"""
-    scraper = FEFActivityScraper(DB_CONFIG)
+    parser = argparse.ArgumentParser(description="Scrape FEF UNICAMP activities into MySQL")
+    parser.add_argument('--url', help="Listing URL to scrape (default: %(default)s)", default=SCRAPER_URL)
+    parser.add_argument('--registrations', metavar='IDS',
+                        help="Crawl several registration lists concurrently, e.g. '20-26,30'")
+    parser.add_argument('--workers', type=int, default=CRAWL_WORKERS,
+                        help="Fetch threads in crawl mode (default: %(default)s)")
+    parser.add_argument('--per-host', type=int, default=PER_HOST_LIMIT,
+                        help="Concurrent requests per host in crawl mode (default: %(default)s)")
+    parser.add_argument('--details', action='store_true',
+                        help="Also fetch each activity's details page (vacancies, location, instructor)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Ignore the on-disk response cache and always download full pages")
+    parser.add_argument('--force', action='store_true',
+                        help="Rewrite the activities even if the page is unchanged")
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=PARSER_BACKEND,
+                        help="HTML parser backend (default: %(default)s)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Parse the page incrementally and write in batches (bounded memory)")
+    parser.add_argument('--stream-file', metavar='PATH',
+                        help="Stream activities from a local HTML file (.gz allowed), e.g. an archive "
+                             "page or concatenated snapshots; syncs the whole table with it")
+    parser.add_argument('--rebuild-sessions', action='store_true',
+                        help="Re-parse all stored schedules into activity_sessions and exit")
+    parser.add_argument('--init-versions', action='store_true',
+                        help="Record versions of the stored activities in activity_versions and exit")
+    parser.add_argument('--compact-history', action='store_true',
+                        help="Merge redundant rows of activity_versions and exit")
+    parser.add_argument('--no-archive', action='store_true',
+                        help="Do not keep downloaded pages in the page archive")
+    parser.add_argument('--no-snapshot', action='store_true',
+                        help="Do not write JSON snapshots for the PHP front end")
+    parser.add_argument('--snapshot-dir', metavar='DIR', default=SNAPSHOT_DIR,
+                        help="Directory of the JSON snapshots (default: %(default)s)")
+    parser.add_argument('--export-snapshot', action='store_true',
+                        help="Write the JSON snapshots of the stored activities and exit")
+    parser.add_argument('--backfill', action='store_true',
+                        help="Rebuild activity_versions by re-parsing the page archive and exit")
+    parser.add_argument('--backfill-since', metavar='DD/MM/YYYY',
+                        help="Only re-parse pages archived from this date on")
+    parser.add_argument('--processes', type=int,
+                        help="Worker processes for --backfill (default: one per core)")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Keep running and poll adaptively around enrollment windows "
+                             "(scrapes --url, or --registrations)")
+    parser.add_argument('--status-file', metavar='PATH', default=STATUS_FILE,
+                        help="Daemon status file (default: %(default)s)")
+    parser.add_argument('--health-check', action='store_true',
+                        help="Check the daemon status file and exit 0 if the daemon is healthy")
+    parser.add_argument('--full-reload', action='store_true',
+                        help="Replace each list's rows in one transaction instead of syncing changes")
+    parser.add_argument('--metrics-file', metavar='PATH', default=METRICS_FILE,
+                        help="Append each run's stage metrics as a JSON line to PATH")
+    parser.add_argument('--prometheus-file', metavar='PATH', default=PROMETHEUS_FILE,
+                        help="Write stage metrics to a Prometheus textfile-collector file")
+    args = parser.parse_args()
+    if args.backfill_since and parse_date(args.backfill_since) is None:
+        parser.error(f"invalid date: {args.backfill_since}")
+    if args.daemon and (args.stream or args.stream_file):
+        parser.error("--daemon cannot be combined with --stream or --stream-file")
+    
+    if args.health_check:
+        healthy, message = check_status(args.status_file)
+        print(f"{'✓' if healthy else '✗'} {message}")
+        exit(0 if healthy else 1)
+    
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=not args.no_cache, full_reload=args.full_reload,
+                                 parser=args.parser, metrics_file=args.metrics_file,
+                                 prometheus_file=args.prometheus_file, use_archive=not args.no_archive,
+                                 snapshot_dir=None if args.no_snapshot else args.snapshot_dir)
+    
+    maintenance = {
+        'rebuild_sessions': scraper.rebuild_sessions,
+        'init_versions': scraper.init_versions,
+        'compact_history': scraper.compact_history,
+        'export_snapshot': scraper.export_snapshot,
+        'backfill': lambda: scraper.backfill(parse_date(args.backfill_since) if args.backfill_since else None,
+                                             args.processes),
+    }
+    for option, task in maintenance.items():
+        if getattr(args, option):
+            if not scraper.connect_to_database():
+                exit(1)
+            success = task()
+            scraper.close_connection()
+            exit(0 if success else 1)
     
     # Run the scraper
-    success = scraper.scrape()
+    if args.daemon:
+        crawl_options = {'fetch_details': args.details, 'force': args.force}
+        if args.registrations:
+            crawl_options.update(max_workers=args.workers, per_host_limit=args.per_host)
+        scraper.run_daemon(args.url, parse_registration_ids(args.registrations) if args.registrations else None,
+                           status_file=args.status_file, **crawl_options)
+        exit(0)
+    elif args.stream_file:
+        success = scraper.scrape_stream(args.stream_file)
+    elif args.stream:
+        success = scraper.scrape_stream(args.url)
+    elif args.registrations:
+        results = scraper.scrape_many(parse_registration_ids(args.registrations),
+                                      max_workers=args.workers, per_host_limit=args.per_host,
+                                      fetch_details=args.details, force=args.force)
+        success = bool(results) and all(results.values())
+    else:
+        success = scraper.scrape(args.url, fetch_details=args.details, force=args.force)
     
     if success:
         exit(0)
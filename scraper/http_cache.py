@@ -0,0 +1,103 @@
+"""
+On-disk HTTP response cache for the FEF scraper
+
+Keeps the last body and validators (ETag / Last-Modified) of every fetched
+URL so later runs can send conditional requests, and remembers per host
+whether TLS verification works so doomed verified attempts are skipped.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from atomic_file import write_json_atomic
+
+# Cache location (one JSON file per URL plus tls_modes.json)
+CACHE_DIR = os.getenv('SCRAPER_CACHE_DIR',
+                      os.path.join(os.path.dirname(os.path.abspath(__file__)), '.http_cache'))
+
+# How long a remembered TLS mode is trusted before verification is tried again
+TLS_MODE_TTL = int(os.getenv('SCRAPER_TLS_MODE_TTL', str(7 * 24 * 3600)))
+
+TLS_VERIFIED = 'verified'
+TLS_UNVERIFIED = 'unverified'
+
+
+class ResponseCache:
+    """Persistent per-URL response cache with per-host TLS mode memory"""
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        """Initialize the cache, creating its directory if needed"""
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._tls_path = os.path.join(cache_dir, 'tls_modes.json')
+        self._tls_modes = self._read_json(self._tls_path) or {}
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[Dict]:
+        """Read a JSON file, returning None if missing or corrupt"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _path(self, url: str) -> str:
+        """Path of the cache entry for a URL"""
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Get the cached entry for a URL
+
+        Returns:
+            Dictionary with url, body, etag, last_modified and stored_at, or None
+        """
+        entry = self._read_json(self._path(url))
+        if entry and entry.get('url') == url:
+            return entry
+        return None
+
+    def put(self, url: str, body: str, etag: str = None, last_modified: str = None):
+        """Store the body and validators of a successful response"""
+        write_json_atomic(self._path(url), {
+            'url': url,
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': time.time()
+        })
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers for a URL"""
+        entry = self.get(url)
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def get_tls_mode(self, host: str) -> Optional[str]:
+        """Get the TLS mode that last worked for a host, if still fresh"""
+        with self._lock:
+            record = self._tls_modes.get(host)
+        if not record or time.time() - record.get('checked_at', 0) > TLS_MODE_TTL:
+            return None
+        return record.get('mode')
+
+    def set_tls_mode(self, host: str, mode: str):
+        """Remember which TLS mode worked for a host"""
+        with self._lock:
+            record = self._tls_modes.get(host)
+            if record and record.get('mode') == mode and \
+                    time.time() - record.get('checked_at', 0) <= TLS_MODE_TTL:
+                return
+            self._tls_modes[host] = {'mode': mode, 'checked_at': time.time()}
+            write_json_atomic(self._tls_path, self._tls_modes)
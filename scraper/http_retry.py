@@ -0,0 +1,174 @@
+"""
+Retry policy and per-host circuit breaker for the FEF scraper's fetch layer
+
+Timeouts, connection errors and 5xx/429 answers are retried with jittered
+exponential backoff, waiting at least as long as a Retry-After header asks.
+A host that keeps failing trips its circuit breaker: further requests fail
+fast for a cooldown period instead of piling onto a struggling server, then
+a single probe request decides whether the circuit closes again.
+"""
+
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+import requests
+
+# Seconds to wait for a connection, and between bytes of the response
+CONNECT_TIMEOUT = float(os.getenv('SCRAPER_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('SCRAPER_READ_TIMEOUT', '15'))
+
+# Retries after the first attempt
+MAX_RETRIES = int(os.getenv('SCRAPER_MAX_RETRIES', '3'))
+
+# Backoff before retry n is random in [0, min(BACKOFF_MAX, BACKOFF_BASE * 2**n)]
+BACKOFF_BASE = float(os.getenv('SCRAPER_BACKOFF_BASE', '1'))
+BACKOFF_MAX = float(os.getenv('SCRAPER_BACKOFF_MAX', '30'))
+
+# Consecutive failures that open a host's circuit, and how long it stays open
+BREAKER_THRESHOLD = int(os.getenv('SCRAPER_BREAKER_THRESHOLD', '5'))
+BREAKER_COOLDOWN = float(os.getenv('SCRAPER_BREAKER_COOLDOWN', '60'))
+
+# Answers worth retrying
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request to a host whose circuit is open"""
+
+
+def parse_retry_after(value: Optional[str], now: datetime = None) -> Optional[float]:
+    """
+    Parse a Retry-After header into seconds
+
+    Args:
+        value: Header value, either delay seconds or an HTTP date
+        now: Current time for HTTP dates (default: now, UTC)
+
+    Returns:
+        Seconds to wait (never negative), or None if missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+class RetryPolicy:
+    """Decides whether and how long to wait before retrying a request"""
+
+    def __init__(self, max_retries: int = MAX_RETRIES, backoff_base: float = BACKOFF_BASE,
+                 backoff_max: float = BACKOFF_MAX, rng: random.Random = None):
+        """
+        Args:
+            max_retries: Retries after the first attempt
+            backoff_base: Backoff ceiling of the first retry, doubled for each further one
+            backoff_max: Cap of the backoff ceiling, and of an acceptable Retry-After
+            rng: Random source for the jitter
+        """
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._rng = rng or random.Random()
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number ``attempt`` (from 0)"""
+        return self._rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> Optional[float]:
+        """
+        Get the wait before retry number ``attempt``
+
+        Args:
+            attempt: Number of retries already made
+            retry_after: Retry-After header of the failed answer, if any
+
+        Returns:
+            Seconds to wait, or None if the request should not be retried
+            (retries used up, or the server asks for a longer pause than
+            backoff_max)
+        """
+        if attempt >= self.max_retries:
+            return None
+        requested = parse_retry_after(retry_after)
+        if requested is not None and requested > self.backoff_max:
+            return None
+        return max(requested or 0.0, self.backoff(attempt))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one host
+
+    Closed: requests pass. After ``threshold`` consecutive failures it opens
+    and rejects requests for ``cooldown`` seconds. Then it is half-open and
+    lets one probe through at a time; a success closes it, a failure opens it
+    again. Thread-safe.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN,
+                 clock: Callable[[], float] = time.monotonic):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at < self.cooldown:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self) -> bool:
+        """Check whether a request may be sent now (claims the probe when half-open)"""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        """Close the circuit (the host answered)"""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        """Count a failed request, opening the circuit at the threshold or after a failed probe"""
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                self._opened_at = self._clock()
+            self._probing = False
@@ -0,0 +1,29 @@
+"""
+Compact JSON encoding of query results
+
+Shared by the JSON API, the query CLI and the static snapshots, so every
+consumer sees DECIMAL columns as numbers and DATETIME columns in ISO 8601.
+"""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+
+
+def json_default(value):
+    """Encode the database types json does not know"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def to_json(value) -> str:
+    """Compact JSON text (non-ASCII characters kept as is)"""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=json_default)
+
+
+def to_json_bytes(value) -> bytes:
+    """Compact JSON as UTF-8"""
+    return to_json(value).encode('utf-8')
@@ -0,0 +1,144 @@
+"""
+Load test for the local JSON API (api_server.py)
+
+Opens ``--connections`` keep-alive connections and sends requests as fast
+as the server answers them (closed loop), or at a fixed total ``--rate``,
+cycling through a set of typical queries. Reports throughput and latency
+percentiles.
+
+Usage:
+    python api_server.py --from-html ../atividades-fef-example.html &
+    python load_test.py --url http://127.0.0.1:8080 --connections 8 --duration 10
+    python load_test.py --rate 500 --duration 10
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = [
+    '/activities',
+    '/activities?category=Yoga',
+    '/activities?weekday=Ter&from=18:00',
+    '/activities?free=1',
+    '/activities?min_cost=100&max_cost=200',
+    '/activities?weekday=Seg&from=07:00&until=12:00&max_cost=250',
+    '/categories',
+    '/health',
+]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ')[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value.strip())
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def _client(host: str, port: int, paths: List[str], offset: int, deadline: float,
+                  interval: float, latencies: List[float], errors: Dict[str, int]):
+    reader, writer = await asyncio.open_connection(host, port)
+    requests = [f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('latin-1') for path in paths]
+    i = offset
+    next_send = time.perf_counter()
+    try:
+        while time.perf_counter() < deadline:
+            if interval:
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                next_send += interval
+            start = time.perf_counter()
+            writer.write(requests[i % len(requests)])
+            status = await _read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+            i += 1
+    finally:
+        writer.close()
+
+
+async def run_load_test(url: str, connections: int, duration: float, rate: float = 0,
+                        paths: List[str] = None) -> Dict:
+    """
+    Run the load test
+
+    Args:
+        url: Base URL of the API
+        connections: Concurrent keep-alive connections
+        duration: Seconds to run
+        rate: Total requests per second (0: as fast as possible)
+        paths: Request paths to cycle through
+
+    Returns:
+        Dictionary with requests, seconds, rps, errors and p50/p90/p99/max latency in ms
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname or '127.0.0.1', parts.port or 80
+    paths = paths or DEFAULT_PATHS
+    latencies, errors = [], {}
+    interval = connections / rate if rate else 0
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, paths, n, start + duration, interval, latencies, errors)
+                           for n in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'errors': errors,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p90_ms': percentile(latencies, 0.90) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Load test the local activities JSON API")
+    parser.add_argument('--url', default='http://127.0.0.1:8080', help="API base URL (default: %(default)s)")
+    parser.add_argument('--connections', type=int, default=8, help="Keep-alive connections (default: %(default)s)")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds to run (default: %(default)s)")
+    parser.add_argument('--rate', type=float, default=0,
+                        help="Total requests per second; 0 runs closed-loop as fast as possible")
+    parser.add_argument('--path', action='append', dest='paths',
+                        help="Request path to use (repeatable; default: a mix of typical queries)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load_test(args.url, args.connections, args.duration, args.rate, args.paths))
+
+    print("="*60)
+    print(f"Load test: {args.url} ({args.connections} connections, "
+          f"{'closed loop' if not args.rate else f'{args.rate:g} req/s'})")
+    print("="*60)
+    print(f"Requests:   {result['requests']} in {result['seconds']:.1f}s ({result['rps']:.0f} req/s)")
+    print(f"Latency:    p50 {result['p50_ms']:.2f} ms, p90 {result['p90_ms']:.2f} ms, "
+          f"p99 {result['p99_ms']:.2f} ms, max {result['max_ms']:.2f} ms")
+    if result['errors']:
+        print(f"✗ Non-200 responses: {result['errors']}")
+    else:
+        print("✓ All responses 200 OK")
+
+
+if __name__ == "__main__":
+    main()
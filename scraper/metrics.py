@@ -0,0 +1,196 @@
+"""
+Per-stage metrics of scraper runs
+
+Every run of the scraper (one registration list) is split into stages
+(fetch, parse, details, write, commit; stream for streaming mode). Each
+stage records its wall and CPU time, bytes fetched, rows parsed, rows
+written and database round trips. The scraper stores them in
+scrape_stage_metrics next to the run's scraping_history row and can also
+append them to a JSON-lines file (SCRAPER_METRICS_FILE) or write a
+Prometheus textfile-collector file (SCRAPER_PROMETHEUS_FILE).
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from atomic_file import write_text_atomic
+
+# JSON-lines file every run's metrics are appended to (unset: no file)
+METRICS_FILE = os.getenv('SCRAPER_METRICS_FILE') or None
+
+# Prometheus textfile written after every scraper invocation (unset: no file)
+PROMETHEUS_FILE = os.getenv('SCRAPER_PROMETHEUS_FILE') or None
+
+# Counters recorded per stage, in scrape_stage_metrics column order
+STAGE_FIELDS = ('wall_seconds', 'cpu_seconds', 'bytes_fetched', 'rows_parsed', 'rows_written',
+                'db_round_trips')
+
+# Stage name of the row summing up a whole run
+TOTAL_STAGE = 'total'
+
+PROMETHEUS_PREFIX = 'fef_scraper'
+
+# The textfile collector usually runs as another user (mkstemp creates files 0600)
+PROMETHEUS_FILE_MODE = 0o644
+
+
+def _empty_stage() -> Dict:
+    return {field: 0 for field in STAGE_FIELDS}
+
+
+class RunMetrics:
+    """Stage timings and counters of one scraper run"""
+
+    def __init__(self, registration_id: int = None):
+        """
+        Start measuring a run
+
+        Args:
+            registration_id: Registration list the run scrapes
+        """
+        self.registration_id = registration_id
+        self.started_at = datetime.now()
+        self.scrape_id = None
+        self.status = None
+        self.success = None
+        self.stages = {}
+        self._start = time.perf_counter()
+        self._wall_seconds = None
+
+    @contextmanager
+    def stage(self, name: str, round_trips: Callable[[], int] = None) -> Iterator[Dict]:
+        """
+        Time a stage of the run
+
+        CPU time is that of the calling thread. Counters (bytes_fetched,
+        rows_parsed, rows_written) are set on the yielded dictionary; a stage
+        entered more than once accumulates.
+
+        Args:
+            name: Stage name
+            round_trips: Returns the connection's round trip count; the
+                         difference over the stage is recorded
+
+        Yields:
+            The stage's metrics dictionary
+        """
+        stage = self.stages.setdefault(name, _empty_stage())
+        trips_before = round_trips() if round_trips else 0
+        wall_before = time.perf_counter()
+        cpu_before = time.thread_time()
+        try:
+            yield stage
+        finally:
+            stage['wall_seconds'] += time.perf_counter() - wall_before
+            stage['cpu_seconds'] += time.thread_time() - cpu_before
+            if round_trips:
+                stage['db_round_trips'] += round_trips() - trips_before
+
+    def finish(self, success: bool):
+        """
+        Stop the run clock
+
+        Args:
+            success: Whether the run succeeded; also sets the status when no
+                     history row recorded one
+        """
+        if self._wall_seconds is None:
+            self._wall_seconds = time.perf_counter() - self._start
+        self.success = success
+        if self.status is None:
+            self.status = 'success' if success else 'failure'
+
+    def total(self) -> Dict:
+        """Sum of all stages, with the run's wall time from start to finish()"""
+        total = _empty_stage()
+        for stage in self.stages.values():
+            for field in STAGE_FIELDS:
+                total[field] += stage[field]
+        total['wall_seconds'] = self._wall_seconds if self._wall_seconds is not None \
+            else time.perf_counter() - self._start
+        return total
+
+    def rows(self) -> List[tuple]:
+        """
+        Get one (stage, counters...) tuple per stage plus the total
+
+        Returns:
+            List of tuples in STAGE_FIELDS order after the stage name
+        """
+        stages = list(self.stages.items()) + [(TOTAL_STAGE, self.total())]
+        return [(name,) + tuple(stage[field] for field in STAGE_FIELDS) for name, stage in stages]
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable form of the run"""
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'registration_id': self.registration_id,
+            'scrape_id': self.scrape_id,
+            'status': self.status,
+            'success': self.success,
+            'stages': {row[0]: dict(zip(STAGE_FIELDS, row[1:])) for row in self.rows()}
+        }
+
+    def format_summary(self) -> str:
+        """One-line summary of the stage wall times"""
+        parts = [f"{name} {stage['wall_seconds']:.2f}s" for name, stage in self.stages.items()]
+        return f"{', '.join(parts)} (total {self.total()['wall_seconds']:.2f}s)"
+
+
+def append_jsonl(path: str, runs: Iterable[RunMetrics]):
+    """Append one JSON line per run to ``path``"""
+    with open(path, 'a', encoding='utf-8') as f:
+        for run in runs:
+            f.write(json.dumps(run.to_dict(), ensure_ascii=False) + '\n')
+
+
+def format_prometheus(runs: Iterable[RunMetrics]) -> str:
+    """
+    Render runs in the Prometheus text exposition format
+
+    Stage metrics are labelled with the registration list and stage; each
+    list also gets the start time and success of its latest run.
+    """
+    runs = list(runs)
+    lines = []
+    for field in STAGE_FIELDS:
+        name = f"{PROMETHEUS_PREFIX}_stage_{field}"
+        lines.append(f"# TYPE {name} gauge")
+        for run in runs:
+            for row in run.rows():
+                labels = f'registration="{run.registration_id or ""}",stage="{row[0]}"'
+                lines.append(f"{name}{{{labels}}} {row[1 + STAGE_FIELDS.index(field)]}")
+    for name, value in (('last_run_timestamp_seconds', lambda run: run.started_at.timestamp()),
+                        ('last_run_success', lambda run: int(bool(run.success)))):
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge")
+        for run in runs:
+            lines.append(f'{PROMETHEUS_PREFIX}_{name}{{registration="{run.registration_id or ""}"}} '
+                         f'{value(run):.0f}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path: str, runs: Iterable[RunMetrics]):
+    """Write the runs to a Prometheus textfile, replacing it atomically"""
+    write_text_atomic(path, format_prometheus(runs), PROMETHEUS_FILE_MODE)
+
+
+def export_runs(runs: List[RunMetrics], metrics_file: Optional[str] = METRICS_FILE,
+                prometheus_file: Optional[str] = PROMETHEUS_FILE):
+    """
+    Write runs to the configured metrics files
+
+    Failures only print a warning, so metrics never fail a scrape.
+    """
+    if not runs:
+        return
+    try:
+        if metrics_file:
+            append_jsonl(metrics_file, runs)
+        if prometheus_file:
+            write_prometheus(prometheus_file, runs)
+    except OSError as e:
+        print(f"⚠ Warning: Could not write metrics: {e}")
@@ -0,0 +1,138 @@
+-- In-place upgrades of an existing fef_activities database
+--
+-- database_schema.sql creates a fresh database and drops the data tables. To
+-- keep an existing one (and its scraping_history), stop the scraper and run the
+-- sections below that your database does not have yet, in order. MySQL has no
+-- ADD COLUMN IF NOT EXISTS, so a section already applied fails with a
+-- duplicate column error and must be skipped. Then fill the new columns and
+-- tables from Python (see "Upgrading an existing database" in the README):
+--
+--   python fef_scraper.py --force              # enrollment windows, statistics
+--   python fef_scraper.py --rebuild-sessions   # if section 5 was applied
+--   python fef_scraper.py --init-versions      # if section 8 was applied
+
+USE fef_activities;
+
+-- 1. Registration lists (crawl mode)
+ALTER TABLE activities
+    ADD COLUMN registration_id INT NULL AFTER id,
+    ADD INDEX idx_registration (registration_id);
+ALTER TABLE scraping_history
+    ADD COLUMN registration_id INT NULL AFTER scraped_at,
+    ADD INDEX idx_registration_status (registration_id, status),
+    ADD INDEX idx_status (status);
+
+-- 2. Details pages
+ALTER TABLE activities
+    ADD COLUMN detail_id INT NULL AFTER registration_id,
+    ADD COLUMN vacancies INT NULL AFTER enrollment_deadline,
+    ADD COLUMN location VARCHAR(255) NULL AFTER vacancies,
+    ADD COLUMN instructor VARCHAR(255) NULL AFTER location;
+
+-- 3. Change detection fingerprints. Older runs keep NULL hashes, so the first
+-- run afterwards never counts as unchanged.
+ALTER TABLE scraping_history
+    ADD COLUMN page_hash CHAR(64) NULL,
+    ADD COLUMN data_hash CHAR(64) NULL;
+
+-- 4. Natural keys of the incremental sync, filled the way activity_key() builds
+-- them: 'd:<detail ID>', else 'n:<registration ID>:' and the SHA-1 of category,
+-- U+001F and class name. Of rows sharing a key only the newest is kept.
+ALTER TABLE activities ADD COLUMN activity_key VARCHAR(64) NULL AFTER registration_id;
+UPDATE activities SET activity_key = IF(
+    detail_id IS NOT NULL,
+    CONCAT('d:', detail_id),
+    CONCAT('n:', IFNULL(registration_id, ''), ':',
+           SHA1(CONCAT(category, CHAR(31 USING utf8mb4), class_name))));
+DELETE a FROM activities a
+    JOIN activities b ON b.activity_key = a.activity_key AND b.id > a.id;
+ALTER TABLE activities
+    MODIFY activity_key VARCHAR(64) NOT NULL,
+    ADD UNIQUE KEY uq_activity_key (activity_key);
+
+-- 5. Weekly schedule sessions (filled by --rebuild-sessions)
+CREATE TABLE IF NOT EXISTS activity_sessions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    activity_id INT NOT NULL,
+    weekday TINYINT NOT NULL,
+    start_minute SMALLINT NOT NULL,
+    end_minute SMALLINT NOT NULL,
+    INDEX idx_weekday_time (weekday, start_minute, end_minute),
+    INDEX idx_activity (activity_id),
+    CONSTRAINT fk_session_activity FOREIGN KEY (activity_id)
+        REFERENCES activities (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 6. Enrollment windows (filled by the --force run)
+ALTER TABLE activities
+    ADD COLUMN enrollment_opens_at DATETIME NULL AFTER enrollment_deadline,
+    ADD COLUMN enrollment_closes_at DATETIME NULL AFTER enrollment_opens_at,
+    ADD INDEX idx_enrollment_window (enrollment_closes_at, enrollment_opens_at);
+
+-- 7. Per-run statistics and stage metrics
+CREATE TABLE IF NOT EXISTS activity_stats (
+    scrape_id INT NOT NULL,
+    category VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+    total_activities INT NOT NULL,
+    free_activities INT NOT NULL,
+    avg_cost DECIMAL(10, 2) NULL,
+    min_cost DECIMAL(10, 2) NULL,
+    max_cost DECIMAL(10, 2) NULL,
+    PRIMARY KEY (scrape_id, category)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS scrape_stage_metrics (
+    scrape_id INT NOT NULL,
+    stage VARCHAR(32) NOT NULL,
+    wall_seconds DOUBLE NOT NULL,
+    cpu_seconds DOUBLE NOT NULL,
+    bytes_fetched BIGINT NOT NULL DEFAULT 0,
+    rows_parsed INT NOT NULL DEFAULT 0,
+    rows_written INT NOT NULL DEFAULT 0,
+    db_round_trips INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (scrape_id, stage),
+    INDEX idx_stage (stage, scrape_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 8. Activity history (started by --init-versions, or rebuilt from the page
+-- archive with --backfill)
+CREATE TABLE IF NOT EXISTS activity_versions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    activity_key VARCHAR(64) NOT NULL,
+    registration_id INT NULL,
+    detail_id INT NULL,
+    category VARCHAR(255) NOT NULL,
+    class_name VARCHAR(255) NOT NULL,
+    schedule TEXT NOT NULL,
+    cost DECIMAL(10, 2) NOT NULL,
+    enrollment_deadline VARCHAR(255) NOT NULL,
+    enrollment_opens_at DATETIME NULL,
+    enrollment_closes_at DATETIME NULL,
+    vacancies INT NULL,
+    location VARCHAR(255) NULL,
+    instructor VARCHAR(255) NULL,
+    valid_from DATETIME NOT NULL,
+    valid_to DATETIME NOT NULL,
+    INDEX idx_validity (valid_to, valid_from),
+    INDEX idx_valid_from (valid_from),
+    INDEX idx_key_from (activity_key, valid_from),
+    INDEX idx_key_to (activity_key, valid_to),
+    INDEX idx_registration_open (registration_id, valid_to)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 9. Categories table referenced by activities.category_id
+CREATE TABLE categories (
+    id SMALLINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+    UNIQUE KEY uq_category_name (name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+INSERT INTO categories (name) SELECT DISTINCT category COLLATE utf8mb4_bin FROM activities;
+ALTER TABLE activities ADD COLUMN category_id SMALLINT UNSIGNED NULL AFTER detail_id;
+UPDATE activities a JOIN categories c ON c.name = a.category COLLATE utf8mb4_bin
+SET a.category_id = c.id;
+ALTER TABLE activities
+    DROP INDEX idx_category, DROP COLUMN category,
+    MODIFY category_id SMALLINT UNSIGNED NOT NULL,
+    ADD INDEX idx_category (category_id),
+    ADD CONSTRAINT fk_activity_category FOREIGN KEY (category_id) REFERENCES categories (id);
+ALTER TABLE activity_stats MODIFY category VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL;
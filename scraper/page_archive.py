@@ -0,0 +1,154 @@
+"""
+Compressed, content-addressed archive of fetched pages
+
+Every page the scraper downloads is gzip-compressed and stored under the
+SHA-256 of its text (objects/ab/abcdef....html.gz), so identical pages
+are kept once however often they are fetched. A SQLite index records each
+fetch by URL and time, which lets old runs be re-parsed later (see
+FEFActivityScraper.backfill) when the markup or extract_activities changes.
+"""
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from atomic_file import write_atomic
+
+# Archive location (objects/ plus index.sqlite3)
+ARCHIVE_DIR = os.getenv('SCRAPER_ARCHIVE_DIR',
+                        os.path.join(os.path.dirname(os.path.abspath(__file__)), '.archive'))
+
+INDEX_FILE = 'index.sqlite3'
+
+_INDEX_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS pages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT NOT NULL,
+        registration_id INTEGER NULL,
+        fetched_at TEXT NOT NULL,
+        sha256 CHAR(64) NOT NULL,
+        size INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_url_time ON pages (url, fetched_at);
+    CREATE INDEX IF NOT EXISTS idx_registration_time ON pages (registration_id, fetched_at);
+    CREATE INDEX IF NOT EXISTS idx_sha256 ON pages (sha256);
+"""
+
+
+class ArchivedPage(NamedTuple):
+    """One archived fetch"""
+    id: int
+    url: str
+    registration_id: Optional[int]
+    fetched_at: datetime
+    sha256: str
+    size: int
+
+
+class PageArchive:
+    """Content-addressed page store with a URL/time index (thread-safe)"""
+
+    def __init__(self, archive_dir: str = ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._index is None:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            self._index = sqlite3.connect(os.path.join(self.archive_dir, INDEX_FILE),
+                                          check_same_thread=False)
+            self._index.executescript(_INDEX_SCHEMA)
+        return self._index
+
+    def object_path(self, sha256: str) -> str:
+        """Path of the compressed page with a given content address"""
+        return os.path.join(self.archive_dir, 'objects', sha256[:2], f"{sha256}.html.gz")
+
+    def put(self, url: str, text: str, registration_id: int = None,
+            fetched_at: datetime = None) -> str:
+        """
+        Archive a fetched page
+
+        The compressed body is only written if no page with the same content
+        is stored yet; the fetch is always added to the index.
+
+        Args:
+            url: URL the page was fetched from
+            text: Page text
+            registration_id: Registration list of a listing page (None for other pages)
+            fetched_at: Fetch time (default: now)
+
+        Returns:
+            The page's content address
+        """
+        data = text.encode('utf-8')
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self.object_path(sha256)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_atomic(path, gzip.compress(data, mtime=0))
+
+        fetched_at = fetched_at or datetime.now()
+        with self._lock:
+            index = self._connect()
+            index.execute("""
+                INSERT INTO pages (url, registration_id, fetched_at, sha256, size)
+                VALUES (?, ?, ?, ?, ?)
+            """, (url, registration_id, fetched_at.isoformat(sep=' ', timespec='seconds'), sha256, len(data)))
+            index.commit()
+        return sha256
+
+    def get(self, sha256: str) -> str:
+        """
+        Read an archived page
+
+        Raises:
+            FileNotFoundError: If no page with that content address is stored
+        """
+        with gzip.open(self.object_path(sha256), 'rt', encoding='utf-8') as f:
+            return f.read()
+
+    def pages(self, url: str = None, listings_only: bool = False, since: datetime = None,
+              until: datetime = None) -> List[ArchivedPage]:
+        """
+        List archived fetches, oldest first
+
+        Args:
+            url: Only fetches of this URL
+            listings_only: Only listing pages (fetches with a registration list)
+            since: Only fetches at or after this time
+            until: Only fetches before this time
+
+        Returns:
+            List of ArchivedPage
+        """
+        query = "SELECT id, url, registration_id, fetched_at, sha256, size FROM pages WHERE 1 = 1"
+        params = []
+        if url is not None:
+            query += " AND url = ?"
+            params.append(url)
+        if listings_only:
+            query += " AND registration_id IS NOT NULL"
+        if since is not None:
+            query += " AND fetched_at >= ?"
+            params.append(since.isoformat(sep=' ', timespec='seconds'))
+        if until is not None:
+            query += " AND fetched_at < ?"
+            params.append(until.isoformat(sep=' ', timespec='seconds'))
+        query += " ORDER BY fetched_at, id"
+        with self._lock:
+            rows = self._connect().execute(query, params).fetchall()
+        return [ArchivedPage(row[0], row[1], row[2], datetime.fromisoformat(row[3]), row[4], row[5])
+                for row in rows]
+
+    def close(self):
+        """Close the index"""
+        with self._lock:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
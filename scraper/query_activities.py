@@ -1,213 +1,732 @@
 """
 Example script to query activities from the database
 
-This demonstrates how to query and display the scraped data.
+This demonstrates how to query and display the scraped data. Run without
+arguments for the interactive menu; with arguments it is the scriptable
+CLI of query_cli (e.g. ``python query_activities.py list --format json``).
+
+The MySQL access layer (and with it mysql-connector) is imported on the
+first query that misses the cache, so a query answered from the on-disk
+query cache starts fast.
 """
 
-import mysql.connector
-from mysql.connector import Error
-import os
-from dotenv import load_dotenv
-from typing import List, Tuple
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from activity import ACTIVITY_FIELDS, Activity
+from query_cache import QueryCache
+from schedules import WEEKDAY_NAMES, format_minutes, parse_date, parse_time, parse_weekday, site_now
+from search_index import SearchIndex, build_documents, fold_text
+from timetable import Candidate, TimetablePlanner
+from versions import HISTORY_FIELDS, OPEN_VERSION_END, changed_fields
+
+# Fuzzy name search, synced with the activities table when the data version changes
+_search_index = SearchIndex()
+_search_records = {}
+
+# ACTIVITY_FIELDS read from activities (alias a) joined with categories (alias c)
+_ACTIVITY_SELECT = ', '.join('c.name' if field == 'category' else f'a.{field}' for field in ACTIVITY_FIELDS)
+_CATEGORY_JOIN = "JOIN categories c ON c.id = a.category_id"
+
+# categories.name compares exactly (utf8mb4_bin); list categories in dictionary order
+_CATEGORY_ORDER = "c.name COLLATE utf8mb4_unicode_ci"
+
+# Connection shared by the queries inside a shared_connection() block
+_session = threading.local()
+
+# Database errors reported so far (see report_error)
+_errors = 0
+
+
+class _SharedConnection:
+    """Connection of a shared_connection() block; close() keeps it checked out"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        pass
+
+
+def _checkout():
+    """
+    Get a connection: the block's shared one, or a fresh one from the pool
+
+    Raises:
+        mysql.connector.Error: If connecting fails
+    """
+    from database import DB_CONFIG, get_connection
+    if getattr(_session, 'active', False):
+        if _session.connection is None:
+            _session.connection = get_connection(DB_CONFIG)
+        return _SharedConnection(_session.connection)
+    return get_connection(DB_CONFIG)
+
+
+@contextmanager
+def shared_connection() -> Iterator[None]:
+    """
+    Run the queries inside the block over one pooled connection
+
+    The connection is only checked out when a query misses the cache, and
+    returned to the pool when the block ends.
+    """
+    _session.active, _session.connection = True, None
+    try:
+        yield
+    finally:
+        connection, _session.active, _session.connection = _session.connection, False, None
+        if connection is not None:
+            connection.close()
+
+
+def report_error(error: Exception):
+    """Print a database error to stderr and count it"""
+    global _errors
+    _errors += 1
+    print(f"Error: {error}", file=sys.stderr)
+
+
+def error_count() -> int:
+    """Number of database errors reported so far"""
+    return _errors
 
-# Load environment variables
-load_dotenv()
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'database': os.getenv('DB_NAME', 'fef_activities'),
-    'user': os.getenv('DB_USER', 'root'),
-    'password': os.getenv('DB_PASSWORD', ''),
-}
+# Read-through cache for the category list, listings and statistics
+_cache = QueryCache(connect=_checkout)
 
 
 def connect_to_database():
-    """Connect to MySQL database"""
+    """Check out a connection from the shared pool (close() returns it)"""
+    from mysql.connector import Error
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = _checkout()
         if connection.is_connected():
             return connection
     except Error as e:
-        print(f"Error: {e}")
+        report_error(e)
         return None
 
 
-def display_all_activities():
-    """Display all activities grouped by category"""
+def _query_rows(query: str, params: tuple = ()) -> Optional[List[Tuple]]:
+    """Run a read query on a pooled connection; None if it failed"""
     connection = connect_to_database()
     if not connection:
-        return
+        return None
     
+    from mysql.connector import Error
     try:
-        cursor = connection.cursor()
-        query = """
-            SELECT category, class_name, schedule, cost, enrollment_deadline
-            FROM activities
-            ORDER BY category, class_name
-        """
-        cursor.execute(query)
-        results = cursor.fetchall()
-        
-        current_category = None
-        print("\n" + "="*80)
-        print("FEF UNICAMP ACTIVITIES")
-        print("="*80)
+        return connection.fetch_all(query, params)
+    except Error as e:
+        report_error(e)
+        return None
+    finally:
+        connection.close()
+
+
+def _load_activity_records() -> Optional[List[Activity]]:
+    """Read every activity as an Activity record (see get_activity_records); None if it failed"""
+    rows = _query_rows(f"""
+        SELECT a.id, {_ACTIVITY_SELECT}
+        FROM activities a {_CATEGORY_JOIN}
+        ORDER BY {_CATEGORY_ORDER}, a.class_name
+    """)
+    if rows is None:
+        return None
+    return [Activity.from_values(row[1:], row[0]) for row in rows]
+
+
+def get_activity_records() -> List[Activity]:
+    """
+    Get every stored activity ordered by category and class (cached per data version)
+    
+    The listings and the name search are served from these records.
+    
+    Returns:
+        List of Activity with their row IDs
+    """
+    return _cache.get_or_load('activity_records', (), _load_activity_records) or []
+
+
+def _listing_row(activity: Activity) -> Tuple:
+    return (activity.category, activity.class_name, activity.schedule, activity.cost,
+            activity.enrollment_deadline)
+
+
+def get_all_activities() -> List[Tuple]:
+    """
+    Get all activities ordered by category and class (cached per data version)
+    
+    Returns:
+        List of (category, class_name, schedule, cost, enrollment_deadline)
+    """
+    return [_listing_row(activity) for activity in get_activity_records()]
+
+
+def get_activities_by_category(category: str) -> List[Tuple]:
+    """
+    Get the activities of a category (cached per data version)
+    
+    The name is matched ignoring case and accents.
+    
+    Returns:
+        List of (class_name, schedule, cost, enrollment_deadline)
+    """
+    folded = fold_text(category)
+    return [_listing_row(activity)[1:] for activity in get_activity_records()
+            if fold_text(activity.category) == folded]
+
+
+def display_all_activities():
+    """Display all activities grouped by category"""
+    results = get_all_activities()
+    
+    current_category = None
+    print("\n" + "="*80)
+    print("FEF UNICAMP ACTIVITIES")
+    print("="*80)
+    
+    for row in results:
+        category, class_name, schedule, cost, deadline = row
         
-        for row in results:
-            category, class_name, schedule, cost, deadline = row
-            
-            # Print category header when it changes
-            if category != current_category:
-                current_category = category
-                print(f"\n{'─'*80}")
-                print(f"📚 {category}")
-                print(f"{'─'*80}")
-            
-            # Format cost
-            cost_str = f"R$ {cost:.2f}" if cost > 0 else "FREE"
-            
-            print(f"\n  🏃 {class_name}")
-            print(f"     ⏰ Schedule: {schedule}")
-            print(f"     💰 Cost: {cost_str}")
-            print(f"     📅 Enrollment: {deadline}")
+        # Print category header when it changes
+        if category != current_category:
+            current_category = category
+            print(f"\n{'─'*80}")
+            print(f"📚 {category}")
+            print(f"{'─'*80}")
         
-        print("\n" + "="*80)
-        print(f"Total activities: {len(results)}")
-        print("="*80 + "\n")
+        # Format cost
+        cost_str = f"R$ {cost:.2f}" if cost > 0 else "FREE"
         
-        cursor.close()
-    except Error as e:
-        print(f"Error: {e}")
-    finally:
-        if connection.is_connected():
-            connection.close()
+        print(f"\n  🏃 {class_name}")
+        print(f"     ⏰ Schedule: {schedule}")
+        print(f"     💰 Cost: {cost_str}")
+        print(f"     📅 Enrollment: {deadline}")
+    
+    print("\n" + "="*80)
+    print(f"Total activities: {len(results)}")
+    print("="*80 + "\n")
 
 
 def display_activities_by_category(category: str):
     """Display activities for a specific category"""
-    connection = connect_to_database()
-    if not connection:
-        return
+    results = get_activities_by_category(category)
     
-    try:
-        cursor = connection.cursor()
-        query = """
-            SELECT class_name, schedule, cost, enrollment_deadline
-            FROM activities
-            WHERE category = %s
-            ORDER BY class_name
-        """
-        cursor.execute(query, (category,))
-        results = cursor.fetchall()
+    print(f"\n{'='*80}")
+    print(f"Activities in category: {category}")
+    print(f"{'='*80}")
+    
+    for row in results:
+        class_name, schedule, cost, deadline = row
+        cost_str = f"R$ {cost:.2f}" if cost > 0 else "FREE"
+        
+        print(f"\n  🏃 {class_name}")
+        print(f"     ⏰ {schedule}")
+        print(f"     💰 {cost_str}")
+        print(f"     📅 {deadline}")
+    
+    print(f"\n{'='*80}")
+    print(f"Total: {len(results)} activities")
+    print(f"{'='*80}\n")
+
+
+def get_all_categories() -> List[str]:
+    """Get list of all categories (cached per data version)"""
+    rows = _cache.get_or_load('categories', (), lambda: _query_rows(f"""
+        SELECT c.name FROM categories c
+        WHERE EXISTS (SELECT 1 FROM activities a WHERE a.category_id = c.id)
+        ORDER BY {_CATEGORY_ORDER}
+    """))
+    return [row[0] for row in rows] if rows else []
+
+
+def _sync_search_index() -> bool:
+    """Re-index activity names if a new scrape landed; False if activities could not be read"""
+    version = _cache.current_version()
+    if _search_records and version is not None and version == _search_index.version:
+        return True
+    records = _cache.get_or_load('activity_records', (), _load_activity_records)
+    if records is None:
+        return False
+    _search_records.clear()
+    _search_records.update((activity.id, activity) for activity in records)
+    _search_index.update(build_documents((activity.id, activity.category, activity.class_name)
+                                         for activity in records), version)
+    return True
+
+
+def search_activities(query: str, limit: int = 20) -> List[Tuple]:
+    """
+    Fuzzy, accent-insensitive search over class names and categories
+
+    "judo", "natacao" or "taichi" find "Judô", "Natação" and "Taichichuan"
+    (see search_index for the scoring).
+
+    Args:
+        query: Free text to look for
+        limit: Maximum number of results
+
+    Returns:
+        List of (category, class_name, schedule, cost, enrollment_deadline, score),
+        best matches first
+    """
+    if not _sync_search_index():
+        return []
+    return [_listing_row(_search_records[activity_id]) + (score,)
+            for activity_id, score in _search_index.search(query, limit)
+            if activity_id in _search_records]
+
+
+def get_timetable_candidates() -> List[Candidate]:
+    """
+    Get every activity with its weekly sessions, for timetable combinations (cached per data version)
+    
+    Returns:
+        List of Candidate with the activity ID as id; activities whose
+        schedule has no fixed weekday have no sessions
+    """
+    rows = _cache.get_or_load('timetable_candidates', (), lambda: _query_rows("""
+        SELECT a.id, c.name, a.class_name, a.cost, a.schedule, s.weekday, s.start_minute, s.end_minute
+        FROM activities a
+        JOIN categories c ON c.id = a.category_id
+        LEFT JOIN activity_sessions s ON s.activity_id = a.id
+        ORDER BY a.id, s.weekday, s.start_minute
+    """)) or []
+    candidates = {}
+    for activity_id, category, class_name, cost, schedule, weekday, start, end in rows:
+        candidate = candidates.setdefault(activity_id, Candidate(activity_id, category, class_name, cost, (), schedule))
+        if weekday is not None:
+            candidates[activity_id] = candidate._replace(sessions=candidate.sessions + ((weekday, start, end),))
+    return list(candidates.values())
+
+
+def plan_timetable(**constraints) -> TimetablePlanner:
+    """
+    Combine the stored activities without clashes
+    
+    Args:
+        **constraints: max_cost, categories, busy, required (activity IDs),
+                       min_size and max_size (see TimetablePlanner)
+    
+    Returns:
+        TimetablePlanner; use combinations() or count()
+    """
+    return TimetablePlanner(get_timetable_candidates(), **constraints)
+
+
+def display_search_results(query: str):
+    """Display the activities best matching a search query"""
+    results = search_activities(query)
+
+    print(f"\n{'='*80}")
+    print(f"Search results for: {query}")
+    print(f"{'='*80}")
+
+    for category, class_name, schedule, cost, deadline, score in results:
+        cost_str = f"R$ {cost:.2f}" if cost > 0 else "FREE"
+
+        print(f"\n  🏃 {class_name} ({category})")
+        print(f"     ⏰ {schedule}")
+        print(f"     💰 {cost_str}")
+        print(f"     📅 {deadline}")
+
+    print(f"\n{'='*80}")
+    print(f"Total: {len(results)} activities")
+    print(f"{'='*80}\n")
+
+
+def find_activities_by_time(weekday: int, start_minute: int = 0, end_minute: int = 24 * 60) -> List[Tuple]:
+    """
+    Find activities with a session on a weekday inside a time window
+    
+    Uses the (weekday, start_minute, end_minute) index of activity_sessions,
+    e.g. "Tuesday after 18:00" is find_activities_by_time(1, 18 * 60).
+    
+    Args:
+        weekday: Day of the week, Monday = 0
+        start_minute: Earliest session start, in minutes from midnight
+        end_minute: Latest session end, in minutes from midnight
         
-        print(f"\n{'='*80}")
-        print(f"Activities in category: {category}")
-        print(f"{'='*80}")
+    Returns:
+        List of (category, class_name, schedule, cost, start_minute, end_minute)
+        ordered by start time
+    """
+    return _query_rows(f"""
+        SELECT c.name, a.class_name, a.schedule, a.cost, s.start_minute, s.end_minute
+        FROM activity_sessions s
+        JOIN activities a ON a.id = s.activity_id
+        {_CATEGORY_JOIN}
+        WHERE s.weekday = %s AND s.start_minute >= %s AND s.end_minute <= %s
+        ORDER BY s.start_minute, {_CATEGORY_ORDER}, a.class_name
+    """, (weekday, start_minute, end_minute)) or []
+
+
+def get_unscheduled_activities() -> List[Tuple]:
+    """
+    Get activities whose schedule could not be parsed into sessions
+    
+    Returns:
+        List of (category, class_name, schedule) with the raw schedule text
+    """
+    return _query_rows(f"""
+        SELECT c.name, a.class_name, a.schedule
+        FROM activities a
+        {_CATEGORY_JOIN}
+        LEFT JOIN activity_sessions s ON s.activity_id = a.id
+        WHERE s.id IS NULL
+        ORDER BY {_CATEGORY_ORDER}, a.class_name
+    """) or []
+
+
+def display_activities_by_time(weekday: int, start_minute: int = 0, end_minute: int = 24 * 60):
+    """Display activities with a session on a weekday inside a time window"""
+    results = find_activities_by_time(weekday, start_minute, end_minute)
+    
+    print(f"\n{'='*80}")
+    print(f"Activities on {WEEKDAY_NAMES[weekday]} between "
+          f"{format_minutes(start_minute)} and {format_minutes(end_minute)}")
+    print(f"{'='*80}")
+    
+    for category, class_name, schedule, cost, start, end in results:
+        cost_str = f"R$ {cost:.2f}" if cost > 0 else "FREE"
+        print(f"\n  🏃 {class_name} ({category})")
+        print(f"     ⏰ {format_minutes(start)} - {format_minutes(end)}  [{schedule}]")
+        print(f"     💰 {cost_str}")
+    
+    print(f"\n{'='*80}")
+    print(f"Total: {len(results)} sessions")
+    
+    unscheduled = get_unscheduled_activities()
+    if unscheduled:
+        print(f"\n⚠ {len(unscheduled)} activities have schedules without a fixed weekday:")
+        for category, class_name, schedule in unscheduled:
+            print(f"   • {class_name} ({category}): {schedule}")
+    print(f"{'='*80}\n")
+
+
+def find_open_enrollments(now: Optional[datetime] = None,
+                          closing_within_hours: Optional[float] = None) -> List[Tuple]:
+    """
+    Find activities whose enrollment window is open
+    
+    Filters on enrollment_opens_at / enrollment_closes_at through the
+    idx_enrollment_window index instead of parsing the text of every row.
+    
+    Args:
+        now: Reference time in site-local time (default: current time in SITE_TIMEZONE)
+        closing_within_hours: Only activities closing within this many hours
         
-        for row in results:
-            class_name, schedule, cost, deadline = row
-            cost_str = f"R$ {cost:.2f}" if cost > 0 else "FREE"
-            
-            print(f"\n  🏃 {class_name}")
-            print(f"     ⏰ {schedule}")
-            print(f"     💰 {cost_str}")
-            print(f"     📅 {deadline}")
+    Returns:
+        List of (category, class_name, cost, enrollment_opens_at, enrollment_closes_at)
+        ordered by closing time
+    """
+    if now is None:
+        now = site_now()
+    until = now + timedelta(hours=closing_within_hours) if closing_within_hours is not None else None
+    
+    query = f"""
+        SELECT c.name, a.class_name, a.cost, a.enrollment_opens_at, a.enrollment_closes_at
+        FROM activities a
+        {_CATEGORY_JOIN}
+        WHERE a.enrollment_closes_at > %s
+    """
+    params = [now]
+    if until is not None:
+        query += " AND a.enrollment_closes_at <= %s"
+        params.append(until)
+    query += f"""
+          AND (a.enrollment_opens_at IS NULL OR a.enrollment_opens_at <= %s)
+        ORDER BY a.enrollment_closes_at, {_CATEGORY_ORDER}, a.class_name
+    """
+    params.append(now)
+    return _query_rows(query, tuple(params)) or []
+
+
+def open_now() -> List[Tuple]:
+    """Activities whose enrollment is open right now (see find_open_enrollments)"""
+    return find_open_enrollments()
+
+
+def closing_within(hours: float) -> List[Tuple]:
+    """Open activities whose enrollment closes within ``hours`` (see find_open_enrollments)"""
+    return find_open_enrollments(closing_within_hours=hours)
+
+
+def display_open_enrollments(closing_within_hours: Optional[float] = None):
+    """Display activities with open enrollment, soonest closing first"""
+    if closing_within_hours is None:
+        results = open_now()
+        title = "Open enrollments"
+    else:
+        results = closing_within(closing_within_hours)
+        title = f"Enrollments closing within {closing_within_hours:g} hours"
+    
+    print(f"\n{'='*80}")
+    print(title)
+    print(f"{'='*80}")
+    
+    for category, class_name, cost, opens_at, closes_at in results:
+        cost_str = f"R$ {cost:.2f}" if cost > 0 else "FREE"
+        print(f"\n  🏃 {class_name} ({category})")
+        print(f"     📅 Closes: {closes_at:%d/%m/%Y %H:%M}")
+        print(f"     💰 {cost_str}")
+    
+    print(f"\n{'='*80}")
+    print(f"Total: {len(results)} activities")
+    print(f"{'='*80}\n")
+
+
+def get_activities_as_of(when: datetime, class_name: Optional[str] = None) -> List[Tuple]:
+    """
+    Get the activities as they were at a point in time (cached per data version)
+    
+    Reads activity_versions through its (valid_to, valid_from) index, e.g.
+    what a class cost last semester.
+    
+    Args:
+        when: Point in time, site-local
+        class_name: Only classes whose name contains this text
         
-        print(f"\n{'='*80}")
-        print(f"Total: {len(results)} activities")
-        print(f"{'='*80}\n")
+    Returns:
+        List of (category, class_name, schedule, cost, enrollment_deadline)
+    """
+    query = """
+        SELECT category, class_name, schedule, cost, enrollment_deadline
+        FROM activity_versions
+        WHERE valid_to > %s AND valid_from <= %s
+    """
+    params = [when, when]
+    if class_name:
+        query += " AND class_name LIKE %s"
+        params.append(f"%{class_name}%")
+    query += " ORDER BY category, class_name"
+    return _cache.get_or_load('activities_as_of', (when, class_name),
+                              lambda: _query_rows(query, tuple(params))) or []
+
+
+def get_change_log(since: datetime, until: datetime = OPEN_VERSION_END,
+                   class_name: Optional[str] = None) -> List[Tuple]:
+    """
+    Get the changes to activities within a time window (cached per data version)
+    
+    Versions starting in the window are joined with the version they
+    replaced, and versions ending in the window without a successor are
+    reported as removals. Both use the valid_from / valid_to indexes.
+    
+    Args:
+        since: Start of the window, site-local (inclusive)
+        until: End of the window (exclusive; default: no end)
+        class_name: Only classes whose name contains this text
         
-        cursor.close()
-    except Error as e:
-        print(f"Error: {e}")
-    finally:
-        if connection.is_connected():
-            connection.close()
+    Returns:
+        List of (changed_at, category, class_name, change, fields) ordered by
+        time, where change is 'added', 'changed' or 'removed' and fields is a
+        list of (field, old, new) for changes
+    """
+    return _cache.get_or_load('change_log', (since, until, class_name),
+                              lambda: _load_change_log(since, until, class_name)) or []
 
 
-def get_all_categories() -> List[str]:
-    """Get list of all categories"""
-    connection = connect_to_database()
-    if not connection:
-        return []
+def _load_change_log(since: datetime, until: datetime, class_name: Optional[str]) -> Optional[List[Tuple]]:
+    """Read and diff the versions of a change log window (see get_change_log), or None if failed"""
+    columns = ', '.join(f"v.{field}" for field in HISTORY_FIELDS)
+    previous_columns = ', '.join(f"p.{field}" for field in HISTORY_FIELDS)
+    name_filter = " AND v.class_name LIKE %s" if class_name else ""
+    name_params = (f"%{class_name}%",) if class_name else ()
+    width = len(HISTORY_FIELDS)
     
-    try:
-        cursor = connection.cursor()
-        query = "SELECT DISTINCT category FROM activities ORDER BY category"
-        cursor.execute(query)
-        results = cursor.fetchall()
-        cursor.close()
-        return [row[0] for row in results]
-    except Error as e:
-        print(f"Error: {e}")
-        return []
-    finally:
-        if connection.is_connected():
-            connection.close()
+    started = _query_rows(f"""
+        SELECT v.valid_from, p.id, {columns}, {previous_columns}
+        FROM activity_versions v
+        LEFT JOIN activity_versions p ON p.activity_key = v.activity_key AND p.valid_to = v.valid_from
+        WHERE v.valid_from >= %s AND v.valid_from < %s{name_filter}
+    """, (since, until) + name_params)
+    ended = _query_rows(f"""
+        SELECT v.valid_to, {columns}
+        FROM activity_versions v
+        LEFT JOIN activity_versions n ON n.activity_key = v.activity_key AND n.valid_from = v.valid_to
+        WHERE v.valid_to >= %s AND v.valid_to < %s AND n.id IS NULL{name_filter}
+    """, (since, min(until, OPEN_VERSION_END)) + name_params)
+    if started is None or ended is None:
+        # Not cached, so the next call retries
+        return None
+    
+    log = []
+    for row in started:
+        new = row[2:2 + width]
+        if row[1] is None:
+            log.append((row[0], new[0], new[1], 'added', []))
+        else:
+            old = row[2 + width:]
+            fields = [(field, old[HISTORY_FIELDS.index(field)], new[HISTORY_FIELDS.index(field)])
+                      for field in changed_fields(HISTORY_FIELDS, old, new)]
+            # Versions that only differ in parsed columns are not worth listing
+            if fields:
+                log.append((row[0], new[0], new[1], 'changed', fields))
+    for row in ended:
+        log.append((row[0], row[1], row[2], 'removed', []))
+    log.sort(key=lambda entry: (entry[0], entry[1], entry[2]))
+    return log
 
 
-def display_statistics():
-    """Display statistics about the activities"""
+def display_activities_as_of(when: datetime, class_name: Optional[str] = None):
+    """Display the activities as they were at a point in time"""
+    results = get_activities_as_of(when, class_name)
+    
+    print(f"\n{'='*80}")
+    print(f"Activities as of {when:%d/%m/%Y %H:%M}")
+    print(f"{'='*80}")
+    
+    for category, class_name, schedule, cost, deadline in results:
+        cost_str = f"R$ {cost:.2f}" if cost > 0 else "FREE"
+        print(f"\n  🏃 {class_name} ({category})")
+        print(f"     ⏰ {schedule}")
+        print(f"     💰 {cost_str}")
+        print(f"     📅 {deadline}")
+    
+    print(f"\n{'='*80}")
+    print(f"Total: {len(results)} activities")
+    print(f"{'='*80}\n")
+
+
+def display_change_log(since: datetime, class_name: Optional[str] = None):
+    """Display the changes to activities since a point in time"""
+    results = get_change_log(since, class_name=class_name)
+    
+    print(f"\n{'='*80}")
+    print(f"Changes since {since:%d/%m/%Y %H:%M}")
+    print(f"{'='*80}")
+    
+    symbols = {'added': '➕', 'changed': '✏️', 'removed': '➖'}
+    for changed_at, category, class_name, change, fields in results:
+        print(f"\n  {symbols[change]} {changed_at:%d/%m/%Y %H:%M}  {class_name} ({category}): {change}")
+        for field, old, new in fields:
+            print(f"     {field}: {old} → {new}")
+    
+    print(f"\n{'='*80}")
+    print(f"Total: {len(results)} changes")
+    print(f"{'='*80}\n")
+
+
+def get_statistics() -> Optional[Dict]:
+    """
+    Get activity statistics (cached per data version)
+    
+    Reads the activity_stats rows stored by the latest successful scrape
+    (one primary-key range read). Falls back to aggregating the activities
+    table if no statistics have been stored yet.
+    
+    Returns:
+        Dictionary with total, free, avg_cost, min_cost, max_cost, by_category
+        (list of (category, count)) and scrape_id (None for live aggregates),
+        or None if failed
+    """
+    return _cache.get_or_load('statistics', (), _load_statistics)
+
+
+def _load_statistics() -> Optional[Dict]:
+    """Read the latest stored statistics, or aggregate live (see get_statistics)"""
     connection = connect_to_database()
     if not connection:
-        return
+        return None
     
+    from database import STATS_ALL_CATEGORIES
+    from mysql.connector import Error
     try:
-        cursor = connection.cursor()
-        
-        # Total activities
-        cursor.execute("SELECT COUNT(*) FROM activities")
-        total = cursor.fetchone()[0]
+        rows = connection.fetch_all("""
+            SELECT scrape_id, category, total_activities, free_activities, avg_cost, min_cost, max_cost
+            FROM activity_stats
+            WHERE scrape_id = (SELECT MAX(scrape_id) FROM activity_stats)
+            ORDER BY total_activities DESC, category
+        """)
+        if rows:
+            overall = next(row for row in rows if row[1] == STATS_ALL_CATEGORIES)
+            return {
+                'scrape_id': overall[0],
+                'total': overall[2],
+                'free': overall[3],
+                'avg_cost': overall[4],
+                'min_cost': overall[5],
+                'max_cost': overall[6],
+                'by_category': [(row[1], row[2]) for row in rows if row[1] != STATS_ALL_CATEGORIES]
+            }
         
-        # Activities by category
-        cursor.execute("""
-            SELECT category, COUNT(*) as count
+        # No stored statistics yet: aggregate live
+        total, free_count, avg_cost, min_cost, max_cost = connection.fetch_all("""
+            SELECT COUNT(*), SUM(cost = 0),
+                   AVG(CASE WHEN cost > 0 THEN cost END),
+                   MIN(CASE WHEN cost > 0 THEN cost END),
+                   MAX(CASE WHEN cost > 0 THEN cost END)
             FROM activities
-            GROUP BY category
-            ORDER BY count DESC
+        """)[0]
+        # Counted on the category_id index, names joined afterwards
+        by_category = connection.fetch_all("""
+            SELECT c.name, counts.count
+            FROM (SELECT category_id, COUNT(*) AS count FROM activities GROUP BY category_id) counts
+            JOIN categories c ON c.id = counts.category_id
+            ORDER BY counts.count DESC
         """)
-        by_category = cursor.fetchall()
-        
-        # Free activities
-        cursor.execute("SELECT COUNT(*) FROM activities WHERE cost = 0")
-        free_count = cursor.fetchone()[0]
-        
-        # Average cost
-        cursor.execute("SELECT AVG(cost) FROM activities WHERE cost > 0")
-        avg_cost = cursor.fetchone()[0]
-        
-        # Price range
-        cursor.execute("SELECT MIN(cost), MAX(cost) FROM activities WHERE cost > 0")
-        min_cost, max_cost = cursor.fetchone()
-        
-        print("\n" + "="*80)
-        print("STATISTICS")
-        print("="*80)
-        print(f"\n📊 Total Activities: {total}")
-        print(f"🆓 Free Activities: {free_count}")
-        print(f"💵 Paid Activities: {total - free_count}")
-        
-        if avg_cost:
-            print(f"\n💰 Price Statistics (paid activities):")
-            print(f"   Average: R$ {avg_cost:.2f}")
-            print(f"   Range: R$ {min_cost:.2f} - R$ {max_cost:.2f}")
-        
-        print(f"\n📚 Activities by Category:")
-        for category, count in by_category:
-            print(f"   • {category}: {count}")
-        
-        print("="*80 + "\n")
-        
-        cursor.close()
+        return {
+            'scrape_id': None,
+            'total': total,
+            'free': free_count or 0,
+            'avg_cost': avg_cost,
+            'min_cost': min_cost,
+            'max_cost': max_cost,
+            'by_category': by_category
+        }
     except Error as e:
-        print(f"Error: {e}")
+        report_error(e)
+        return None
     finally:
-        if connection.is_connected():
-            connection.close()
+        connection.close()
+
+
+def cache_stats() -> Dict:
+    """Hit/miss counters of the query cache (see QueryCache.stats)"""
+    return _cache.stats()
+
+
+def display_statistics():
+    """Display statistics about the activities"""
+    stats = get_statistics()
+    if stats is None:
+        return
+    
+    total, free_count = stats['total'], stats['free']
+    
+    print("\n" + "="*80)
+    print("STATISTICS")
+    print("="*80)
+    print(f"\n📊 Total Activities: {total}")
+    print(f"🆓 Free Activities: {free_count}")
+    print(f"💵 Paid Activities: {total - free_count}")
+    
+    if stats['avg_cost']:
+        print(f"\n💰 Price Statistics (paid activities):")
+        print(f"   Average: R$ {stats['avg_cost']:.2f}")
+        print(f"   Range: R$ {stats['min_cost']:.2f} - R$ {stats['max_cost']:.2f}")
+    
+    print(f"\n📚 Activities by Category:")
+    for category, count in stats['by_category']:
+        print(f"   • {category}: {count}")
+    
+    print("="*80 + "\n")
 
 
 def main():
-    """Main menu"""
+    """Main menu (or the query_cli commands, when given arguments)"""
+    if len(sys.argv) > 1:
+        import query_cli
+        sys.exit(query_cli.main())
+    
     while True:
         print("\n" + "="*80)
         print("FEF UNICAMP Activities Database Query Tool")
@@ -216,9 +735,15 @@ def main():
         print("2. Display activities by category")
         print("3. Display statistics")
         print("4. List all categories")
-        print("5. Exit")
+        print("5. Find activities by day and time")
+        print("6. Display open enrollments")
+        print("7. Display enrollments closing soon")
+        print("8. Search activities by name")
+        print("9. Display activities as of a date")
+        print("10. Display change log")
+        print("11. Exit")
         
-        choice = input("\nEnter your choice (1-5): ").strip()
+        choice = input("\nEnter your choice (1-11): ").strip()
         
         if choice == '1':
             display_all_activities()
@@ -245,6 +770,43 @@ def main():
             for cat in categories:
                 print(f"  • {cat}")
         elif choice == '5':
+            weekday = parse_weekday(input("\nDay of the week (e.g. Seg, Ter, Qua): "))
+            if weekday is None:
+                print("Invalid day")
+                continue
+            start = parse_time(input("From (HH:MM, blank for any): ") or '00:00')
+            end = parse_time(input("Until (HH:MM, blank for any): ") or '24:00')
+            if start is None or end is None:
+                print("Invalid time")
+                continue
+            display_activities_by_time(weekday, start, end)
+        elif choice == '6':
+            display_open_enrollments()
+        elif choice == '7':
+            try:
+                hours = float(input("\nClosing within how many hours? ").strip() or '48')
+            except ValueError:
+                print("Invalid input")
+                continue
+            display_open_enrollments(hours)
+        elif choice == '8':
+            query = input("\nSearch for: ").strip()
+            if query:
+                display_search_results(query)
+        elif choice in ('9', '10'):
+            when = parse_date(input("\nDate (DD/MM/YYYY [HH:MM]): "), end_of_day=choice == '9')
+            if when is None:
+                print("Invalid date")
+                continue
+            class_name = input("Class name contains (blank for all): ").strip() or None
+            if choice == '9':
+                display_activities_as_of(when, class_name)
+            else:
+                display_change_log(when, class_name)
+        elif choice == '11':
+            stats = cache_stats()
+            print(f"\n📊 Query cache: {stats['hits']} hits, {stats['disk_hits']} disk hits, "
+                  f"{stats['misses']} misses, {stats['version_queries']} version checks")
             print("\nGoodbye!\n")
             break
         else:
@@ -0,0 +1,231 @@
+"""
+Version-aware read-through cache for activity queries
+
+Activities only change when the scraper commits a successful run, so query
+results are cached under the ID of the latest successful scraping_history
+row ("data version") and invalidate themselves when a new one appears.
+
+The data version is read from a version file that the scraper writes after
+every successful commit (cheap: one stat() per lookup). Without a version
+file it is read from MySQL at most once every QUERY_CACHE_VERSION_TTL
+seconds. Results live in an in-process LRU and, when QUERY_CACHE_DIR is
+set, also in pickle files there so they survive restarts.
+"""
+
+import glob
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from atomic_file import write_atomic, write_text_atomic
+
+# Settings may come from scraper/.env; python-dotenv is only imported if it exists
+_ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+if os.path.exists(_ENV_FILE):
+    from dotenv import load_dotenv
+    load_dotenv(_ENV_FILE)
+
+# Optional on-disk cache (and version file) location; unset keeps the cache in memory only
+CACHE_DIR = os.getenv('QUERY_CACHE_DIR') or None
+
+# Entries kept in the in-process LRU
+MAX_ENTRIES = int(os.getenv('QUERY_CACHE_SIZE', '256'))
+
+# Seconds between data version checks against MySQL when there is no version file
+VERSION_TTL = float(os.getenv('QUERY_CACHE_VERSION_TTL', '30'))
+
+VERSION_FILE = 'version'
+
+
+def publish_version(scrape_id: int, cache_dir: Optional[str] = CACHE_DIR):
+    """
+    Record a new data version for query caches sharing ``cache_dir``
+
+    Called by the scraper after a successful run commits. Does nothing if
+    no cache directory is configured.
+    """
+    if not cache_dir or scrape_id is None:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    write_text_atomic(os.path.join(cache_dir, VERSION_FILE), str(scrape_id))
+
+
+class QueryCache:
+    """In-process LRU (plus optional disk cache) keyed on the data version"""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, cache_dir: Optional[str] = CACHE_DIR,
+                 version_ttl: float = VERSION_TTL, connect: Callable = None):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Entries kept in memory
+            cache_dir: Directory for the disk cache and version file (None: memory only)
+            version_ttl: Seconds between version checks against MySQL
+            connect: Returns a connection for version checks (default: database.get_connection)
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.version_ttl = version_ttl
+        self._connect = connect
+        self._entries = OrderedDict()
+        self._entries_version = None
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = None
+        self._version_mtime = None
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'uncached': 0, 'version_queries': 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _version_from_file(self) -> Optional[int]:
+        path = os.path.join(self.cache_dir, VERSION_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        if mtime != self._version_mtime:
+            try:
+                with open(path, 'r') as f:
+                    self._version = int(f.read().strip())
+                self._version_mtime = mtime
+            except (OSError, ValueError):
+                return None
+        return self._version
+
+    def _version_from_database(self) -> Optional[int]:
+        now = time.monotonic()
+        if self._version_checked_at is not None and now - self._version_checked_at < self.version_ttl:
+            return self._version
+        self._stats['version_queries'] += 1
+        # Imported here so lookups answered from the version file never load mysql-connector
+        from mysql.connector import Error
+        try:
+            if self._connect is not None:
+                connection = self._connect()
+            else:
+                from database import get_connection
+                connection = get_connection()
+        except Error as e:
+            print(f"⚠ Warning: Could not check data version: {e}")
+            return None
+        try:
+            rows = connection.fetch_all("SELECT MAX(id) FROM scraping_history WHERE status = 'success'")
+            self._version = rows[0][0] if rows else None
+            self._version_checked_at = now
+            return self._version
+        except Error as e:
+            print(f"⚠ Warning: Could not check data version: {e}")
+            return None
+        finally:
+            connection.close()
+
+    def current_version(self) -> Optional[int]:
+        """ID of the latest successful scrape, or None if unknown"""
+        with self._lock:
+            if self.cache_dir:
+                version = self._version_from_file()
+                if version is not None:
+                    return version
+            return self._version_from_database()
+
+    def _disk_path(self, version: int, key: tuple) -> str:
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{version}-{digest}.pickle")
+
+    def _read_disk(self, version: int, key: tuple):
+        try:
+            with open(self._disk_path(version, key), 'rb') as f:
+                return True, pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError, AttributeError, ValueError):
+            return False, None
+
+    def _write_disk(self, version: int, key: tuple, value):
+        try:
+            write_atomic(self._disk_path(version, key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError as e:
+            print(f"⚠ Warning: Could not write query cache: {e}")
+            return
+        # Drop entries of older data versions
+        for path in glob.glob(os.path.join(self.cache_dir, '*-*.pickle')):
+            if not os.path.basename(path).startswith(f"{version}-"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def get_or_load(self, name: str, args: tuple, loader: Callable):
+        """
+        Return a cached query result, loading it on a miss
+
+        Args:
+            name: Query name
+            args: Query arguments (part of the key)
+            loader: Called without arguments on a miss; a None result is not cached
+
+        Returns:
+            The (possibly cached) result of loader()
+        """
+        version = self.current_version()
+        if version is None:
+            with self._lock:
+                self._stats['uncached'] += 1
+            return loader()
+
+        key = (version, name, args)
+        with self._lock:
+            if version != self._entries_version:
+                # New data landed; entries of the previous version are dead
+                self._entries.clear()
+                self._entries_version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return self._entries[key]
+
+        if self.cache_dir:
+            found, value = self._read_disk(version, key[1:])
+            if found:
+                with self._lock:
+                    self._stats['disk_hits'] += 1
+                self._remember(key, value)
+                return value
+
+        value = loader()
+        with self._lock:
+            self._stats['misses'] += 1
+        if value is not None:
+            self._remember(key, value)
+            if self.cache_dir:
+                self._write_disk(version, key[1:], value)
+        return value
+
+    def _remember(self, key: tuple, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all in-memory entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """
+        Get the cache counters
+
+        Returns:
+            Dictionary with hits, disk_hits, misses, uncached (no known data
+            version), version_queries (MySQL version checks), entries and version
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['version'] = self._version
+        return stats
@@ -0,0 +1,244 @@
+"""
+Scriptable command line for the activity queries
+
+Runs the queries of query_activities without the interactive menu and
+prints machine-readable results, e.g. for GDE's PHP views:
+
+    python query_cli.py list --format json
+    python query_cli.py category "Natação" --format csv
+    python query_cli.py search judo --limit 5 --format ndjson
+    python query_cli.py stats
+    python query_cli.py categories
+    python query_cli.py combine --max-cost 500 --busy "Seg, Qua - 08:00 às 12:00" --max-size 3
+
+``batch`` runs one command per line (from a file or stdin) over a single
+database connection and prints one result per command:
+
+    printf 'categories\nstats\nsearch judo\n' | python query_cli.py batch --format ndjson
+
+Results go to stdout; diagnostics go to stderr. Exit status: 0 on success,
+1 if a database error occurred, 2 for invalid arguments. Only light
+modules are imported at startup. mysql-connector is loaded by the first
+query that misses the query cache.
+"""
+
+import argparse
+import csv
+import shlex
+import sys
+from contextlib import redirect_stdout
+from decimal import Decimal
+from typing import Dict, List, Optional, TextIO, Tuple
+
+import query_activities
+from json_encoding import to_json
+from timetable import parse_busy_blocks
+
+FORMATS = ('json', 'ndjson', 'csv')
+
+# Query result: column names and rows
+Result = Tuple[Tuple[str, ...], List[tuple]]
+
+
+class UsageError(ValueError):
+    """Invalid command, e.g. a bad line in a batch file"""
+
+
+class _Parser(argparse.ArgumentParser):
+    """Argument parser that raises instead of exiting, so batch lines can fail alone"""
+
+    def error(self, message):
+        raise UsageError(f"{self.prog}: {message}")
+
+
+def _list_activities(args) -> Result:
+    return (('category', 'class_name', 'schedule', 'cost', 'enrollment_deadline'),
+            query_activities.get_all_activities())
+
+
+def _category_activities(args) -> Result:
+    return (('class_name', 'schedule', 'cost', 'enrollment_deadline'),
+            query_activities.get_activities_by_category(args.name))
+
+
+def _categories(args) -> Result:
+    return ('category',), [(category,) for category in query_activities.get_all_categories()]
+
+
+def _statistics(args) -> Result:
+    """Overall row (category '') followed by one row per category"""
+    columns = ('category', 'total', 'free', 'avg_cost', 'min_cost', 'max_cost')
+    stats = query_activities.get_statistics()
+    if stats is None:
+        return columns, []
+    rows = [('', stats['total'], stats['free'], stats['avg_cost'], stats['min_cost'], stats['max_cost'])]
+    rows.extend((category, count, None, None, None, None) for category, count in stats['by_category'])
+    return columns, rows
+
+
+def _search(args) -> Result:
+    return (('category', 'class_name', 'schedule', 'cost', 'enrollment_deadline', 'score'),
+            query_activities.search_activities(args.query, args.limit))
+
+
+def _busy_block(text: str) -> list:
+    try:
+        return parse_busy_blocks([text])
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _combine(args) -> Result:
+    """One row per class of each combination, or the number of combinations with --count"""
+    busy = [session for block in args.busy for session in block]
+    planner = query_activities.plan_timetable(max_cost=args.max_cost, categories=args.category, busy=busy,
+                                              required=args.required, min_size=args.min_size,
+                                              max_size=args.max_size)
+    if args.count:
+        return ('combinations',), [(planner.count(),)]
+    rows = [(number, combination.total_cost, candidate.id, candidate.category, candidate.class_name,
+             candidate.cost, candidate.schedule)
+            for number, combination in enumerate(planner.combinations(args.limit), 1)
+            for candidate in combination.classes]
+    return ('combination', 'total_cost', 'id', 'category', 'class_name', 'cost', 'schedule'), rows
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Parser of the commands (also used for each line of a batch)"""
+    common = _Parser(add_help=False)
+    common.add_argument('--format', choices=FORMATS, default='json', help="Output format (default: %(default)s)")
+
+    parser = _Parser(prog='query_cli.py', description="Query the scraped FEF activities")
+    commands = parser.add_subparsers(dest='command', required=True, metavar='COMMAND',
+                                     parser_class=_Parser)
+
+    commands.add_parser('list', parents=[common], help="All activities").set_defaults(run=_list_activities)
+    category = commands.add_parser('category', parents=[common], help="Activities of a category")
+    category.add_argument('name', help="Category name, as listed by 'categories'")
+    category.set_defaults(run=_category_activities)
+    commands.add_parser('categories', parents=[common], help="Category names").set_defaults(run=_categories)
+    commands.add_parser('stats', parents=[common], help="Activity statistics").set_defaults(run=_statistics)
+    search = commands.add_parser('search', parents=[common], help="Accent-insensitive, typo-tolerant name search")
+    search.add_argument('query', help="Text to look for")
+    search.add_argument('--limit', type=int, default=20, help="Maximum results (default: %(default)s)")
+    search.set_defaults(run=_search)
+
+    combine = commands.add_parser('combine', parents=[common], help="Sets of classes without clashes")
+    combine.add_argument('--max-cost', type=Decimal, help="Budget for the total cost")
+    combine.add_argument('--category', action='append', help="Only this category (repeatable)")
+    combine.add_argument('--busy', type=_busy_block, action='append', default=[], metavar='BLOCK',
+                         help="Unavailable time, e.g. 'Seg, Qua - 08:00 às 12:00' (repeatable)")
+    combine.add_argument('--with', dest='required', type=int, action='append', default=[], metavar='ID',
+                         help="Activity ID every combination must contain (repeatable)")
+    combine.add_argument('--min-size', type=int, default=1, help="Fewest classes (default: %(default)s)")
+    combine.add_argument('--max-size', type=int, help="Most classes (default: unlimited)")
+    combine.add_argument('--count', action='store_true', help="Only count the combinations")
+    combine.add_argument('--limit', type=int, default=50, help="Most combinations listed (default: %(default)s)")
+    combine.set_defaults(run=_combine)
+
+    batch = commands.add_parser('batch', parents=[common], help="Run one command per line over one connection")
+    batch.add_argument('file', nargs='?', default='-', help="Command file (default: stdin)")
+    return parser
+
+
+def _records(result: Result) -> List[Dict]:
+    columns, rows = result
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def write_result(result: Result, output_format: str, out: TextIO):
+    """Write one query result in ``output_format``"""
+    if output_format == 'csv':
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(result[0])
+        writer.writerows(result[1])
+    elif output_format == 'ndjson':
+        for record in _records(result):
+            out.write(to_json(record) + '\n')
+    else:
+        out.write(to_json(_records(result)) + '\n')
+
+
+def _read_batch(path: str) -> List[str]:
+    if path == '-':
+        return sys.stdin.read().splitlines()
+    with open(path, encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def _run_batch(parser: argparse.ArgumentParser, lines: List[str], output_format: str, out: TextIO) -> int:
+    """
+    Run the commands of a batch, one result per command
+
+    json prints one array of {"command", "results"} objects, ndjson one such
+    object per line. A line that does not parse gets an "error" instead.
+
+    Returns:
+        Number of invalid lines
+    """
+    invalid = 0
+    entries = []
+    for line in lines:
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        entry = {'command': line.strip()}
+        try:
+            args = parser.parse_args(shlex.split(line))
+            if args.command == 'batch':
+                raise UsageError("batch cannot be nested")
+            entry['results'] = _records(args.run(args))
+        except (UsageError, SystemExit) as e:
+            # SystemExit: --help on a batch line
+            invalid += 1
+            entry['error'] = str(e)
+            print(f"✗ {entry['command']}: {e}")
+        if output_format == 'ndjson':
+            out.write(to_json(entry) + '\n')
+        else:
+            entries.append(entry)
+    if output_format != 'ndjson':
+        out.write(to_json(entries) + '\n')
+    return invalid
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run a command
+
+    Returns:
+        Exit status (0 success, 1 database error, 2 invalid arguments)
+    """
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except UsageError as e:
+        parser.print_usage(sys.stderr)
+        print(e, file=sys.stderr)
+        return 2
+    if args.command == 'batch' and args.format == 'csv':
+        print("query_cli.py: batch output must be json or ndjson", file=sys.stderr)
+        return 2
+
+    out = sys.stdout
+    errors_before = query_activities.error_count()
+    # Warnings printed by the query layer must not end up in the machine-readable output
+    with redirect_stdout(sys.stderr), query_activities.shared_connection():
+        if args.command == 'batch':
+            try:
+                lines = _read_batch(args.file)
+            except OSError as e:
+                print(f"✗ Cannot read {args.file}: {e}")
+                return 2
+            invalid = _run_batch(parser, lines, args.format, out)
+        else:
+            invalid = 0
+            write_result(args.run(args), args.format, out)
+    out.flush()
+
+    if query_activities.error_count() > errors_before:
+        return 1
+    return 2 if invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
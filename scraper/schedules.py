@@ -0,0 +1,173 @@
+"""
+Schedule parsing for FEF activities
+
+Turns the text of the "Horários" cell, e.g. "Seg, Qua - 18:00 às 19:00" or
+"Seg - 18:00 às 19:30 Qua - 18:30 às 19:30", into normalized sessions
+(weekday, start_minute, end_minute) with Monday = 0 and minutes counted
+from midnight. Tokens that are not weekdays (such as "Online") are ignored;
+a schedule without any recognizable weekday yields no sessions and is only
+kept as raw text.
+
+Also parses the "Inscrições" window, e.g. "07/08/25 às 08:00 até 30/09/25
+às 23:55", into naive datetimes in the site's local time (SITE_TIMEZONE).
+"""
+
+import os
+import re
+import unicodedata
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+# Time zone the FEF system publishes its dates in
+SITE_TIMEZONE = os.getenv('FEF_TIMEZONE', 'America/Sao_Paulo')
+
+# Portuguese weekday abbreviations used by the FEF system, Monday = 0
+WEEKDAY_NAMES = ('Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom')
+
+_WEEKDAYS = {'seg': 0, 'ter': 1, 'qua': 2, 'qui': 3, 'sex': 4, 'sab': 5, 'dom': 6}
+
+# "<days> - HH:MM às HH:MM", where <days> is a comma separated list of words
+_SESSION_PATTERN = re.compile(
+    r'(?P<days>[^\W\d_]+(?:\s*,\s*[^\W\d_]+)*)\s*-\s*'
+    r'(?P<start>\d{1,2}):(?P<start_min>\d{2})\s*(?:às|as|a|-)\s*'
+    r'(?P<end>\d{1,2}):(?P<end_min>\d{2})',
+    re.IGNORECASE
+)
+
+# "DD/MM/YY[YY] [às HH:MM]"
+_DATE_PATTERN = re.compile(
+    r'(?P<day>\d{1,2})/(?P<month>\d{1,2})/(?P<year>\d{2,4})'
+    r'(?:\s*(?:às|as|-)?\s*(?P<hour>\d{1,2}):(?P<minute>\d{2}))?',
+    re.IGNORECASE
+)
+
+Session = Tuple[int, int, int]
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents"""
+    decomposed = unicodedata.normalize('NFKD', text.strip().lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def parse_weekday(text: str) -> Optional[int]:
+    """
+    Parse a weekday name or abbreviation ("Ter", "terça", "sábado") or number (0-6)
+
+    Returns:
+        Weekday with Monday = 0, or None if not recognized
+    """
+    folded = _fold(text)
+    if folded.isdigit():
+        value = int(folded)
+        return value if 0 <= value <= 6 else None
+    return _WEEKDAYS.get(folded[:3]) if len(folded) >= 3 else None
+
+
+def parse_time(text: str) -> Optional[int]:
+    """
+    Parse "HH:MM" (or "HH") into minutes from midnight
+
+    Returns:
+        Minutes from midnight, or None if not a valid time
+    """
+    match = re.fullmatch(r'\s*(\d{1,2})(?:[:h](\d{2})?)?\s*', text)
+    if not match:
+        return None
+    hours, minutes = int(match.group(1)), int(match.group(2) or 0)
+    if hours > 24 or minutes > 59 or hours * 60 + minutes > 24 * 60:
+        return None
+    return hours * 60 + minutes
+
+
+def format_minutes(minutes: int) -> str:
+    """Format minutes from midnight as HH:MM"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def parse_schedule_sessions(schedule: str) -> List[Session]:
+    """
+    Parse a schedule into sessions
+
+    Args:
+        schedule: Schedule text as stored by FEFActivityScraper.parse_schedule
+
+    Returns:
+        Sorted, de-duplicated list of (weekday, start_minute, end_minute);
+        empty if the schedule could not be parsed
+    """
+    sessions = set()
+    for match in _SESSION_PATTERN.finditer(schedule or ''):
+        start = int(match.group('start')) * 60 + int(match.group('start_min'))
+        end = int(match.group('end')) * 60 + int(match.group('end_min'))
+        if not 0 <= start < end <= 24 * 60:
+            continue
+        for day in match.group('days').split(','):
+            weekday = _WEEKDAYS.get(_fold(day))
+            if weekday is not None:
+                sessions.add((weekday, start, end))
+    return sorted(sessions)
+
+
+def site_now() -> datetime:
+    """Current time in SITE_TIMEZONE, as a naive datetime comparable with stored windows"""
+    if ZoneInfo is not None:
+        try:
+            return datetime.now(ZoneInfo(SITE_TIMEZONE)).replace(tzinfo=None)
+        except Exception:
+            pass
+    return datetime.now()
+
+
+def _parse_date(match, end_of_day: bool) -> Optional[datetime]:
+    year = int(match.group('year'))
+    if year < 100:
+        year += 2000
+    try:
+        moment = datetime(year, int(match.group('month')), int(match.group('day')))
+    except ValueError:
+        return None
+    if match.group('hour') is not None:
+        hours, minutes = int(match.group('hour')), int(match.group('minute'))
+        if hours > 23 or minutes > 59:
+            return None
+        return moment.replace(hour=hours, minute=minutes)
+    return moment + timedelta(hours=23, minutes=59) if end_of_day else moment
+
+
+def parse_date(text: str, end_of_day: bool = False) -> Optional[datetime]:
+    """
+    Parse a single date like "30/09/25" or "30/09/2025 às 12:00"
+
+    Args:
+        text: Date, optionally followed by a time
+        end_of_day: Take a date without a time as 23:59 instead of 00:00
+
+    Returns:
+        The datetime, or None if the text is not a valid date
+    """
+    match = _DATE_PATTERN.fullmatch((text or '').strip())
+    return _parse_date(match, end_of_day) if match else None
+
+
+def parse_enrollment_window(text: str) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Parse an enrollment window like "07/08/25 às 08:00 até 30/09/25 às 23:55"
+
+    A single date is taken as the closing date. Dates without a time open at
+    00:00 and close at 23:59.
+
+    Returns:
+        Tuple (opens_at, closes_at); either is None if it could not be parsed
+    """
+    matches = list(_DATE_PATTERN.finditer(text or ''))
+    if not matches:
+        return None, None
+    if len(matches) == 1:
+        return None, _parse_date(matches[0], end_of_day=True)
+    return _parse_date(matches[0], end_of_day=False), _parse_date(matches[-1], end_of_day=True)
@@ -0,0 +1,170 @@
+"""
+Accent-insensitive fuzzy search over activity names and categories
+
+Text is Unicode-folded ("Natação" -> "natacao"), lower-cased and split into
+tokens; every token, plus the whole text with spaces removed (so "taichi"
+finds "Tai Chi"), is broken into padded trigrams kept in an in-memory
+inverted index. A query scores each document by the share of each query
+word's trigrams found in the closest document word, with a bonus when
+every query word is a prefix of a document word, so "judo", "natacao" or
+"taichi" find "Judô", "Natação" and "A - Taichichuan (Iniciante)" without
+LIKE '%...%' scans.
+
+The index is updated incrementally: update() only re-indexes documents
+whose text changed and drops the ones that disappeared.
+"""
+
+import heapq
+import re
+import threading
+import unicodedata
+from collections import Counter
+from itertools import chain
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+# Minimum share of the query's trigrams a match must contain
+MIN_SCORE = 0.6
+
+# Added to the score when every query word is a prefix of a document word
+PREFIX_BONUS = 0.25
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def fold_text(text: str) -> str:
+    """Lower-case, strip accents and replace punctuation with single spaces"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+    return _NON_ALNUM.sub(' ', stripped).strip()
+
+
+def tokenize(text: str) -> List[str]:
+    """Folded tokens of a text, ignoring single characters (class letters like "A -")"""
+    return [token for token in fold_text(text).split() if len(token) > 1]
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _token_grams(tokens: List[str]) -> List[Tuple[str, Set[str]]]:
+    """Trigrams of each token, plus of the tokens run together when there are several"""
+    words = list(tokens)
+    if len(tokens) > 1:
+        words.append(''.join(tokens))
+    return [(word, _trigrams(word)) for word in words]
+
+
+def _containment(query_grams: Set[str], words: List[Tuple[str, Set[str]]]) -> float:
+    """Best share of ``query_grams`` contained in a single word"""
+    return max((len(query_grams & grams) for _, grams in words), default=0) / len(query_grams)
+
+
+class SearchIndex:
+    """In-memory trigram index mapping document IDs to searchable text"""
+
+    def __init__(self):
+        self._texts = {}
+        self._words = {}
+        self._postings = {}
+        self._lock = threading.Lock()
+        self.version = None
+
+    def __len__(self):
+        return len(self._texts)
+
+    def _add(self, doc_id: Hashable, text: str):
+        words = _token_grams(tokenize(text))
+        self._texts[doc_id] = text
+        self._words[doc_id] = words
+        for gram in set().union(*(grams for _, grams in words)):
+            self._postings.setdefault(gram, set()).add(doc_id)
+
+    def _remove(self, doc_id: Hashable):
+        words = self._words.pop(doc_id, ())
+        for gram in set().union(*(grams for _, grams in words)):
+            docs = self._postings.get(gram)
+            if docs is not None:
+                docs.discard(doc_id)
+                if not docs:
+                    del self._postings[gram]
+        self._texts.pop(doc_id, None)
+
+    def update(self, documents: Dict[Hashable, str], version=None) -> Tuple[int, int]:
+        """
+        Bring the index in line with a full set of documents
+
+        Args:
+            documents: Searchable text by document ID
+            version: Data version the documents belong to
+
+        Returns:
+            Tuple (documents re-indexed, documents removed)
+        """
+        with self._lock:
+            removed = [doc_id for doc_id in self._texts if doc_id not in documents]
+            for doc_id in removed:
+                self._remove(doc_id)
+            changed = 0
+            for doc_id, text in documents.items():
+                if self._texts.get(doc_id) != text:
+                    self._remove(doc_id)
+                    self._add(doc_id, text)
+                    changed += 1
+            self.version = version
+            return changed, len(removed)
+
+    def search(self, query: str, limit: int = 20, min_score: float = MIN_SCORE) -> List[Tuple[Hashable, float]]:
+        """
+        Find the documents best matching a query
+
+        Each query word is matched against the document word containing most
+        of its trigrams, and the words' shares are averaged; the query words
+        run together ("tai chi" -> "taichi") are tried as well.
+
+        Args:
+            query: Free text, accents and case are ignored
+            limit: Maximum number of results
+            min_score: Minimum share of the query's trigrams a match must contain
+
+        Returns:
+            List of (doc_id, score) with the best matches first
+        """
+        tokens = tokenize(query) or fold_text(query).split()
+        if not tokens:
+            return []
+        query_words = _token_grams(tokens)
+        all_grams = set().union(*(grams for _, grams in query_words))
+        # Cheapest query word: every match shares at least min_score of some word's trigrams
+        needed = min(len(grams) for _, grams in query_words) * min_score
+
+        with self._lock:
+            counts = Counter(chain.from_iterable(self._postings.get(gram, ()) for gram in all_grams))
+            results = []
+            for doc_id, count in counts.items():
+                if count < needed:
+                    continue
+                words = self._words[doc_id]
+                per_word = sum(_containment(grams, words) for _, grams in query_words[:len(tokens)]) / len(tokens)
+                score = per_word
+                if len(tokens) > 1:
+                    score = max(score, _containment(query_words[-1][1], words))
+                if score < min_score:
+                    continue
+                if all(any(word.startswith(token) for word, _ in words) for token in tokens):
+                    score += PREFIX_BONUS
+                results.append((doc_id, round(score, 4), self._texts[doc_id]))
+
+        results = heapq.nsmallest(limit, results, key=lambda result: (-result[1], result[2]))
+        return [(doc_id, score) for doc_id, score, _ in results]
+
+
+def activity_search_text(category: str, class_name: str) -> str:
+    """Searchable text of an activity"""
+    return f"{class_name} {category}"
+
+
+def build_documents(rows: Iterable[Tuple[Hashable, str, str]]) -> Dict[Hashable, str]:
+    """Search documents from (id, category, class_name) rows"""
+    return {row_id: activity_search_text(category, class_name) for row_id, category, class_name in rows}
@@ -0,0 +1,184 @@
+"""
+Precomputed JSON snapshots of the activities for the PHP front end
+
+After every successful run the scraper writes the activities as static
+JSON files under GDE's cache/ directory, so pages can serve them without a
+MySQL round trip:
+
+    cache/fef/activities.json             every activity
+    cache/fef/categories/<slug>.json      the activities of one category
+    cache/fef/stats.json                  the figures of query_activities' statistics
+    cache/fef/manifest.json               data version and ETag of every file
+
+Each file is also written gzip-compressed next to it (.json.gz) for web
+servers that serve precompressed files. Files are replaced atomically
+(temporary file plus os.replace), so readers see the old or the new
+content, never a partial file. The manifest is written last.
+
+ETags are derived from the file content, not from the data version: a run
+that leaves a category unchanged leaves its file, mtime and ETag alone,
+and browsers keep their cached copy. A reader can answer If-None-Match
+from the small manifest without opening the data file.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from atomic_file import write_atomic
+from json_encoding import to_json_bytes
+
+# Snapshot location (unset: cache/fef of the GDE tree; empty: no snapshots)
+SNAPSHOT_DIR = os.getenv('SCRAPER_SNAPSHOT_DIR', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'fef')) or None
+
+# Whether to write a .gz copy of every file
+SNAPSHOT_GZIP = os.getenv('SCRAPER_SNAPSHOT_GZIP', '1') != '0'
+
+MANIFEST_FILE = 'manifest.json'
+CATEGORIES_DIR = 'categories'
+_CATEGORY_FILE = re.compile(CATEGORIES_DIR + r'/[a-z0-9-]+\.json')
+
+# Columns of the activities table included in the snapshot
+SNAPSHOT_COLUMNS = ('id', 'category', 'class_name', 'schedule', 'cost', 'enrollment_deadline',
+                    'enrollment_opens_at', 'enrollment_closes_at', 'vacancies', 'location', 'instructor')
+
+# Served files must be readable by the web server's user (mkstemp creates them 0600)
+FILE_MODE = 0o644
+
+
+def category_slug(category: str) -> str:
+    """File name of a category: lowercase ASCII words joined by '-' ("Natação" -> "natacao")"""
+    text = unicodedata.normalize('NFKD', category).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-') or 'category'
+
+
+def etag(body: bytes) -> str:
+    """Strong ETag of a file's content"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _statistics(activities: List[Dict]) -> Dict:
+    """Counts and costs like activity_stats: averages and ranges over paid activities only"""
+    paid = [activity['cost'] for activity in activities if activity['cost'] > 0]
+    return {
+        'total': len(activities),
+        'free': len(activities) - len(paid),
+        'avg_cost': round(sum(paid) / len(paid), 2) if paid else None,
+        'min_cost': min(paid) if paid else None,
+        'max_cost': max(paid) if paid else None,
+    }
+
+
+def build_snapshot(activities: List[Dict]) -> Dict[str, bytes]:
+    """
+    Encode the snapshot files
+
+    Args:
+        activities: Activity dictionaries with SNAPSHOT_COLUMNS keys
+
+    Returns:
+        Dictionary mapping file paths (relative to the snapshot directory) to their JSON
+    """
+    activities = sorted(activities, key=lambda a: (a['category'], a['class_name'], a['id']))
+    by_category = {}
+    for activity in activities:
+        by_category.setdefault(activity['category'], []).append(activity)
+
+    files = {'activities.json': to_json_bytes(activities)}
+    categories = []
+    slugs = set()
+    for category, rows in by_category.items():
+        slug = base = category_slug(category)
+        number = 2
+        while slug in slugs:
+            slug = f"{base}-{number}"
+            number += 1
+        slugs.add(slug)
+        path = f"{CATEGORIES_DIR}/{slug}.json"
+        files[path] = to_json_bytes(rows)
+        categories.append(dict(category=category, file=path, **_statistics(rows)))
+
+    files['stats.json'] = to_json_bytes(dict(_statistics(activities), by_category=categories))
+    return files
+
+
+def read_manifest(directory: str = SNAPSHOT_DIR) -> Optional[Dict]:
+    """Manifest of the current snapshot, or None if there is none (or it is unreadable)"""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_file(path: str, body: bytes):
+    """Replace ``path`` atomically with ``body``"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_atomic(path, body, FILE_MODE)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def write_snapshot(activities: List[Dict], version: Optional[int], directory: str = SNAPSHOT_DIR,
+                   compress: bool = SNAPSHOT_GZIP) -> int:
+    """
+    Write the snapshot files and then the manifest
+
+    Files whose content is unchanged since the previous snapshot are not
+    rewritten. Files of categories that disappeared are removed after the
+    new manifest is in place.
+
+    Args:
+        activities: Activity dictionaries with SNAPSHOT_COLUMNS keys
+        version: Data version (scrape ID) the activities belong to
+        directory: Snapshot directory
+        compress: Whether to write a .gz copy of every file
+
+    Returns:
+        Number of files rewritten (the manifest not included)
+
+    Raises:
+        OSError: If a file cannot be written
+    """
+    previous = (read_manifest(directory) or {}).get('files', {})
+    files = {}
+    written = 0
+    for path, body in build_snapshot(activities).items():
+        entry = {'etag': etag(body), 'bytes': len(body)}
+        full_path = os.path.join(directory, path)
+        unchanged = previous.get(path, {}).get('etag') == entry['etag'] and os.path.exists(full_path)
+        if compress:
+            # mtime=0 keeps the compressed bytes identical for identical content
+            compressed = gzip.compress(body, mtime=0)
+            entry['gzip_bytes'] = len(compressed)
+            if not (unchanged and os.path.exists(full_path + '.gz')):
+                _write_file(full_path + '.gz', compressed)
+        if not unchanged:
+            _write_file(full_path, body)
+            written += 1
+        files[path] = entry
+
+    manifest = {'version': version, 'generated_at': datetime.now().replace(microsecond=0).isoformat(),
+                'activities': len(activities), 'files': files}
+    _write_file(os.path.join(directory, MANIFEST_FILE), to_json_bytes(manifest))
+
+    for path in set(previous) - set(files):
+        if not _CATEGORY_FILE.fullmatch(path):
+            continue
+        _remove(os.path.join(directory, path))
+        _remove(os.path.join(directory, path + '.gz'))
+    if not compress:
+        for path in files:
+            _remove(os.path.join(directory, path + '.gz'))
+    return written
@@ -0,0 +1,271 @@
+"""
+Incremental parser for FEF activity listings
+
+Feeds the listing to html.parser chunk by chunk and yields one raw activity
+row as soon as its <tbody> closes, so memory use does not grow with the size
+of the page. The rows follow the same rules as
+FEFActivityScraper.extract_activities:
+
+- only tables whose class contains "table-bordered" are read, unless the
+  page has none, in which case every table is read
+- the category is the text of the first cell styled with #153975
+- each <tbody> contributes its first "text-center" row (or its first row)
+  when that row has at least four cells
+
+Rows are tuples (category, class_name, schedule_text, cost_text,
+enrollment_deadline, onclick) with cell text joined like BeautifulSoup's
+get_text(strip=True).
+"""
+
+from collections import deque
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, List, Optional
+
+CATEGORY_STYLE = '#153975'
+
+
+def _join(parts: List[str], separator: str = '') -> str:
+    """Join text pieces like get_text(separator, strip=True)"""
+    return separator.join(part for part in (p.strip() for p in parts) if part)
+
+
+class _Table:
+    """Parsing state of one open <table>"""
+
+    def __init__(self, bordered: bool):
+        self.bordered = bordered
+        self.category = None
+        self.category_parts = None
+        self.pending_rows = []
+
+
+class _Body:
+    """Parsing state of one open <tbody>"""
+
+    def __init__(self, table: _Table):
+        self.table = table
+        self.rows = []
+
+
+class _Row:
+    """Candidate activity row inside a <tbody>"""
+
+    def __init__(self, centered: bool, onclick: str):
+        self.centered = centered
+        self.onclick = onclick
+        self.cells = []
+
+
+class ActivityStreamParser(HTMLParser):
+    """html.parser subclass emitting raw activity rows incrementally"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.ready = deque()
+        self._stack = []
+        self._skip_depth = 0
+        self._seen_bordered = False
+        self._fallback_rows = []
+        self._category_table = None
+        self._row = None
+        self._cell = None
+        self._text = []
+
+    # Stack helpers -------------------------------------------------------
+
+    def _innermost(self, kind):
+        for tag, state in reversed(self._stack):
+            if isinstance(state, kind):
+                return state, tag
+        return None, None
+
+    def _close(self, tag: str, state):
+        if tag == 'td':
+            category_table, cell = state
+            if category_table is not None and category_table is self._category_table:
+                category_table.category = _join(category_table.category_parts)
+                self._category_table = None
+            if cell is not None and cell is self._cell:
+                self._cell = None
+        elif tag == 'tr':
+            if state is self._row:
+                self._row = None
+                self._cell = None
+        elif tag == 'tbody':
+            self._finish_body(state)
+        elif tag == 'table':
+            self._finish_table(state)
+
+    def _pop_to(self, tag: str):
+        """Close the most recent open ``tag`` and everything opened after it"""
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                while len(self._stack) > index:
+                    closed_tag, state = self._stack.pop()
+                    self._close(closed_tag, state)
+                return
+
+    # Row emission -------------------------------------------------------
+
+    def _finish_body(self, body: _Body):
+        rows = [row for row in body.rows if row.centered] or body.rows
+        if not rows or len(rows[0].cells) < 4:
+            return
+        row = rows[0]
+        cells = row.cells
+        raw = (_join(cells[0]), _join(cells[1], ' '), _join(cells[2]), _join(cells[3]), row.onclick)
+        table = body.table
+        if table.category is not None:
+            self._emit(table, (table.category,) + raw)
+        else:
+            table.pending_rows.append(raw)
+
+    def _finish_table(self, table: _Table):
+        if table.category is None:
+            return
+        for raw in table.pending_rows:
+            self._emit(table, (table.category,) + raw)
+        table.pending_rows = []
+
+    def _emit(self, table: _Table, row: tuple):
+        if table.bordered:
+            self.ready.append(row)
+        elif not self._seen_bordered:
+            # Only used if the page turns out to have no bordered tables
+            self._fallback_rows.append(row)
+
+    # HTMLParser callbacks ------------------------------------------------
+
+    def _flush_text(self):
+        """
+        Hand the buffered text node to the cells capturing it
+
+        html.parser may deliver one text node in several pieces when it spans
+        feed() chunks, so pieces are joined until the next markup event, the
+        same boundaries BeautifulSoup uses for its strings.
+        """
+        if not self._text:
+            return
+        text = ''.join(self._text)
+        self._text = []
+        if self._category_table is not None:
+            self._category_table.category_parts.append(text)
+        if self._cell is not None:
+            self._cell.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag in ('script', 'style'):
+            self._skip_depth += 1
+            return
+        if tag not in ('table', 'tbody', 'tr', 'td'):
+            return
+        attrs = dict(attrs)
+
+        if tag == 'table':
+            bordered = 'table-bordered' in (attrs.get('class') or '')
+            if bordered and not self._seen_bordered:
+                self._seen_bordered = True
+                self._fallback_rows = []
+            self._stack.append((tag, _Table(bordered)))
+            return
+
+        table, _ = self._innermost(_Table)
+        if table is None:
+            self._stack.append((tag, (None, None) if tag == 'td' else None))
+            return
+
+        if tag == 'tbody':
+            self._stack.append((tag, _Body(table)))
+        elif tag == 'tr':
+            body, _ = self._innermost(_Body)
+            if body is not None and body.table is table and self._row is None:
+                self._row = _Row('text-center' in (attrs.get('class') or ''), attrs.get('onclick') or '')
+                body.rows.append(self._row)
+                self._stack.append((tag, self._row))
+            else:
+                self._stack.append((tag, None))
+        else:  # td
+            category_table = cell = None
+            if table.category is None and self._category_table is None and \
+                    CATEGORY_STYLE in (attrs.get('style') or ''):
+                table.category_parts = []
+                self._category_table = category_table = table
+            if self._row is not None and self._cell is None:
+                self._cell = cell = []
+                self._row.cells.append(cell)
+            self._stack.append((tag, (category_table, cell)))
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        if tag in ('script', 'style'):
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        if tag in ('table', 'tbody', 'tr', 'td'):
+            self._pop_to(tag)
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._category_table is not None or self._cell is not None:
+            self._text.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def handle_decl(self, decl):
+        self._flush_text()
+
+    def handle_pi(self, data):
+        self._flush_text()
+
+    def unknown_decl(self, data):
+        self._flush_text()
+
+    def close(self):
+        super().close()
+        self._flush_text()
+        while self._stack:
+            tag, state = self._stack.pop()
+            self._close(tag, state)
+        if not self._seen_bordered:
+            self.ready.extend(self._fallback_rows)
+            self._fallback_rows = []
+
+
+def iter_activity_rows(chunks: Iterable[str]) -> Iterator[tuple]:
+    """
+    Parse a listing incrementally
+
+    Args:
+        chunks: Text chunks of the page, in order
+
+    Yields:
+        Raw activity rows as soon as they are complete
+    """
+    parser = ActivityStreamParser()
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parser.feed(chunk)
+        while parser.ready:
+            yield parser.ready.popleft()
+    parser.close()
+    while parser.ready:
+        yield parser.ready.popleft()
+
+
+def iter_file_chunks(path: str, chunk_size: int = 64 * 1024,
+                     encoding: Optional[str] = 'utf-8') -> Iterator[str]:
+    """Read a (possibly gzip-compressed) HTML file in text chunks"""
+    if path.endswith('.gz'):
+        import gzip
+        handle = gzip.open(path, 'rt', encoding=encoding, errors='replace')
+    else:
+        handle = open(path, 'r', encoding=encoding, errors='replace')
+    with handle:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
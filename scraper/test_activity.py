@@ -0,0 +1,99 @@
+"""
+Test script for the Activity record and the categories table
+"""
+
+import pickle
+import tracemalloc
+from benchmark import SQLiteStandIn, synthetic_activities
+from activity import ACTIVITY_FIELDS, Activity
+from fef_scraper import FEFActivityScraper, DB_CONFIG
+
+
+def test_record():
+    """Activities have no __dict__ and share category strings, also after unpickling"""
+    first, second = synthetic_activities(11)[0], synthetic_activities(11)[10]
+    assert not hasattr(first, '__dict__')
+    assert first.category is second.category
+
+    copy = pickle.loads(pickle.dumps(first))
+    assert copy == first and copy.category is first.category
+    assert copy.replace(cost=1.0) != first and first.cost != 1.0
+    assert list(first.as_dict()) == list(ACTIVITY_FIELDS)
+    assert Activity.from_values(first.values(), 7).id == 7
+    print("✓ Slotted records with interned categories")
+
+
+def test_memory():
+    """A list of records takes less memory than the same rows as dictionaries"""
+    def measure(build):
+        tracemalloc.start()
+        rows = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return rows, size
+
+    records = synthetic_activities(5000)
+    _, slotted = measure(lambda: [Activity.from_values(a.values()) for a in records])
+    # Parsed rows carry their own copy of the category string
+    _, dicts = measure(lambda: [dict(a.as_dict(), category=''.join(a.category)) for a in records])
+    assert slotted < dicts, (slotted, dicts)
+    print(f"✓ 5000 records: {slotted // 1024} KiB slotted vs {dicts // 1024} KiB as dictionaries")
+
+
+def test_categories_table():
+    """Each category is stored once and activities reference it by ID"""
+    activities = synthetic_activities(40)
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False, snapshot_dir=None)
+    scraper.connection = SQLiteStandIn()
+    try:
+        assert scraper.replace_activities(activities, 26)
+        renamed = [a.replace(category='NOVA MODALIDADE') if i == 0 else a for i, a in enumerate(activities)]
+        assert scraper.replace_activities(renamed, 26)
+
+        cursor = scraper.connection.cursor()
+        cursor.execute("SELECT name, id FROM categories")
+        ids = dict(cursor.fetchall())
+        assert set(ids) == {a.category for a in renamed} | {activities[0].category}
+        assert len(ids) == len(set(ids.values()))
+
+        cursor.execute("SELECT c.name, COUNT(*) FROM activities a JOIN categories c ON c.id = a.category_id "
+                       "GROUP BY c.id, c.name")
+        counts = dict(cursor.fetchall())
+        assert counts['NOVA MODALIDADE'] == 1 and sum(counts.values()) == 40
+
+        # Existing names are reused, new ones added
+        assert scraper._category_ids(cursor, ['NOVA MODALIDADE', 'OUTRA']) == dict(ids, OUTRA=len(ids) + 1)
+        scraper.connection.rollback()
+    finally:
+        scraper.connection.close()
+    print(f"✓ {len(ids)} categories stored once for {sum(counts.values())} activities")
+
+
+def test_categories_loaded_once():
+    """A multi-batch load reads the categories table once, new categories included"""
+    activities = synthetic_activities(40)
+    activities[-1] = activities[-1].replace(category='NOVA MODALIDADE')
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False, snapshot_dir=None)
+    scraper.connection = SQLiteStandIn()
+    statements = []
+    scraper.connection._db.set_trace_callback(statements.append)
+    try:
+        assert scraper.replace_activities(activities, 26, batch_size=7)
+        assert scraper.save_activity_stream(iter(activities), 27, batch_size=7) == 40
+        reads = [sql for sql in statements if 'FROM categories' in sql and 'JOIN' not in sql]
+        assert len(reads) == 2, reads
+
+        cursor = scraper.connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM categories WHERE name = 'NOVA MODALIDADE'")
+        assert cursor.fetchone()[0] == 1
+        cursor.close()
+    finally:
+        scraper.connection.close()
+    print("✓ Categories read once per load")
+
+
+if __name__ == "__main__":
+    test_record()
+    test_memory()
+    test_categories_table()
+    test_categories_loaded_once()
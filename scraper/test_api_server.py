@@ -0,0 +1,164 @@
+"""
+Test script for the local JSON API
+
+Builds the index from synthetic activities, so neither MySQL nor the
+network is needed; the connection test talks HTTP to a server on a free
+local port.
+"""
+
+import asyncio
+import json
+import api_server
+from api_server import ActivityAPI, ActivityIndex
+from benchmark import synthetic_activities
+from schedules import parse_schedule_sessions
+
+
+def _index(count: int = 30, version: int = 1) -> ActivityIndex:
+    activities, sessions = [], []
+    for activity_id, activity in enumerate(synthetic_activities(count), 1):
+        activities.append(dict(activity.as_dict(), id=activity_id))
+        sessions.extend((activity_id,) + session for session in parse_schedule_sessions(activity.schedule))
+    return ActivityIndex(activities, sessions, version)
+
+
+def _get(api: ActivityAPI, target: str, headers: dict = None):
+    status, body, etag = api.route('GET', target, headers or {})
+    return status, json.loads(body) if body else None, etag
+
+
+def test_index_filters():
+    """Category, weekday, time window and cost filters combine"""
+    index = _index()
+    rows = index.activities
+    assert index.filter() == list(range(len(index)))
+    assert {rows[i]['category'] for i in index.filter(category='Yoga')} == {'Yoga'}
+    assert index.filter(category='Nada') == []
+
+    tuesday = index.filter(weekday=1)
+    assert tuesday and all(any(w == 1 for w, _, _ in index.sessions[i]) for i in tuesday)
+    evening = index.filter(weekday=0, start=18 * 60, end=19 * 60)
+    assert evening and all(any(w == 0 and s >= 18 * 60 and e <= 19 * 60 for w, s, e in index.sessions[i])
+                           for i in evening)
+
+    cheap = index.filter(min_cost=100, max_cost=110)
+    assert cheap and all(100 <= rows[i]['cost'] <= 110 for i in cheap)
+    assert set(index.filter(category='Yoga', max_cost=110)) == \
+        set(index.filter(category='Yoga')) & set(index.filter(max_cost=110))
+    print("✓ Index filters")
+
+
+def test_routes():
+    """Endpoints answer JSON and reject bad parameters"""
+    api = ActivityAPI(_index(), hot_reload=False)
+    status, rows, _ = _get(api, '/activities?category=Yoga&weekday=Seg')
+    assert status == 200 and rows and all(row['category'] == 'Yoga' for row in rows)
+    assert all(any(s['weekday'] == 0 for s in row['sessions']) for row in rows)
+    assert _get(api, '/activities?free=1')[1] == []
+    assert _get(api, '/activities?weekday=Xyz')[0] == 400
+    assert _get(api, '/nothing')[0] == 404
+    assert api.route('POST', '/activities', {})[0] == 405
+    assert ActivityAPI(hot_reload=False).route('GET', '/activities', {})[0] == 503
+
+    categories = _get(api, '/categories')[1]
+    assert sum(category['count'] for category in categories) == 30
+    assert _get(api, '/health')[1]['activities'] == 30
+    print("✓ Routes and parameter errors")
+
+
+def test_search():
+    """Search is accent-insensitive and returns scored rows"""
+    api = ActivityAPI(_index(), hot_reload=False)
+    status, rows, _ = _get(api, '/search?q=natacao&limit=3')
+    assert status == 200 and 0 < len(rows) <= 3
+    assert rows[0]['category'].startswith('Natação') and 'score' in rows[0]
+    assert [row['score'] for row in rows] == sorted((row['score'] for row in rows), reverse=True)
+    assert _get(api, '/search')[0] == 400
+    assert _get(api, '/search?q=yoga&limit=0')[0] == 400
+    print("✓ Search endpoint")
+
+
+def test_etag_not_modified():
+    """A matching If-None-Match gets an empty 304; new data gets a new ETag"""
+    api = ActivityAPI(_index(version=1), hot_reload=False)
+    status, _, etag = _get(api, '/activities?category=Yoga')
+    assert status == 200 and etag
+    status, body, same = api.route('GET', '/activities?category=Yoga', {'if-none-match': etag})
+    assert status == 304 and body == b'' and same == etag
+    assert _get(api, '/activities?category=Yoga', {'if-none-match': '"0-0"'})[0] == 200
+
+    api.index = _index(version=2)
+    assert api.route('GET', '/activities?category=Yoga', {'if-none-match': etag})[0] == 200
+    print("✓ ETag revalidation")
+
+
+class _Versions:
+    def __init__(self, version):
+        self.version = version
+
+    def current_version(self):
+        return self.version
+
+
+def test_hot_reload():
+    """The index is rebuilt only when the data version changes"""
+    loads = []
+
+    def load(version):
+        loads.append(version)
+        return _index(10 * version, version)
+
+    original = api_server.load_index_from_database
+    api_server.load_index_from_database = load
+    try:
+        api = ActivityAPI(hot_reload=False)
+        api.version_source = _Versions(1)
+        assert asyncio.run(api.reload_if_changed()) and len(api.index) == 10
+        assert not asyncio.run(api.reload_if_changed())
+        api.version_source.version = None
+        assert not asyncio.run(api.reload_if_changed())
+
+        api.version_source.version = 2
+        assert asyncio.run(api.reload_if_changed())
+        assert api.index.version == 2 and _get(api, '/health')[1]['activities'] == 20
+        assert loads == [1, 2]
+    finally:
+        api_server.load_index_from_database = original
+    print("✓ Hot reload on a new data version")
+
+
+def test_connection():
+    """Keep-alive HTTP/1.1 requests on one connection, HEAD without body"""
+    api = ActivityAPI(_index(), hot_reload=False)
+
+    async def exchange():
+        server = await asyncio.start_server(api.handle_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        answers = []
+        for request in (b"GET /health HTTP/1.1\r\nHost: x\r\n\r\n",
+                        b"HEAD /categories HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n"):
+            writer.write(request)
+            head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+            length = int(head.split('Content-Length: ')[1].split('\r\n')[0])
+            body = b'' if request.startswith(b'HEAD') else await reader.readexactly(length)
+            answers.append((head.split('\r\n')[0], body))
+        assert await reader.read() == b''
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return answers
+
+    (health_status, health), (head_status, head_body) = asyncio.run(exchange())
+    assert health_status == head_status == 'HTTP/1.1 200 OK'
+    assert json.loads(health)['status'] == 'ok' and head_body == b''
+    print("✓ Keep-alive connection")
+
+
+if __name__ == "__main__":
+    test_index_filters()
+    test_routes()
+    test_search()
+    test_etag_not_modified()
+    test_hot_reload()
+    test_connection()
@@ -0,0 +1,48 @@
+"""
+Test script for the atomic file writes shared by the caches, snapshots and status files
+"""
+
+import json
+import os
+import stat
+import tempfile
+from atomic_file import write_atomic, write_json_atomic, write_text_atomic
+
+
+def test_replace():
+    """Bytes, text and JSON replace the file; the mode is applied"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'file')
+        write_atomic(path, b'one', 0o644)
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+        write_text_atomic(path, 'dois ✓')
+        with open(path, encoding='utf-8') as f:
+            assert f.read() == 'dois ✓'
+        write_json_atomic(path, {'três': 3}, indent=2)
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f) == {'três': 3}
+        assert os.listdir(directory) == ['file']
+    print("✓ Atomic replace of bytes, text and JSON")
+
+
+def test_failure_keeps_old_file():
+    """A failed write leaves the old content and no temporary file"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'file.json')
+        write_json_atomic(path, [1])
+        try:
+            # Fails in the middle of writing the temporary file
+            write_atomic(path, 'not bytes')
+        except TypeError:
+            pass
+        else:
+            raise AssertionError("Text written as bytes")
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f) == [1]
+        assert os.listdir(directory) == ['file.json']
+    print("✓ Failed write keeps the old file")
+
+
+if __name__ == "__main__":
+    test_replace()
+    test_failure_keeps_old_file()
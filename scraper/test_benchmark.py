@@ -0,0 +1,52 @@
+"""
+Test script for the benchmark suite's regression check
+
+Runs the pipeline suite once on the example page against the SQLite
+stand-in, then checks that compare_reports flags a slowed-down stage and
+ignores noise and stages saved into a different database.
+"""
+
+import copy
+import os
+from benchmark import EXAMPLE_HTML, SUITE_STAGES, benchmark_suite, compare_reports
+
+
+def _report(seconds, database='sqlite'):
+    return {'database': database,
+            'results': [{'scale': 1, 'stage': stage, 'seconds': seconds} for stage in SUITE_STAGES]}
+
+
+def test_compare_reports():
+    """Only slowdowns past both the threshold and the noise floor count"""
+    baseline = _report(0.1)
+    assert compare_reports(_report(0.11), baseline, threshold=0.25) == []
+    assert len(compare_reports(_report(0.2), baseline, threshold=0.25)) == len(SUITE_STAGES)
+    assert compare_reports(_report(0.002), _report(0.001), threshold=0.25) == []
+
+    regressions = compare_reports(_report(0.2, database='mysql'), baseline, threshold=0.25)
+    assert len(regressions) == len(SUITE_STAGES) - 1
+    assert not any(r.startswith('save ') for r in regressions)
+    print(f"✓ compare_reports flagged {len(regressions)} stages")
+
+
+def test_suite_report():
+    """A suite run covers every stage and compares clean against itself"""
+    if not os.path.exists(EXAMPLE_HTML):
+        print(f"⚠ File not found: {EXAMPLE_HTML}")
+        return
+
+    report = benchmark_suite([1], use_sqlite=True, repeat=1)
+    assert [r['stage'] for r in report['results']] == list(SUITE_STAGES)
+    assert all(r['items'] > 0 and r['peak_bytes'] > 0 for r in report['results'])
+
+    slower = copy.deepcopy(report)
+    for result in slower['results']:
+        result['seconds'] = result['seconds'] * 2 + 0.01
+    assert compare_reports(report, report) == []
+    assert len(compare_reports(slower, report)) == len(SUITE_STAGES)
+    print(f"✓ Suite report covers {len(SUITE_STAGES)} stages")
+
+
+if __name__ == "__main__":
+    test_compare_reports()
+    test_suite_report()
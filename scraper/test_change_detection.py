@@ -0,0 +1,110 @@
+"""
+Test script for change detection (page and activity fingerprints, 304 answers)
+
+Runs the pipeline after the fetch against the benchmark's in-memory SQLite
+stand-in, with detail pages served from a dictionary instead of the site.
+"""
+
+from benchmark import SQLiteStandIn, synthetic_activities
+from fef_scraper import FEFActivityScraper, DB_CONFIG, FetchResult, detail_url
+from metrics import RunMetrics
+
+LISTING = """
+<table class="table table-bordered">
+  <tr><td style="background-color: #153975; color: white">NATAÇÃO</td></tr>
+  <tbody><tr class="text-center" onclick="goToURL('/extensao/registrations/showOpenRegistrationsDetails/501')">
+    <td>A - Natação Adulto</td><td>Seg, Qua - 07:00 às 08:00</td><td>R$ 120,00</td>
+    <td>07/08/25 às 08:00 até 30/09/25 às 23:55</td>
+  </tr></tbody>
+  <tbody><tr class="text-center" onclick="goToURL('/extensao/registrations/showOpenRegistrationsDetails/502')">
+    <td>B - Natação Infantil</td><td>Ter, Qui - 09:00 às 10:00</td><td>R$ 100,00</td>
+    <td>07/08/25 às 08:00 até 30/09/25 às 23:55</td>
+  </tr></tbody>
+</table>
+"""
+
+
+def _detail_page(vacancies: int) -> str:
+    return (f"<html><body><table><tr><td>Vagas:</td><td>{vacancies}</td></tr>"
+            f"<tr><td>Local:</td><td>Piscina</td></tr></table></body></html>")
+
+
+def _scraper(pages):
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False, snapshot_dir=None)
+    scraper.connection = SQLiteStandIn()
+    scraper.fetch_webpage = lambda url, verbose=True: pages.get(url)
+    scraper.metrics = RunMetrics(26)
+    return scraper
+
+
+def _vacancies(scraper):
+    cursor = scraper.connection.cursor()
+    cursor.execute("SELECT detail_id, vacancies FROM activities ORDER BY detail_id")
+    rows = dict(cursor.fetchall())
+    cursor.close()
+    return rows
+
+
+def _statuses(scraper):
+    cursor = scraper.connection.cursor()
+    cursor.execute("SELECT status FROM scraping_history ORDER BY id")
+    rows = [status for (status,) in cursor.fetchall()]
+    cursor.close()
+    return rows
+
+
+def test_unchanged_page_skipped():
+    """Without details, an unchanged page or a 304 answer skips the update"""
+    scraper = _scraper({})
+    try:
+        assert scraper._process_page(LISTING, 26)
+        assert scraper._process_page(LISTING, 26)
+        assert scraper._handle_fetch_result(FetchResult(LISTING, 304, True), 26)
+        assert _statuses(scraper) == ['success', 'unchanged', 'not_modified']
+    finally:
+        scraper.connection.close()
+    print("✓ Unchanged page and 304 answer skip the update")
+
+
+def test_details_refreshed_on_unchanged_listing():
+    """With details, a changed detail page is stored although the listing is the same"""
+    pages = {detail_url(501): _detail_page(20), detail_url(502): _detail_page(15)}
+    scraper = _scraper(pages)
+    try:
+        assert scraper._process_page(LISTING, 26, fetch_details=True)
+        assert _vacancies(scraper) == {501: 20, 502: 15}
+
+        # Same listing and details: only the activity fingerprint decides
+        assert scraper._process_page(LISTING, 26, fetch_details=True)
+        assert _statuses(scraper) == ['success', 'unchanged']
+
+        pages[detail_url(501)] = _detail_page(3)
+        assert scraper._handle_fetch_result(FetchResult(LISTING, 304, True), 26, fetch_details=True)
+        assert _vacancies(scraper) == {501: 3, 502: 15}
+        assert _statuses(scraper) == ['success', 'unchanged', 'success']
+    finally:
+        scraper.connection.close()
+    print("✓ Changed detail page stored despite an unchanged listing")
+
+
+def test_stream_run_resets_fingerprints():
+    """After a streamed load, neither an unchanged page nor a 304 answer skips the write"""
+    scraper = _scraper({})
+    try:
+        assert scraper._process_page(LISTING, 26)
+        assert scraper.save_activity_stream(iter(synthetic_activities(3)), 26, commit=False) == 3
+        assert scraper.commit_successful_run(3, 26)
+
+        assert scraper._handle_fetch_result(FetchResult(LISTING, 304, True), 26)
+        assert scraper._process_page(LISTING, 26)
+        assert _statuses(scraper) == ['success', 'success', 'success', 'unchanged']
+        assert _vacancies(scraper) == {501: None, 502: None}
+    finally:
+        scraper.connection.close()
+    print("✓ Streamed load followed by a full write of the page")
+
+
+if __name__ == "__main__":
+    test_unchanged_page_skipped()
+    test_details_refreshed_on_unchanged_listing()
+    test_stream_run_resets_fingerprints()
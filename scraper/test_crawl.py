@@ -0,0 +1,48 @@
+"""
+Test script for crawling several registration lists (scrape_many)
+
+Pages come from a dictionary instead of the site and the data goes to the
+benchmark's in-memory SQLite stand-in.
+"""
+
+from benchmark import SQLiteStandIn
+from fef_scraper import FEFActivityScraper, DB_CONFIG, FetchResult, registration_url
+from test_change_detection import LISTING
+
+
+def test_failures_stay_isolated():
+    """A dead, empty or crashing list fails alone; the others are stored"""
+    def fetch(url, verbose=True):
+        if url == registration_url(27):
+            raise RuntimeError("parser exploded")
+        page = pages.get(url)
+        return FetchResult(page, 200, size=len(page)) if page is not None else None
+
+    pages = {registration_url(25): LISTING, registration_url(28): '<html>nothing here</html>',
+             registration_url(29): LISTING.replace('NATAÇÃO', 'YOGA').replace('/50', '/60')}
+    connection = SQLiteStandIn()
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False, snapshot_dir=None,
+                                 metrics_file=None, prometheus_file=None)
+    scraper.fetch = fetch
+    scraper.connect_to_database = lambda: setattr(scraper, 'connection', connection) or True
+    # Keep the database open for the checks below
+    scraper.close_connection = lambda: None
+    try:
+        results = scraper.scrape_many([25, 26, 27, 28, 29], max_workers=3)
+        assert results == {25: True, 26: False, 27: False, 28: False, 29: True}
+
+        cursor = connection.cursor()
+        cursor.execute("SELECT registration_id, COUNT(*) FROM activities GROUP BY registration_id")
+        assert dict(cursor.fetchall()) == {25: 2, 29: 2}
+        cursor.execute("SELECT registration_id, status FROM scraping_history ORDER BY registration_id")
+        assert cursor.fetchall() == [(25, 'success'), (26, 'failure'), (27, 'failure'),
+                                     (28, 'failure'), (29, 'success')]
+        cursor.close()
+        assert sorted(run.registration_id for run in scraper.runs) == [25, 26, 27, 28, 29]
+    finally:
+        connection.close()
+    print("✓ 2 of 5 lists stored, each failure logged on its own")
+
+
+if __name__ == "__main__":
+    test_failures_stay_isolated()
@@ -0,0 +1,122 @@
+"""
+Test script for the scraper daemon's adaptive polling and graceful shutdown
+"""
+
+import json
+import os
+import signal
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from benchmark import SQLiteStandIn, synthetic_activities
+from daemon import PollPolicy, ScraperDaemon, check_status
+from fef_scraper import FEFActivityScraper, DB_CONFIG
+
+NOW = datetime(2025, 8, 7, 12, 0)
+
+
+def test_poll_policy():
+    """Tight polling near openings and closings, sparse otherwise"""
+    policy = PollPolicy(min_interval=60, open_interval=900, idle_interval=21600, margin=1800)
+    opening = (NOW + timedelta(minutes=10), NOW + timedelta(days=30))
+    assert policy.next_poll([opening], NOW).delay == 60
+    # Just after the opening
+    assert policy.next_poll([opening], NOW + timedelta(minutes=25)).delay == 60
+    # Inside the window, far from its edges
+    assert policy.next_poll([opening], NOW + timedelta(days=2)).delay == 900
+    # Closed for months
+    closed = (NOW - timedelta(days=90), NOW - timedelta(days=60))
+    assert policy.next_poll([closed], NOW).delay == 21600
+    assert policy.next_poll([], NOW).delay == 21600
+    # An opening in 3 hours cuts the idle sleep short at the start of its margin
+    later = (NOW + timedelta(hours=3), NOW + timedelta(days=30))
+    poll = policy.next_poll([closed, later], NOW)
+    assert poll.delay == 2.5 * 3600 and 'opens' in poll.reason
+    print("✓ Poll delays follow the enrollment windows")
+
+
+def test_daemon_loop():
+    """Runs, plans the next poll, records its status and stops on request"""
+    results = iter([True, False, True])
+    windows = [(NOW + timedelta(days=5), NOW + timedelta(days=30))]
+    with tempfile.TemporaryDirectory() as directory:
+        status_file = os.path.join(directory, 'status.json')
+        daemon = ScraperDaemon(lambda: next(results), lambda: windows,
+                               PollPolicy(min_interval=0, open_interval=0, idle_interval=0, margin=0),
+                               status_file, clock=lambda: NOW)
+        assert daemon.run(max_runs=3) == 3
+        with open(status_file, encoding='utf-8') as f:
+            status = json.load(f)
+        assert status['state'] == 'stopped' and status['runs'] == 3 and status['failures'] == 1
+        assert status['last_success'] and status['consecutive_failures'] == 0
+        assert status['run_deadline_at'] is None
+
+        # stop() during a run ends the loop once that run finishes
+        daemon = ScraperDaemon(lambda: daemon.stop() or True, lambda: windows,
+                               PollPolicy(min_interval=3600), None, clock=lambda: NOW)
+        assert daemon.run() == 1
+    print("✓ Daemon loop ran 3 times and stopped")
+
+
+def test_graceful_shutdown():
+    """SIGTERM while sleeping wakes the daemon and stops it"""
+    with tempfile.TemporaryDirectory() as directory:
+        status_file = os.path.join(directory, 'status.json')
+        daemon = ScraperDaemon(lambda: True, lambda: [], PollPolicy(min_interval=3600), status_file)
+        previous = signal.getsignal(signal.SIGTERM)
+        daemon.install_signal_handlers()
+        timer = threading.Timer(0.2, os.kill, (os.getpid(), signal.SIGTERM))
+        try:
+            timer.start()
+            assert daemon.run() == 1
+        finally:
+            timer.cancel()
+            signal.signal(signal.SIGTERM, previous)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+        healthy, message = check_status(status_file)
+        assert not healthy and 'stopped' in message
+    print("✓ Stopped gracefully on SIGTERM")
+
+
+def test_health_check():
+    """A daemon is healthy until its next poll or the end of its run is overdue"""
+    with tempfile.TemporaryDirectory() as directory:
+        status_file = os.path.join(directory, 'status.json')
+        with open(status_file, 'w', encoding='utf-8') as f:
+            json.dump({'state': 'sleeping', 'next_poll_at': NOW.isoformat(), 'last_run_at': None}, f)
+        assert check_status(status_file, NOW + timedelta(minutes=5), grace=600)[0]
+        assert not check_status(status_file, NOW + timedelta(minutes=11), grace=600)[0]
+        assert not check_status(os.path.join(directory, 'missing.json'))[0]
+
+        with open(status_file, 'w', encoding='utf-8') as f:
+            json.dump({'state': 'scraping', 'run_deadline_at': NOW.isoformat(), 'last_run_at': None}, f)
+        assert check_status(status_file, NOW + timedelta(minutes=5), grace=600)[0]
+        healthy, message = check_status(status_file, NOW + timedelta(minutes=11), grace=600)
+        assert not healthy and 'Run due' in message
+    print("✓ Health check detects overdue polls and stuck runs")
+
+
+def test_enrollment_windows():
+    """Windows are read per registration list, long-closed ones are skipped"""
+    activities = synthetic_activities(4)
+    activities[0].enrollment_opens_at = datetime(2999, 1, 1, 8, 0)
+    activities[0].enrollment_closes_at = datetime(2999, 1, 31, 23, 55)
+    activities[1].enrollment_opens_at = datetime(2000, 1, 1, 8, 0)
+    activities[1].enrollment_closes_at = datetime(2000, 1, 31, 23, 55)
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False)
+    scraper.connection = SQLiteStandIn()
+    try:
+        assert scraper.save_to_database(activities, 26)
+        assert scraper.enrollment_windows([26]) == [(datetime(2999, 1, 1, 8, 0), datetime(2999, 1, 31, 23, 55))]
+        assert scraper.enrollment_windows([27]) == []
+    finally:
+        scraper.connection.close()
+    print("✓ Enrollment windows loaded")
+
+
+if __name__ == "__main__":
+    test_poll_policy()
+    test_daemon_loop()
+    test_graceful_shutdown()
+    test_health_check()
+    test_enrollment_windows()
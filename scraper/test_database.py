@@ -0,0 +1,147 @@
+"""
+Test script for the shared connection pool's metrics and round-trip counting
+
+The mysql.connector pool is replaced with a fake one, so no MySQL server is
+needed.
+"""
+
+import threading
+import time
+from mysql.connector.errors import OperationalError, PoolError, ProgrammingError
+from database import ConnectionPool
+
+
+class _FakeCursor:
+    def __init__(self, log, errors):
+        self._log = log
+        self._errors = errors
+
+    def execute(self, operation, params=()):
+        self._log.append(operation)
+        if self._errors:
+            raise self._errors.pop(0)
+
+    def executemany(self, operation, seq_params):
+        self._log.append(operation)
+
+    def fetchall(self):
+        return [(1,)]
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.log = []
+        self.errors = []
+        self.in_transaction = False
+        self.rollbacks = 0
+
+    def is_connected(self):
+        return True
+
+    def cursor(self, prepared=False):
+        return _FakeCursor(self.log, self.errors)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+class _FakePool:
+    def get_connection(self):
+        return _FakeConnection()
+
+
+def _pool(size: int, timeout: float) -> ConnectionPool:
+    pool = ConnectionPool({}, size=size, timeout=timeout)
+    pool._pool = _FakePool()
+    return pool
+
+
+def test_checkout_metrics():
+    """Checkouts, waits, timeouts and peak use are counted"""
+    pool = _pool(size=2, timeout=0.1)
+    first, second = pool.get_connection(), pool.get_connection()
+    try:
+        pool.get_connection()
+    except PoolError:
+        pass
+    else:
+        raise AssertionError("Checkout beyond the pool size succeeded")
+
+    # A checkout that waits for a connection handed back by another thread
+    threading.Timer(0.05, first.close).start()
+    start = time.perf_counter()
+    third = pool.get_connection()
+    assert time.perf_counter() - start >= 0.04
+
+    stats = pool.stats()
+    assert (stats['checkouts'], stats['waits'], stats['timeouts']) == (3, 2, 1)
+    assert stats['in_use'] == stats['peak_in_use'] == 2
+    assert stats['max_wait_seconds'] >= 0.04 and stats['avg_wait_seconds'] > 0
+
+    second.close()
+    second.close()
+    third.close()
+    assert pool.stats()['in_use'] == 0
+    assert '3 checkouts, 2 waited' in pool.format_stats()
+    print("✓ Checkout metrics")
+
+
+def test_statements_and_round_trips():
+    """Prepared statements are reused; statements, commits and rollbacks are counted"""
+    pool = _pool(size=1, timeout=0.1)
+    connection = pool.get_connection()
+    assert connection.fetch_all("SELECT %s", (1,)) == [(1,)]
+    connection.fetch_all("SELECT %s", (2,))
+    connection.fetch_all("SELECT 2")
+    stats = pool.stats()
+    assert (stats['statements_prepared'], stats['statement_cache_hits']) == (2, 1)
+
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM activities")
+    cursor.executemany("INSERT INTO activities (id) VALUES (%s)", [(1,), (2,), (3,)])
+    cursor.executemany("UPDATE activities SET cost = %s WHERE id = %s", [(1, 1), (2, 2)])
+    connection.commit()
+    connection.rollback()
+    # 3 fetch_all + 1 execute + 1 multi-row INSERT + 2 UPDATEs + commit + rollback
+    assert connection.round_trips == 9
+
+    # Closing ends an open transaction so the next user sees fresh data
+    raw = connection._connection
+    raw.in_transaction = True
+    connection.close()
+    assert raw.rollbacks == 2 and pool.stats()['in_use'] == 0
+    print("✓ Statement cache and round trips")
+
+
+def test_fetch_all_retries():
+    """Only lost connections re-prepare and retry a statement"""
+    pool = _pool(size=1, timeout=0.1)
+    connection = pool.get_connection()
+    raw = connection._connection
+
+    raw.errors.append(OperationalError(msg="Lost connection", errno=2013))
+    assert connection.fetch_all("SELECT %s", (1,)) == [(1,)]
+    assert len(raw.log) == 2 and pool.stats()['statements_prepared'] == 2
+
+    raw.errors.append(ProgrammingError(msg="Syntax error", errno=1064))
+    try:
+        connection.fetch_all("SELEC 1")
+    except ProgrammingError:
+        pass
+    else:
+        raise AssertionError("A syntax error was swallowed")
+    assert raw.log[2:] == ["SELEC 1"]
+    connection.close()
+    print("✓ Lost connections retried, other errors raised once")
+
+
+if __name__ == "__main__":
+    test_checkout_metrics()
+    test_statements_and_round_trips()
+    test_fetch_all_retries()
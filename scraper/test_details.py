@@ -0,0 +1,82 @@
+"""
+Test script for the per-class details pages (showOpenRegistrationsDetails)
+"""
+
+import threading
+import time
+from activity import DETAIL_FIELDS
+from benchmark import synthetic_activities
+from fef_scraper import FEFActivityScraper, DB_CONFIG, DETAIL_LABELS, detail_url, parse_activity_details
+
+# Labels and values in separate cells, as on the site
+DETAIL_PAGE = """
+<html><head><script>var vagas = 'Vagas: 999';</script></head><body>
+<h3>A - Natação Adulto</h3>
+<table class="table">
+  <tr><td><b>Número de vagas:</b></td><td>20 vagas</td></tr>
+  <tr><td><b>Localização:</b></td><td>Piscina da FEF</td></tr>
+  <tr><td><b>Professor(a):</b></td><td>Maria Silva</td></tr>
+  <tr><td><b>Local:</b></td><td>Ginásio (repeated label, first value wins)</td></tr>
+</table>
+</body></html>
+"""
+
+# Label and value on the same line
+INLINE_PAGE = """
+<div><p>Vagas: 15</p><p>Local: Sala 2</p><p>Instrutora: Ana Souza</p><p>Observações: trazer toalha</p></div>
+"""
+
+
+def test_parse_details():
+    """Labels are matched ignoring accents, case and layout"""
+    assert parse_activity_details(DETAIL_PAGE) == {
+        'vacancies': 20, 'location': 'Piscina da FEF', 'instructor': 'Maria Silva'}
+    assert parse_activity_details(INLINE_PAGE) == {
+        'vacancies': 15, 'location': 'Sala 2', 'instructor': 'Ana Souza'}
+    assert parse_activity_details('<p>Vagas: esgotadas</p>') == {'vacancies': None}
+    assert parse_activity_details('<p>Local: ' + 'x' * 300 + '</p>')['location'] == 'x' * 255
+    assert parse_activity_details('<p>Nada por aqui</p>') == {}
+    assert tuple(DETAIL_LABELS) == DETAIL_FIELDS
+    print("✓ Detail pages parsed")
+
+
+def test_fetch_details():
+    """Details are merged into the activities whose page loaded"""
+    activities = synthetic_activities(3)
+    activities[2].detail_id = None
+    pages = {detail_url(activities[0].detail_id): INLINE_PAGE}
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False)
+    scraper.fetch_webpage = lambda url, verbose=True: pages.get(url)
+
+    assert scraper.fetch_details(activities, max_workers=2) == 1
+    assert (activities[0].vacancies, activities[0].location, activities[0].instructor) == (15, 'Sala 2', 'Ana Souza')
+    assert all((a.vacancies, a.location, a.instructor) == (None, None, None) for a in activities[1:])
+    print("✓ Details merged into 1 of 3 activities")
+
+
+def test_fetch_details_per_host_cap():
+    """Detail fetches share the per-host cap, whatever the number of workers"""
+    activities = synthetic_activities(12)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def fetch_webpage(url, verbose=True):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return INLINE_PAGE
+
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False)
+    scraper.fetch_webpage = fetch_webpage
+    assert scraper.fetch_details(activities, max_workers=8, per_host_limit=2) == 12
+    assert peak[0] == 2
+    print("✓ At most 2 detail pages fetched at once")
+
+
+if __name__ == "__main__":
+    test_parse_details()
+    test_fetch_details()
+    test_fetch_details_per_host_cap()
@@ -0,0 +1,168 @@
+"""
+Test script for the HTTP response cache (conditional requests and TLS mode memory)
+
+The scraper tests run against a local HTTP server that honours
+If-None-Match / If-Modified-Since.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import http_cache
+from fef_scraper import FEFActivityScraper, DB_CONFIG
+from http_cache import ResponseCache, TLS_UNVERIFIED, TLS_VERIFIED
+
+ETAG = '"v1"'
+LAST_MODIFIED = 'Thu, 07 Aug 2025 12:00:00 GMT'
+BODY = '<html>listing</html>'
+
+
+def test_conditional_headers():
+    """Stored validators become If-None-Match / If-Modified-Since"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache(directory)
+        url = 'https://example.org/page'
+        assert cache.get(url) is None and cache.conditional_headers(url) == {}
+
+        cache.put(url, BODY, ETAG, LAST_MODIFIED)
+        assert cache.get(url)['body'] == BODY
+        assert cache.conditional_headers(url) == {'If-None-Match': ETAG, 'If-Modified-Since': LAST_MODIFIED}
+        cache.put(url, BODY)
+        assert cache.conditional_headers(url) == {}
+
+        with open(cache._path(url), 'w') as f:
+            f.write('{broken')
+        assert cache.get(url) is None
+        assert not [name for name in os.listdir(directory) if name.startswith('.tmp-')]
+    print("✓ Conditional headers from stored validators")
+
+
+def test_tls_mode_memory():
+    """The TLS mode that worked is remembered across instances until it expires"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache(directory)
+        assert cache.get_tls_mode('example.org') is None
+        cache.set_tls_mode('example.org', TLS_UNVERIFIED)
+        assert ResponseCache(directory).get_tls_mode('example.org') == TLS_UNVERIFIED
+
+        cache._tls_modes['example.org']['checked_at'] = time.time() - http_cache.TLS_MODE_TTL - 1
+        assert cache.get_tls_mode('example.org') is None
+        cache.set_tls_mode('example.org', TLS_VERIFIED)
+        assert ResponseCache(directory).get_tls_mode('example.org') == TLS_VERIFIED
+    print("✓ TLS mode remembered per host")
+
+
+class _ValidatingHandler(BaseHTTPRequestHandler):
+    # Answers 304 to this many requests whatever their headers (a misbehaving proxy)
+    stray_not_modified = 0
+    requests = []
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests.append(dict(self.headers))
+        if cls.stray_not_modified > 0 or self.headers.get('If-None-Match') == ETAG:
+            cls.stray_not_modified -= 1
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = BODY.encode('utf-8')
+        self.send_response(200)
+        self.send_header('ETag', ETAG)
+        self.send_header('Last-Modified', LAST_MODIFIED)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _ValidatingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _ValidatingHandler.stray_not_modified, _ValidatingHandler.requests = 0, []
+    return server, f"http://127.0.0.1:{server.server_address[1]}/page"
+
+
+def _scraper(directory):
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False)
+    scraper.response_cache = ResponseCache(directory)
+    return scraper
+
+
+def test_not_modified_short_circuit():
+    """A revalidated page comes back from the cache as not modified"""
+    server, url = _serve()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            scraper = _scraper(directory)
+            first = scraper.fetch(url, verbose=False)
+            assert first.text == BODY and not first.not_modified and first.size == len(BODY)
+
+            second = scraper.fetch(url, verbose=False)
+            assert second.text == BODY and second.not_modified and second.size == 0
+            assert _ValidatingHandler.requests[1].get('If-None-Match') == ETAG
+            assert _ValidatingHandler.requests[1].get('If-Modified-Since') == LAST_MODIFIED
+
+            # Hosts fetched without certificate trouble are remembered as verified
+            host = f"127.0.0.1:{server.server_address[1]}"
+            assert scraper.response_cache.get_tls_mode(host) == TLS_VERIFIED
+            scraper.close_session()
+    finally:
+        server.shutdown()
+        server.server_close()
+    print("✓ 304 answered from the cache")
+
+
+def test_not_modified_without_cached_body():
+    """A 304 with nothing cached is a miss: the page is requested again, never stored empty"""
+    server, url = _serve()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            scraper = _scraper(directory)
+            _ValidatingHandler.stray_not_modified = 1
+            result = scraper.fetch(url, verbose=False)
+            assert result.text == BODY and not result.not_modified
+            assert len(_ValidatingHandler.requests) == 2
+            assert 'If-None-Match' not in _ValidatingHandler.requests[1]
+            assert scraper.response_cache.get(url)['body'] == BODY
+
+            os.remove(scraper.response_cache._path(url))
+            _ValidatingHandler.stray_not_modified = 2
+            assert scraper.fetch(url, verbose=False) is None
+            assert scraper.response_cache.get(url) is None
+            scraper.close_session()
+    finally:
+        server.shutdown()
+        server.server_close()
+    print("✓ 304 without a cached body refetched, nothing empty cached")
+
+
+def test_unverified_host_skips_verification():
+    """A host remembered as unverified is fetched with verify=False right away"""
+    server, url = _serve()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            scraper = _scraper(directory)
+            scraper.response_cache.set_tls_mode(f"127.0.0.1:{server.server_address[1]}", TLS_UNVERIFIED)
+            calls = []
+            request = scraper._request
+            scraper._request = lambda url, headers=None, verify=True, stream=False: \
+                calls.append(verify) or request(url, headers, verify, stream)
+            assert scraper.fetch(url, verbose=False).text == BODY
+            assert calls == [False]
+            scraper.close_session()
+    finally:
+        server.shutdown()
+        server.server_close()
+    print("✓ Remembered unverified host skips the verified attempt")
+
+
+if __name__ == "__main__":
+    test_conditional_headers()
+    test_tls_mode_memory()
+    test_not_modified_short_circuit()
+    test_not_modified_without_cached_body()
+    test_unverified_host_skips_verification()
@@ -0,0 +1,114 @@
+"""
+Test script for the fetch layer's retry policy and circuit breaker
+
+The scraper test runs against a local HTTP server that answers 503 a few
+times before serving the page.
+"""
+
+import random
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from fef_scraper import FEFActivityScraper, DB_CONFIG
+from http_retry import CircuitBreaker, RetryPolicy, parse_retry_after
+
+
+def test_parse_retry_after():
+    """Delay seconds and HTTP dates are both understood"""
+    now = datetime(2025, 8, 7, 12, 0, tzinfo=timezone.utc)
+    assert parse_retry_after('120') == 120
+    assert parse_retry_after('Thu, 07 Aug 2025 12:00:30 GMT', now) == 30
+    assert parse_retry_after('Thu, 07 Aug 2025 11:00:00 GMT', now) == 0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+    print("✓ Retry-After headers parsed")
+
+
+def test_retry_policy():
+    """Backoff stays under its exponential ceiling and Retry-After is a lower bound"""
+    policy = RetryPolicy(max_retries=3, backoff_base=1, backoff_max=10, rng=random.Random(1))
+    for attempt in range(3):
+        assert all(0 <= policy.delay(attempt) <= 2 ** attempt for _ in range(100))
+    assert policy.delay(3) is None
+    assert policy.delay(0, '5') >= 5
+    assert policy.delay(0, '60') is None
+    print("✓ Retry delays within bounds")
+
+
+def test_circuit_breaker():
+    """Opens after the threshold, lets one probe through after the cooldown"""
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=3, cooldown=10, clock=lambda: now[0])
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+    now[0] = 11
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    now[0] = 22
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    print("✓ Circuit breaker transitions")
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    failures_left = 0
+    requests = 0
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests += 1
+        if cls.failures_left > 0:
+            cls.failures_left -= 1
+            self.send_response(503)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = '<html>ok</html>'.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_scraper_retries():
+    """fetch retries 503 answers, and fails fast once the host's circuit is open"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/page"
+    try:
+        scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False)
+        scraper.retry_policy = RetryPolicy(max_retries=3, backoff_base=0.01)
+
+        _FlakyHandler.failures_left, _FlakyHandler.requests = 2, 0
+        result = scraper.fetch(url, verbose=False)
+        assert result and result.text == '<html>ok</html>' and _FlakyHandler.requests == 3
+
+        # Four failed attempts reach the default threshold of 5 with the next fetch
+        _FlakyHandler.failures_left, _FlakyHandler.requests = 100, 0
+        assert scraper.fetch(url, verbose=False) is None
+        assert scraper.fetch(url, verbose=False) is None
+        assert _FlakyHandler.requests == 5
+        assert scraper._breaker(f"127.0.0.1:{server.server_address[1]}").state == CircuitBreaker.OPEN
+        scraper.close_session()
+        print(f"✓ Retried transient errors, circuit opened after {_FlakyHandler.requests} failures")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    test_parse_retry_after()
+    test_retry_policy()
+    test_circuit_breaker()
+    test_scraper_retries()
@@ -47,7 +47,7 @@ def test_live_website():
     
     categories = {}
     for activity in activities:
-        cat = activity['category']
+        cat = activity.category
         if cat not in categories:
             categories[cat] = []
         categories[cat].append(activity)
@@ -55,9 +55,9 @@ def test_live_website():
     for category, items in sorted(categories.items()):
         print(f"\n📚 {category}: {len(items)} activities")
         for activity in items[:2]:  # Show first 2 in each category
-            cost_str = f"R$ {activity['cost']:.2f}" if activity['cost'] > 0 else "FREE"
-            print(f"   • {activity['class_name']}")
-            print(f"     ⏰ {activity['schedule']}")
+            cost_str = f"R$ {activity.cost:.2f}" if activity.cost > 0 else "FREE"
+            print(f"   • {activity.class_name}")
+            print(f"     ⏰ {activity.schedule}")
             print(f"     💰 {cost_str}")
         if len(items) > 2:
             print(f"   ... and {len(items) - 2} more")
@@ -68,7 +68,7 @@ def test_live_website():
     print("="*60)
     
     total = len(activities)
-    free = sum(1 for a in activities if a['cost'] == 0)
+    free = sum(1 for a in activities if a.cost == 0)
     paid = total - free
     
     print(f"\n📊 Total Activities: {total}")
@@ -76,7 +76,7 @@ def test_live_website():
     print(f"💵 Paid Activities: {paid}")
     
     if paid > 0:
-        costs = [a['cost'] for a in activities if a['cost'] > 0]
+        costs = [a.cost for a in activities if a.cost > 0]
         avg_cost = sum(costs) / len(costs)
         min_cost = min(costs)
         max_cost = max(costs)
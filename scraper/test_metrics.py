@@ -0,0 +1,70 @@
+"""
+Test script for per-stage run metrics and their exporters
+"""
+
+import json
+import os
+import tempfile
+import time
+from metrics import STAGE_FIELDS, TOTAL_STAGE, RunMetrics, append_jsonl, format_prometheus, write_prometheus
+
+
+def _sample_run() -> RunMetrics:
+    trips = [0]
+    run = RunMetrics(registration_id=26)
+    with run.stage('fetch') as stage:
+        time.sleep(0.01)
+        stage['bytes_fetched'] += 1000
+    for _ in range(2):
+        with run.stage('write', round_trips=lambda: trips[0]) as stage:
+            trips[0] += 3
+            stage['rows_written'] += 5
+    run.finish(True)
+    return run
+
+
+def test_run_metrics():
+    """Stages accumulate, round trips are counted as deltas and the total sums them"""
+    run = _sample_run()
+    assert list(run.stages) == ['fetch', 'write']
+    assert run.stages['fetch']['wall_seconds'] >= 0.01
+    assert run.stages['write']['rows_written'] == 10
+    assert run.stages['write']['db_round_trips'] == 6
+    assert run.stages['fetch']['db_round_trips'] == 0
+
+    total = run.total()
+    assert total['bytes_fetched'] == 1000 and total['rows_written'] == 10
+    assert total['wall_seconds'] >= run.stages['fetch']['wall_seconds']
+    assert run.rows()[-1][0] == TOTAL_STAGE and len(run.rows()[-1]) == len(STAGE_FIELDS) + 1
+    assert run.status == 'success'
+    print(f"✓ {run.format_summary()}")
+
+
+def test_exporters():
+    """JSON lines append one run per line; the Prometheus file is replaced"""
+    run = _sample_run()
+    with tempfile.TemporaryDirectory() as directory:
+        jsonl_path = os.path.join(directory, 'metrics.jsonl')
+        append_jsonl(jsonl_path, [run])
+        append_jsonl(jsonl_path, [run])
+        with open(jsonl_path, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        assert len(lines) == 2
+        assert lines[0]['stages']['write']['rows_written'] == 10
+
+        prom_path = os.path.join(directory, 'fef_scraper.prom')
+        write_prometheus(prom_path, [run])
+        write_prometheus(prom_path, [run])
+        with open(prom_path, encoding='utf-8') as f:
+            text = f.read()
+        assert text == format_prometheus([run])
+        assert os.stat(prom_path).st_mode & 0o777 == 0o644
+        assert 'fef_scraper_stage_bytes_fetched{registration="26",stage="fetch"} 1000' in text
+        assert 'fef_scraper_last_run_success{registration="26"} 1' in text
+        assert sorted(os.listdir(directory)) == ['fef_scraper.prom', 'metrics.jsonl']
+    print("✓ Metrics exported as JSON lines and Prometheus textfile")
+
+
+if __name__ == "__main__":
+    test_run_metrics()
+    test_exporters()
@@ -0,0 +1,80 @@
+"""
+Test script for the page archive and the backfill from it
+
+Archives the example page three times (twice unchanged, once with a new
+price) and rebuilds activity_versions from the archive against the
+benchmark's in-memory SQLite stand-in.
+"""
+
+import os
+import tempfile
+from datetime import datetime
+from benchmark import EXAMPLE_HTML, SQLiteStandIn, load_example_html
+from fef_scraper import FEFActivityScraper, DB_CONFIG, registration_url
+from page_archive import PageArchive
+from versions import OPEN_VERSION_END
+
+
+def test_content_addressing():
+    """Identical pages are stored once, every fetch is indexed"""
+    with tempfile.TemporaryDirectory() as directory:
+        archive = PageArchive(directory)
+        first = archive.put('https://example.org/a', 'página', fetched_at=datetime(2025, 1, 1))
+        second = archive.put('https://example.org/b', 'página', fetched_at=datetime(2025, 1, 2))
+        archive.put('https://example.org/a', 'outra', registration_id=26, fetched_at=datetime(2025, 1, 3))
+
+        assert first == second and archive.get(first) == 'página'
+        objects = [name for _, _, names in os.walk(os.path.join(directory, 'objects')) for name in names]
+        assert len(objects) == 2
+        assert [page.url for page in archive.pages()] == ['https://example.org/a', 'https://example.org/b',
+                                                          'https://example.org/a']
+        assert len(archive.pages(url='https://example.org/a')) == 2
+        assert [page.registration_id for page in archive.pages(listings_only=True)] == [26]
+        assert len(archive.pages(since=datetime(2025, 1, 2))) == 2
+        archive.close()
+    print("✓ 3 fetches stored as 2 objects")
+
+
+def test_backfill():
+    """Re-parsing the archive rebuilds the history with one new version per change"""
+    if not os.path.exists(EXAMPLE_HTML):
+        print(f"⚠ File not found: {EXAMPLE_HTML}")
+        return
+
+    html_content = load_example_html()
+    changed = html_content.replace('R$ 250,00', 'R$ 275,00', 1)
+    url = registration_url(26)
+    with tempfile.TemporaryDirectory() as directory:
+        archive = PageArchive(directory)
+        archive.put(url, html_content, 26, datetime(2025, 8, 1, 9, 0))
+        archive.put(url, html_content, 26, datetime(2025, 8, 2, 9, 0))
+        archive.put(url, changed, 26, datetime(2025, 8, 3, 9, 0))
+
+        scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False)
+        scraper.archive = archive
+        scraper.connection = SQLiteStandIn()
+        try:
+            activities = scraper.extract_activities(html_content, verbose=False)
+            assert scraper.backfill(max_workers=2)
+            # Running it again replaces the history instead of duplicating it
+            assert scraper.backfill(max_workers=2)
+
+            cursor = scraper.connection.cursor()
+            cursor.execute("SELECT COUNT(*) FROM activity_versions")
+            assert cursor.fetchone()[0] == len(activities) + 1
+            cursor.execute("""
+                SELECT cost, valid_from, valid_to FROM activity_versions
+                WHERE class_name = %s ORDER BY valid_from
+            """, (activities[0].class_name,))
+            assert [(float(cost), valid_to) for cost, _, valid_to in cursor.fetchall()] == [
+                (250.0, datetime(2025, 8, 3, 9, 0)), (275.0, OPEN_VERSION_END)]
+            cursor.close()
+        finally:
+            scraper.connection.close()
+            archive.close()
+    print(f"✓ Backfilled {len(activities) + 1} versions from 3 archived fetches")
+
+
+if __name__ == "__main__":
+    test_content_addressing()
+    test_backfill()
@@ -47,7 +47,7 @@ def test_with_local_file():
     
     categories = {}
     for activity in activities:
-        cat = activity['category']
+        cat = activity.category
         if cat not in categories:
             categories[cat] = []
         categories[cat].append(activity)
@@ -55,9 +55,9 @@ def test_with_local_file():
     for category, items in sorted(categories.items()):
         print(f"\n📚 {category}: {len(items)} activities")
         for activity in items[:3]:  # Show first 3 in each category
-            cost_str = f"R$ {activity['cost']:.2f}" if activity['cost'] > 0 else "FREE"
-            print(f"   • {activity['class_name']}")
-            print(f"     ⏰ {activity['schedule']}")
+            cost_str = f"R$ {activity.cost:.2f}" if activity.cost > 0 else "FREE"
+            print(f"   • {activity.class_name}")
+            print(f"     ⏰ {activity.schedule}")
             print(f"     💰 {cost_str}")
         if len(items) > 3:
             print(f"   ... and {len(items) - 3} more")
@@ -68,11 +68,11 @@ def test_with_local_file():
     print("="*60)
     
     for i, activity in enumerate(activities[:5], 1):
-        print(f"\n{i}. Category: {activity['category']}")
-        print(f"   Class: {activity['class_name']}")
-        print(f"   Schedule: {activity['schedule']}")
-        print(f"   Cost: R$ {activity['cost']:.2f}")
-        print(f"   Deadline: {activity['enrollment_deadline']}")
+        print(f"\n{i}. Category: {activity.category}")
+        print(f"   Class: {activity.class_name}")
+        print(f"   Schedule: {activity.schedule}")
+        print(f"   Cost: R$ {activity.cost:.2f}")
+        print(f"   Deadline: {activity.enrollment_deadline}")
     
     # Statistics
     print("\n" + "="*60)
@@ -80,7 +80,7 @@ def test_with_local_file():
     print("="*60)
     
     total = len(activities)
-    free = sum(1 for a in activities if a['cost'] == 0)
+    free = sum(1 for a in activities if a.cost == 0)
     paid = total - free
     
     print(f"\n📊 Total Activities: {total}")
@@ -88,7 +88,7 @@ def test_with_local_file():
     print(f"💵 Paid Activities: {paid}")
     
     if paid > 0:
-        costs = [a['cost'] for a in activities if a['cost'] > 0]
+        costs = [a.cost for a in activities if a.cost > 0]
         avg_cost = sum(costs) / len(costs)
         min_cost = min(costs)
         max_cost = max(costs)
@@ -0,0 +1,78 @@
+"""
+Test script to verify the lxml parser backend and the streaming parser
+match BeautifulSoup
+
+Every way of extracting activities must produce exactly the same
+activities, so the faster one can be switched on without changing data.
+"""
+
+import pytest
+from fef_scraper import FEFActivityScraper, DB_CONFIG, unwrap_view_source
+import os
+
+
+EDGE_CASES_HTML = """
+<html><body>
+<table class="table table-bordered">
+  <thead><tr><td colspan="4" style="background-color: #153975;"><strong> Lutas &amp; Artes </strong></td></tr></thead>
+  <tbody>
+    <tr><td>header-like row without class</td><td>x</td><td>y</td><td>z</td></tr>
+    <tr class="text-center" onClick="goToURL('https://x/showOpenRegistrationsDetails/42')">
+      <td> A - Judô <!-- comment --> Adulto </td>
+      <td>Seg - 18:00 às 19:30<br/> Qua - 18:30 às 19:30<br/></td>
+      <td>R$&nbsp;1.250,00</td>
+      <td>07/08/25 às 08:00 <span>até</span> 30/09/25 às 23:55</td>
+    </tr>
+  </tbody>
+  <tbody><tr><td>B - Sem Link</td><td>Online - 13:00 às 23:59</td><td>Gratuito</td><td>-</td></tr></tbody>
+  <tbody><tr><td>only</td><td>three</td><td>cells</td></tr></tbody>
+</table>
+<table class="other"><tr><td style="background-color: #153975">Ignored</td></tr></table>
+</body></html>
+"""
+
+
+def _load_pages():
+    """Edge cases plus the example page, if present"""
+    pages = {'edge cases': EDGE_CASES_HTML}
+    html_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'atividades-fef-example.html')
+    if os.path.exists(html_file):
+        with open(html_file, 'r', encoding='utf-8') as f:
+            pages['example page'] = unwrap_view_source(f.read())
+    return pages
+
+
+def test_backends_match():
+    """Compare bs4 and lxml output on the example page and on edge cases"""
+    pytest.importorskip('lxml', reason="lxml is not installed")
+
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False)
+
+    for name, html_content in _load_pages().items():
+        expected = scraper.extract_activities(html_content, parser='bs4', verbose=False)
+        actual = scraper.extract_activities(html_content, parser='lxml', verbose=False)
+        print(f"{name}: bs4={len(expected)} lxml={len(actual)}")
+        assert actual == expected, f"lxml output differs from bs4 on {name}"
+        assert expected, f"no activities extracted from {name}"
+
+    print("✓ Parser backends produce identical output")
+
+
+def test_stream_matches():
+    """Compare streamed activities with bs4 output for several chunk sizes"""
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False)
+
+    for name, html_content in _load_pages().items():
+        expected = scraper.extract_activities(html_content, parser='bs4', verbose=False)
+        for chunk_size in (1, 100, 65536):
+            chunks = (html_content[i:i + chunk_size] for i in range(0, len(html_content), chunk_size))
+            actual = list(scraper.stream_activities(chunks))
+            assert actual == expected, f"streamed output differs from bs4 on {name} (chunks of {chunk_size})"
+        print(f"{name}: {len(expected)} activities streamed identically")
+
+    print("✓ Streaming parser produces identical output")
+
+
+if __name__ == "__main__":
+    test_backends_match()
+    test_stream_matches()
@@ -0,0 +1,105 @@
+"""
+Test script for the scriptable query CLI
+
+The CLI runs in subprocesses against a disk query cache prepared here, so
+no MySQL server is needed and the startup cost can be checked.
+"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from decimal import Decimal
+from query_cache import QueryCache, publish_version
+from query_cli import write_result
+
+SCRAPER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds importing the CLI may take (the interpreter's own startup not included)
+STARTUP_BUDGET = 0.15
+
+
+def _run(code: str, cache_dir: str = None) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    if cache_dir:
+        env['QUERY_CACHE_DIR'] = cache_dir
+    return subprocess.run([sys.executable, '-c', code], cwd=SCRAPER_DIR, env=env,
+                          capture_output=True, text=True, timeout=60)
+
+
+def test_startup_budget():
+    """Importing the CLI loads neither mysql-connector nor the database layer"""
+    result = _run("import sys, time\n"
+                  "start = time.perf_counter()\n"
+                  "import query_cli\n"
+                  "print(time.perf_counter() - start)\n"
+                  "print(sorted(m for m in ('mysql.connector', 'database') if m in sys.modules))")
+    assert result.returncode == 0, result.stderr
+    seconds, loaded = result.stdout.splitlines()
+    assert loaded == '[]', loaded
+    assert float(seconds) < STARTUP_BUDGET, f"import took {float(seconds) * 1000:.0f} ms"
+    print(f"✓ CLI imported in {float(seconds) * 1000:.1f} ms without mysql-connector")
+
+
+def test_output_formats():
+    """The same result as JSON, NDJSON and CSV"""
+    result = (('class_name', 'cost'), [('Judô', Decimal('250.00')), ('Yoga', Decimal('0.00'))])
+    outputs = {}
+    for output_format in ('json', 'ndjson', 'csv'):
+        out = io.StringIO()
+        write_result(result, output_format, out)
+        outputs[output_format] = out.getvalue()
+    assert json.loads(outputs['json']) == [{'class_name': 'Judô', 'cost': 250.0},
+                                           {'class_name': 'Yoga', 'cost': 0.0}]
+    assert [json.loads(line) for line in outputs['ndjson'].splitlines()] == json.loads(outputs['json'])
+    assert outputs['csv'] == 'class_name,cost\nJudô,250.00\nYoga,0.00\n'
+    print("✓ JSON, NDJSON and CSV output")
+
+
+def test_cached_batch():
+    """A batch answered from the query cache never connects to MySQL"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        publish_version(7, cache_dir)
+        cache = QueryCache(cache_dir=cache_dir)
+        cache.get_or_load('categories', (), lambda: [('Dança',), ('Natação',)])
+        cache.get_or_load('statistics', (), lambda: {
+            'scrape_id': 7, 'total': 3, 'free': 1, 'avg_cost': Decimal('250.00'),
+            'min_cost': Decimal('200.00'), 'max_cost': Decimal('300.00'),
+            'by_category': [('Natação', 2), ('Dança', 1)]})
+        cache.get_or_load('timetable_candidates', (), lambda: [
+            (1, 'Natação', 'A - Adulto', Decimal('250.00'), 'Seg - 18:00 às 19:00', 0, 1080, 1140),
+            (2, 'Dança', 'A - Ballet', Decimal('200.00'), 'Seg - 18:30 às 19:30', 0, 1110, 1170),
+            (3, 'Dança', 'B - Jazz', Decimal('200.00'), 'Ter - 18:00 às 19:00', 1, 1080, 1140)])
+
+        result = _run("import io, sys\n"
+                      "import query_cli\n"
+                      "sys.stdin = io.StringIO('categories\\n# comment\\nstats\\ncategory\\n'\n"
+                      "                       'combine --count\\ncombine --with 1 --max-cost 450\\n')\n"
+                      "status = query_cli.main(['batch', '--format', 'ndjson'])\n"
+                      "print('mysql.connector' in sys.modules, status)", cache_dir)
+        assert result.returncode == 0, result.stderr
+        *lines, summary = result.stdout.splitlines()
+        assert summary == 'False 2', summary
+        entries = [json.loads(line) for line in lines]
+        assert [entry['command'] for entry in entries] == ['categories', 'stats', 'category', 'combine --count',
+                                                           'combine --with 1 --max-cost 450']
+        assert entries[0]['results'] == [{'category': 'Dança'}, {'category': 'Natação'}]
+        assert entries[1]['results'][0] == {'category': '', 'total': 3, 'free': 1, 'avg_cost': 250.0,
+                                            'min_cost': 200.0, 'max_cost': 300.0}
+        assert 'error' in entries[2]
+        # {1}, {2}, {3}, {1, 3}, {2, 3}: classes 1 and 2 clash on Monday
+        assert entries[3]['results'] == [{'combinations': 5}]
+        assert [(row['combination'], row['id']) for row in entries[4]['results']] == [(1, 1), (2, 1), (2, 3)]
+
+        result = _run("import query_cli, sys\n"
+                      "sys.exit(query_cli.main(['categories', '--format', 'csv']))", cache_dir)
+        assert result.returncode == 0 and result.stdout == 'category\nDança\nNatação\n', result
+    print("✓ Batch of 5 commands served from the cache")
+
+
+if __name__ == "__main__":
+    test_startup_budget()
+    test_output_formats()
+    test_cached_batch()
@@ -0,0 +1,77 @@
+"""
+Test script to verify schedule and enrollment window parsing
+
+Every schedule on the example page must either parse into sessions or be
+one of the known formats without a fixed weekday (online activities), and
+every enrollment window must parse into opening and closing times.
+"""
+
+from datetime import datetime
+from fef_scraper import FEFActivityScraper, DB_CONFIG, unwrap_view_source
+from schedules import parse_enrollment_window, parse_schedule_sessions
+import os
+
+
+SCHEDULE_CASES = {
+    'Seg, Qua - 18:00 às 19:00': [(0, 1080, 1140), (2, 1080, 1140)],
+    'Seg - 18:00 às 19:30 Qua - 18:30 às 19:30': [(0, 1080, 1170), (2, 1110, 1170)],
+    'Qua, Online - 07:10 às 07:55': [(2, 430, 475)],
+    'Dom - 09:00 às 12:00': [(6, 540, 720)],
+    'Sáb - 08:00 às 09:00': [(5, 480, 540)],
+    'Online - 13:00 às 23:59': [],
+    'A combinar': [],
+}
+
+ENROLLMENT_CASES = {
+    '07/08/25 às 08:00 até 30/09/25 às 23:55': (datetime(2025, 8, 7, 8, 0), datetime(2025, 9, 30, 23, 55)),
+    '01/02/2026 até 15/02/2026': (datetime(2026, 2, 1), datetime(2026, 2, 15, 23, 59)),
+    'até 30/09/25 às 12:00': (None, datetime(2025, 9, 30, 12, 0)),
+    '-': (None, None),
+}
+
+
+def test_schedule_cases():
+    """Check hand-written schedules, including ones that fall back to text"""
+    for schedule, expected in SCHEDULE_CASES.items():
+        sessions = parse_schedule_sessions(schedule)
+        assert sessions == expected, f"{schedule!r}: {sessions} != {expected}"
+    print(f"✓ {len(SCHEDULE_CASES)} schedule cases parsed as expected")
+
+
+def test_enrollment_cases():
+    """Check hand-written enrollment windows"""
+    for text, expected in ENROLLMENT_CASES.items():
+        window = parse_enrollment_window(text)
+        assert window == expected, f"{text!r}: {window} != {expected}"
+    print(f"✓ {len(ENROLLMENT_CASES)} enrollment windows parsed as expected")
+
+
+def test_example_page_schedules():
+    """Every schedule with a weekday and every enrollment window on the example page must parse"""
+    html_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'atividades-fef-example.html')
+    if not os.path.exists(html_file):
+        print(f"⚠ File not found: {html_file}")
+        return
+
+    with open(html_file, 'r', encoding='utf-8') as f:
+        html_content = unwrap_view_source(f.read())
+
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False)
+    activities = scraper.extract_activities(html_content, verbose=False)
+    unparsed = [a.schedule for a in activities if not parse_schedule_sessions(a.schedule)]
+
+    print(f"{len(activities) - len(unparsed)}/{len(activities)} schedules parsed into sessions")
+    for schedule in unparsed:
+        print(f"  ⚠ Kept as text: {schedule}")
+    assert all(schedule.startswith('Online') for schedule in unparsed)
+
+    for activity in activities:
+        opens_at, closes_at = activity.enrollment_opens_at, activity.enrollment_closes_at
+        assert opens_at and closes_at and opens_at < closes_at, activity.enrollment_deadline
+    print(f"✓ {len(activities)} enrollment windows parsed")
+
+
+if __name__ == "__main__":
+    test_schedule_cases()
+    test_enrollment_cases()
+    test_example_page_schedules()
@@ -0,0 +1,68 @@
+"""
+Test script to verify the accent-insensitive activity search
+
+Searches the example page for names typed without accents, with typos or
+with the words run together, and checks incremental index updates.
+"""
+
+from fef_scraper import FEFActivityScraper, DB_CONFIG, unwrap_view_source
+from search_index import SearchIndex, build_documents, fold_text
+import os
+
+
+SEARCH_CASES = {
+    'judo': 'Judô',
+    'natacao': 'Natação',
+    'NATAÇÃO': 'Natação',
+    'taichi': 'Taichichuan',
+    'hidroginastica': 'Hidroginástica',
+    'hidroginastca': 'Hidroginástica',
+}
+
+
+def test_fold_text():
+    """Accents, case and punctuation are ignored"""
+    assert fold_text('A - Judô Infantil') == 'a judo infantil'
+    assert fold_text('Natação (Iniciante)') == 'natacao iniciante'
+    print("✓ Text folding works")
+
+
+def test_incremental_update():
+    """Only changed documents are re-indexed and removed ones stop matching"""
+    index = SearchIndex()
+    assert index.update({1: 'Judô Adulto', 2: 'Natação Infantil'}, version=1) == (2, 0)
+    assert index.update({1: 'Judô Adulto', 3: 'Yoga'}, version=2) == (1, 1)
+    assert [doc_id for doc_id, _ in index.search('natacao')] == []
+    assert [doc_id for doc_id, _ in index.search('yoga')] == [3]
+    assert index.version == 2
+    print("✓ Incremental updates work")
+
+
+def test_example_page_search():
+    """Typical queries find the expected activities on the example page"""
+    html_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'atividades-fef-example.html')
+    if not os.path.exists(html_file):
+        print(f"⚠ File not found: {html_file}")
+        return
+
+    with open(html_file, 'r', encoding='utf-8') as f:
+        html_content = unwrap_view_source(f.read())
+
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False)
+    activities = scraper.extract_activities(html_content, verbose=False)
+    index = SearchIndex()
+    index.update(build_documents((i, a.category, a.class_name) for i, a in enumerate(activities)))
+
+    for query, expected in SEARCH_CASES.items():
+        results = index.search(query, limit=5)
+        assert results, f"No results for {query!r}"
+        best = activities[results[0][0]]
+        assert expected in best.category + best.class_name, f"{query!r} found {best.class_name}"
+        print(f"  {query!r} → {best.category} / {best.class_name} ({results[0][1]})")
+    print(f"✓ {len(SEARCH_CASES)} searches found the expected activities")
+
+
+if __name__ == "__main__":
+    test_fold_text()
+    test_incremental_update()
+    test_example_page_search()
@@ -0,0 +1,123 @@
+"""
+Test script for the JSON snapshots written for the PHP front end
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+from benchmark import SQLiteStandIn, synthetic_activities
+from fef_scraper import FEFActivityScraper, DB_CONFIG
+from snapshot import SNAPSHOT_COLUMNS, category_slug, read_manifest, write_snapshot
+
+
+def _activities(count: int):
+    return [dict({column: None for column in SNAPSHOT_COLUMNS}, id=i + 1, **activity.as_dict())
+            for i, activity in enumerate(synthetic_activities(count))]
+
+
+def test_category_slug():
+    """Category names become ASCII file names"""
+    assert category_slug('Natação') == 'natacao'
+    assert category_slug('GINÁSTICA ARTÍSTICA / Adulto') == 'ginastica-artistica-adulto'
+    assert category_slug('***') == 'category'
+    print("✓ Category slugs")
+
+
+def test_snapshot_after_run():
+    """A successful run writes the listing, one file per category, stats and a manifest"""
+    activities = synthetic_activities(30)
+    with tempfile.TemporaryDirectory() as directory:
+        scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False, snapshot_dir=directory)
+        scraper.connection = SQLiteStandIn()
+        try:
+            assert scraper.replace_activities(activities, 26, commit=False)
+            assert scraper.commit_successful_run(len(activities), 26)
+        finally:
+            scraper.connection.close()
+
+        manifest = read_manifest(directory)
+        assert manifest['version'] == 1 and manifest['activities'] == 30
+        for path, entry in manifest['files'].items():
+            with open(os.path.join(directory, path), 'rb') as f:
+                body = f.read()
+            with gzip.open(os.path.join(directory, path + '.gz'), 'rb') as f:
+                assert f.read() == body
+            assert entry['etag'] == '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            assert stat.S_IMODE(os.stat(os.path.join(directory, path)).st_mode) == 0o644
+
+        with open(os.path.join(directory, 'stats.json'), encoding='utf-8') as f:
+            stats = json.load(f)
+        with open(os.path.join(directory, 'activities.json'), encoding='utf-8') as f:
+            listing = json.load(f)
+        assert stats['total'] == len(listing) == 30 and stats['free'] == 0
+        assert stats['min_cost'] == min(a.cost for a in activities)
+        assert sum(category['total'] for category in stats['by_category']) == 30
+        for category in stats['by_category']:
+            with open(os.path.join(directory, category['file']), encoding='utf-8') as f:
+                rows = json.load(f)
+            assert len(rows) == category['total']
+            assert {row['category'] for row in rows} == {category['category']}
+        assert not [name for name in os.listdir(directory) if name.startswith('.tmp-')]
+    print(f"✓ Snapshot of {len(listing)} activities in {len(manifest['files'])} files")
+
+
+def test_unchanged_files_kept():
+    """Only files whose content changed are rewritten; vanished categories are removed"""
+    activities = _activities(12)
+    with tempfile.TemporaryDirectory() as directory:
+        assert write_snapshot(activities, 1, directory) == len(read_manifest(directory)['files'])
+        before = read_manifest(directory)['files']
+        assert write_snapshot(activities, 2, directory) == 0
+        assert read_manifest(directory)['version'] == 2
+
+        changed = activities[0]['category']
+        activities[0]['cost'] += 1
+        # Listing, stats and the changed category
+        assert write_snapshot(activities, 3, directory) == 3
+        after = read_manifest(directory)['files']
+        assert [path for path in before if before[path] != after[path]] == [
+            'activities.json', f"categories/{category_slug(changed)}.json", 'stats.json']
+
+        remaining = [activity for activity in activities if activity['category'] != changed]
+        write_snapshot(remaining, 4, directory, compress=False)
+        path = os.path.join(directory, 'categories', f"{category_slug(changed)}.json")
+        assert not os.path.exists(path) and not os.path.exists(path + '.gz')
+        assert not os.path.exists(os.path.join(directory, 'activities.json.gz'))
+    print("✓ Unchanged files and ETags kept across runs")
+
+
+def test_readers_never_see_partial_files():
+    """A reader polling the listing during rewrites always parses complete JSON"""
+    snapshots = [_activities(50), _activities(400)]
+    with tempfile.TemporaryDirectory() as directory:
+        write_snapshot(snapshots[0], 1, directory, compress=False)
+        done = threading.Event()
+        reads = []
+
+        def reader():
+            path = os.path.join(directory, 'activities.json')
+            while not done.is_set():
+                with open(path, 'rb') as f:
+                    reads.append(len(json.loads(f.read())))
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        try:
+            for version in range(2, 30):
+                write_snapshot(snapshots[version % 2], version, directory, compress=False)
+        finally:
+            done.set()
+            thread.join()
+        assert reads and set(reads) <= {50, 400}
+    print(f"✓ {len(reads)} concurrent reads saw complete files")
+
+
+if __name__ == "__main__":
+    test_category_slug()
+    test_snapshot_after_run()
+    test_unchanged_files_kept()
+    test_readers_never_see_partial_files()
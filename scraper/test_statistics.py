@@ -0,0 +1,78 @@
+"""
+Test script for the per-run statistics (activity_stats)
+
+A scrape is committed to the benchmark's in-memory SQLite stand-in and the
+stored rows are read back through query_activities.
+"""
+
+import query_activities
+from benchmark import SQLiteStandIn, synthetic_activities
+from database import STATS_ALL_CATEGORIES
+from fef_scraper import FEFActivityScraper, DB_CONFIG
+
+
+class _Borrowed:
+    """The stand-in as a pooled connection whose close() hands it back open"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        pass
+
+
+def _expected(activities):
+    paid = [a.cost for a in activities if a.cost > 0]
+    return (len(activities), len(activities) - len(paid), round(sum(paid) / len(paid), 2), min(paid), max(paid))
+
+
+def test_stored_statistics():
+    """Each successful run stores per-category and overall rows, read back by get_statistics"""
+    activities = synthetic_activities(40)
+    for activity in activities[::7]:
+        activity.cost = 0.0
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False, snapshot_dir=None)
+    scraper.connection = SQLiteStandIn()
+    original = query_activities.connect_to_database
+    query_activities.connect_to_database = lambda: _Borrowed(scraper.connection)
+    try:
+        # No run yet: aggregated live from the activities table
+        assert scraper.replace_activities(activities, 26)
+        live = query_activities._load_statistics()
+        assert live['scrape_id'] is None and live['total'] == 40
+
+        assert scraper.commit_successful_run(len(activities), 26)
+        rows = scraper.connection.fetch_all("""
+            SELECT category, total_activities, free_activities, avg_cost, min_cost, max_cost
+            FROM activity_stats WHERE scrape_id = 1
+        """)
+        by_category = {row[0]: row[1:] for row in rows}
+        assert len(by_category) == len({a.category for a in activities}) + 1
+        overall = by_category.pop(STATS_ALL_CATEGORIES)
+        assert overall[:2] == _expected(activities)[:2]
+        assert [round(float(value), 2) for value in overall[2:]] == list(_expected(activities)[2:])
+        yoga = [a for a in activities if a.category == 'Yoga']
+        assert by_category['Yoga'][:2] == _expected(yoga)[:2]
+
+        stored = query_activities._load_statistics()
+        assert stored['scrape_id'] == 1 and stored['total'] == 40 and stored['free'] == overall[1]
+        assert dict(stored['by_category']) == {category: row[0] for category, row in by_category.items()}
+        assert [count for _, count in stored['by_category']] == \
+            sorted((count for _, count in stored['by_category']), reverse=True)
+
+        # The latest run wins
+        assert scraper.replace_activities(activities[:10], 26)
+        assert scraper.commit_successful_run(10, 26)
+        latest = query_activities._load_statistics()
+        assert latest['scrape_id'] == 2 and latest['total'] == 10
+    finally:
+        query_activities.connect_to_database = original
+        scraper.connection.close()
+    print(f"✓ Statistics of {len(by_category)} categories stored and read back")
+
+
+if __name__ == "__main__":
+    test_stored_statistics()
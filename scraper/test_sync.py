@@ -0,0 +1,98 @@
+"""
+Test script for the incremental sync of the activities table
+
+Runs sync_activities against the benchmark's in-memory SQLite stand-in
+(which translates the MySQL upsert) and checks that only changed rows are
+written and that row IDs and keys survive re-syncs.
+"""
+
+from benchmark import SQLiteStandIn, synthetic_activities
+from fef_scraper import FEFActivityScraper, DB_CONFIG
+
+
+def _rows(scraper):
+    cursor = scraper.connection.cursor()
+    cursor.execute("SELECT activity_key, id, cost FROM activities")
+    rows = {key: (row_id, cost) for key, row_id, cost in cursor.fetchall()}
+    cursor.close()
+    return rows
+
+
+def test_sync_counts():
+    """Inserts, updates, deletes and unchanged rows are counted; IDs and keys stay"""
+    activities = synthetic_activities(20)
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False, snapshot_dir=None)
+    scraper.connection = SQLiteStandIn()
+    try:
+        assert scraper.sync_activities(activities, 26) == \
+            {'inserted': 20, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        before = _rows(scraper)
+        assert scraper.sync_activities(activities, 26) == \
+            {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 20}
+        assert _rows(scraper) == before
+
+        changed = [activities[0].replace(cost=999.0)] + activities[1:15] + synthetic_activities(22)[20:]
+        assert scraper.sync_activities(changed, 26) == \
+            {'inserted': 2, 'updated': 1, 'deleted': 5, 'unchanged': 14}
+        after = _rows(scraper)
+        kept = set(before) & set(after)
+        assert len(kept) == 15
+        assert all(after[key][0] == before[key][0] for key in kept)
+        assert sorted(cost for _, cost in after.values() if cost == 999) == [999]
+
+        # Keeping missing rows leaves them alone
+        assert scraper.sync_activities(changed[:3], 26, delete_missing=False)['deleted'] == 0
+        assert _rows(scraper) == after
+    finally:
+        scraper.connection.close()
+    print("✓ Sync counts, stable row IDs and keys")
+
+
+def test_sync_takes_over_moved_keys():
+    """An activity moving to another registration list keeps its row"""
+    activities = synthetic_activities(5)
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False, snapshot_dir=None)
+    scraper.connection = SQLiteStandIn()
+    try:
+        assert scraper.sync_activities(activities, 25)['inserted'] == 5
+        before = _rows(scraper)
+        assert scraper.sync_activities(activities[:1], 26, delete_missing=False)['inserted'] == 1
+        assert _rows(scraper) == before
+
+        cursor = scraper.connection.cursor()
+        cursor.execute("SELECT registration_id, COUNT(*) FROM activities GROUP BY registration_id")
+        assert dict(cursor.fetchall()) == {25: 4, 26: 1}
+    finally:
+        scraper.connection.close()
+    print("✓ Moved activity keeps its row ID")
+
+
+def test_stream_keeps_row_ids():
+    """Streamed loads upsert on the key: IDs stay, missing rows and their sessions go"""
+    activities = synthetic_activities(10)
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False, use_archive=False, snapshot_dir=None)
+    scraper.connection = SQLiteStandIn()
+    try:
+        assert scraper.save_activity_stream(iter(activities), 26, batch_size=3) == 10
+        before = _rows(scraper)
+        changed = [activities[0].replace(cost=999.0)] + activities[1:8]
+        assert scraper.save_activity_stream(iter(changed), 26, batch_size=4) == 8
+        after = _rows(scraper)
+        assert len(after) == 8 and set(after) < set(before)
+        assert all(after[key][0] == before[key][0] for key in after)
+        assert sorted(cost for _, cost in after.values() if cost == 999) == [999]
+
+        cursor = scraper.connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM activity_sessions WHERE activity_id NOT IN "
+                       "(SELECT id FROM activities)")
+        assert cursor.fetchone()[0] == 0
+        cursor.close()
+    finally:
+        scraper.connection.close()
+    print("✓ Streamed loads keep row IDs and drop missing rows")
+
+
+if __name__ == "__main__":
+    test_sync_counts()
+    test_sync_takes_over_moved_keys()
+    test_stream_keeps_row_ids()
@@ -0,0 +1,109 @@
+"""
+Test script for the timetable combination engine
+
+Counts and enumerations are checked against brute force on random subsets
+of the example page's classes.
+"""
+
+import os
+import random
+import time
+from decimal import Decimal
+from itertools import combinations
+from benchmark import EXAMPLE_HTML, example_candidates
+from timetable import IntervalIndex, TimetablePlanner, conflicts, parse_busy_blocks
+
+# Seconds a count over every class of the example page may take
+INTERACTIVE_BUDGET = 1.0
+
+
+def _brute_force(candidates, max_cost=None, categories=None, busy=(), required=(), min_size=1, max_size=None):
+    """Every clash-free subset meeting the constraints, by trying them all"""
+    clashes = conflicts(candidates)
+    busy_index = IntervalIndex(('busy', session) for session in busy)
+    found = set()
+    for size in range(len(candidates) + 1):
+        if size < min_size or (max_size is not None and size > max_size):
+            continue
+        for subset in combinations(candidates, size):
+            ids = {candidate.id for candidate in subset}
+            if not size or not set(required) <= ids:
+                continue
+            if any(clashes[class_id] & ids for class_id in ids):
+                continue
+            if any(busy_index.overlapping(*session) for candidate in subset for session in candidate.sessions):
+                continue
+            if max_cost is not None and sum(candidate.cost for candidate in subset) > max_cost:
+                continue
+            if categories and any(candidate.category not in categories
+                                  for candidate in subset if candidate.id not in required):
+                continue
+            if any(not candidate.sessions for candidate in subset if candidate.id not in required):
+                continue
+            found.add(frozenset(ids))
+    return found
+
+
+def test_interval_index():
+    """Overlaps are found across the index; touching sessions do not clash"""
+    index = IntervalIndex([('a', (0, 18 * 60, 19 * 60)), ('b', (0, 19 * 60, 20 * 60)),
+                           ('c', (0, 8 * 60, 22 * 60)), ('d', (2, 18 * 60, 19 * 60))])
+    assert index.overlapping(0, 18 * 60 + 30, 18 * 60 + 45) == {'a', 'c'}
+    assert index.overlapping(0, 19 * 60, 19 * 60 + 1) == {'b', 'c'}
+    assert index.overlapping(0, 6 * 60, 7 * 60) == set()
+    assert index.overlapping(5, 0, 24 * 60) == set()
+    assert parse_busy_blocks(['Seg, Qua - 08:00 às 12:00']) == [(0, 480, 720), (2, 480, 720)]
+    print("✓ Interval index overlaps")
+
+
+def test_against_brute_force():
+    """count() and combinations() agree with trying every subset"""
+    if not os.path.exists(EXAMPLE_HTML):
+        print(f"⚠ File not found: {EXAMPLE_HTML}")
+        return
+
+    candidates = example_candidates()
+    rng = random.Random(7)
+    cases = 0
+    for _ in range(6):
+        sample = rng.sample(candidates, 14)
+        categories = {sample[0].category, sample[1].category, sample[2].category}
+        for constraints in ({}, {'max_cost': Decimal('600')}, {'min_size': 2, 'max_size': 3},
+                            {'categories': categories}, {'required': [sample[0].id]},
+                            {'busy': parse_busy_blocks(['Seg, Qua - 18:00 às 20:00'])},
+                            {'required': [sample[0].id, sample[1].id], 'max_cost': Decimal('900')}):
+            expected = _brute_force(sample, **constraints)
+            planner = TimetablePlanner(sample, **constraints)
+            enumerated = [frozenset(candidate.id for candidate in combination.classes)
+                          for combination in planner.combinations()]
+            assert planner.count() == len(expected), constraints
+            assert len(enumerated) == len(set(enumerated)) and set(enumerated) == expected, constraints
+            cases += 1
+    print(f"✓ {cases} constraint sets match brute force")
+
+
+def test_interactive_time():
+    """Counting over every class of the example page stays interactive"""
+    if not os.path.exists(EXAMPLE_HTML):
+        print(f"⚠ File not found: {EXAMPLE_HTML}")
+        return
+
+    candidates = example_candidates()
+    for constraints in ({}, {'max_cost': Decimal('1000')}, {'max_size': 3},
+                        {'busy': parse_busy_blocks(['Seg, Ter, Qua, Qui, Sex - 08:00 às 18:00'])}):
+        start = time.perf_counter()
+        planner = TimetablePlanner(candidates, **constraints)
+        total = planner.count()
+        first = list(planner.combinations(limit=50))
+        elapsed = time.perf_counter() - start
+        assert elapsed < INTERACTIVE_BUDGET, (constraints, elapsed)
+        assert total >= len(first) > 0
+        for combination in first:
+            assert combination.total_cost == sum(candidate.cost for candidate in combination.classes)
+    print(f"✓ Counted combinations of {len(candidates)} classes within {INTERACTIVE_BUDGET:g}s")
+
+
+if __name__ == "__main__":
+    test_interval_index()
+    test_against_brute_force()
+    test_interactive_time()
@@ -0,0 +1,146 @@
+"""
+Test script for the activity history (activity_versions)
+
+Runs full reloads against the benchmark's in-memory SQLite stand-in and
+checks that versions are only written when values change.
+"""
+
+import tempfile
+from datetime import datetime
+import fef_scraper
+import query_activities
+from benchmark import SQLiteStandIn, synthetic_activities
+from fef_scraper import FEFActivityScraper, DB_CONFIG
+from query_cache import QueryCache, publish_version
+from versions import OPEN_VERSION_END, compact_versions, diff_versions
+
+
+def test_diff_versions():
+    """New and changed keys get versions, missing keys end"""
+    current = {'a': (1,), 'b': (2,), 'c': (3,)}
+    incoming = {'a': (1,), 'b': (20,), 'd': (4,)}
+    assert diff_versions(current, incoming) == (['b', 'd'], ['c'])
+    assert diff_versions(current, incoming, delete_missing=False) == (['b', 'd'], [])
+    print("✓ Version diff")
+
+
+def test_compact_versions():
+    """Zero-length versions go, repeated values fold into their predecessor"""
+    t = [datetime(2025, 1, day) for day in range(1, 6)]
+    rows = [
+        (1, 'a', t[0], t[1], (100,)),
+        (2, 'a', t[1], t[1], (150,)),
+        (3, 'a', t[1], t[2], (100,)),
+        (4, 'a', t[2], OPEN_VERSION_END, (100,)),
+        (5, 'b', t[0], t[3], (100,)),
+        (6, 'b', t[3], OPEN_VERSION_END, (200,)),
+    ]
+    assert compact_versions(rows) == ([(1, OPEN_VERSION_END)], [2, 3, 4])
+    print("✓ Version compaction")
+
+
+def test_reload_history():
+    """Repeated reloads only version what changed"""
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False)
+    scraper.connection = SQLiteStandIn()
+    clock = [datetime(2025, 3, 1, 12, 0)]
+    original_site_now = fef_scraper.site_now
+    fef_scraper.site_now = lambda: clock[0]
+    try:
+        activities = synthetic_activities(10)
+        assert scraper.replace_activities(activities, registration_id=26)
+
+        clock[0] = datetime(2025, 8, 1, 12, 0)
+        assert scraper.replace_activities(activities, registration_id=26)
+
+        clock[0] = datetime(2025, 9, 1, 12, 0)
+        changed = [activity.replace() for activity in activities[:9]]
+        changed[0].cost = 999.0
+        assert scraper.replace_activities(changed, registration_id=26)
+
+        cursor = scraper.connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM activity_versions")
+        assert cursor.fetchone()[0] == 11
+
+        # As of before the change: old price, all ten classes
+        as_of = datetime(2025, 8, 15)
+        cursor.execute("""
+            SELECT class_name, cost FROM activity_versions
+            WHERE valid_to > %s AND valid_from <= %s ORDER BY class_name
+        """, (as_of, as_of))
+        rows = cursor.fetchall()
+        assert len(rows) == 10 and dict(rows)[activities[0].class_name] == activities[0].cost
+
+        cursor.execute("SELECT COUNT(*) FROM activity_versions WHERE valid_to = %s", (OPEN_VERSION_END,))
+        assert cursor.fetchone()[0] == 9
+        cursor.close()
+
+        assert scraper.compact_history()
+        print("✓ 3 reloads stored 11 versions of 10 classes")
+    finally:
+        fef_scraper.site_now = original_site_now
+        scraper.connection.close()
+
+
+def test_stream_history():
+    """Streaming mode records versions like the other write paths"""
+    scraper = FEFActivityScraper(DB_CONFIG, use_cache=False)
+    scraper.connection = SQLiteStandIn()
+    clock = [datetime(2025, 3, 1, 12, 0)]
+    original_site_now = fef_scraper.site_now
+    fef_scraper.site_now = lambda: clock[0]
+    try:
+        activities = synthetic_activities(10)
+        assert scraper.save_activity_stream(iter(activities), 26, batch_size=3) == 10
+
+        clock[0] = datetime(2025, 8, 1, 12, 0)
+        changed = [activity.replace() for activity in activities[:9]]
+        changed[0].cost = 999.0
+        assert scraper.save_activity_stream(iter(changed), 26, batch_size=4) == 9
+
+        cursor = scraper.connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM activity_versions")
+        assert cursor.fetchone()[0] == 11
+        cursor.execute("SELECT class_name, cost FROM activity_versions WHERE valid_to = %s",
+                       (OPEN_VERSION_END,))
+        current = dict(cursor.fetchall())
+        assert len(current) == 9 and current[activities[0].class_name] == 999
+        cursor.close()
+    finally:
+        fef_scraper.site_now = original_site_now
+        scraper.connection.close()
+    print("✓ 2 streamed loads stored 11 versions of 10 classes")
+
+
+def test_change_log_failure_not_cached():
+    """A failed change log query is retried instead of cached as 'no changes'"""
+    calls = []
+    results = [None, None, [], []]
+
+    def query_rows(query, params=()):
+        calls.append(query)
+        return results[len(calls) - 1]
+
+    original_cache, original_query_rows = query_activities._cache, query_activities._query_rows
+    with tempfile.TemporaryDirectory() as directory:
+        publish_version(1, directory)
+        query_activities._cache = QueryCache(cache_dir=directory)
+        query_activities._query_rows = query_rows
+        try:
+            since = datetime(2025, 8, 1)
+            assert query_activities.get_change_log(since) == []
+            assert query_activities.get_change_log(since) == []
+            assert query_activities.get_change_log(since) == []
+            # Two queries for the failed load, two for the one that worked and was cached
+            assert len(calls) == 4
+        finally:
+            query_activities._cache, query_activities._query_rows = original_cache, original_query_rows
+    print("✓ Failed change log not cached")
+
+
+if __name__ == "__main__":
+    test_diff_versions()
+    test_compact_versions()
+    test_reload_history()
+    test_stream_history()
+    test_change_log_failure_not_cached()
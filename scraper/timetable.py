@@ -0,0 +1,344 @@
+"""
+Conflict-free combinations of FEF classes
+
+Each class is a Candidate with the weekly sessions parsed from its schedule
+(see schedules.parse_schedule_sessions). Sessions are looked up through an
+IntervalIndex (per weekday, sorted by start), which gives every class the
+set of classes it clashes with and drops classes that hit a busy block,
+e.g. the student's GDE Planejador timetable. Two sessions that only touch
+("18:00 às 19:00" and "19:00 às 20:00") do not clash.
+
+TimetablePlanner then enumerates or counts the sets of classes without
+clashes under a cost budget, category and size limits. Candidates are
+sorted by cost and kept as bits of a Python int, so "compatible with
+everything picked so far and still affordable" is two AND operations, and
+branches that cannot reach the minimum size are pruned.
+
+Counting does not enumerate: the clash graph of the remaining classes is
+split into connected components whose counts multiply, and a component is
+split by branching on its most clashing class (sets without it, and sets
+with it but none of its neighbours). Each component yields a table of
+counts by (size, total cost), memoized by the component's bit mask.
+"""
+
+import bisect
+from decimal import Decimal
+from typing import Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from schedules import Session, parse_schedule_sessions
+
+
+class Candidate(NamedTuple):
+    """A class that can be part of a combination"""
+    id: Hashable
+    category: str
+    class_name: str
+    cost: Decimal
+    sessions: Tuple[Session, ...]
+    schedule: str = ''  # Schedule text the sessions were parsed from
+
+
+class Combination(NamedTuple):
+    """Classes that can be taken together, and their total cost"""
+    classes: Tuple[Candidate, ...]
+    total_cost: Decimal
+
+
+def _cents(cost) -> int:
+    return int((Decimal(str(cost)) * 100).to_integral_value())
+
+
+def parse_busy_blocks(texts: Iterable[str]) -> List[Session]:
+    """
+    Parse busy blocks written like schedules
+
+    Args:
+        texts: e.g. "Seg, Qua - 08:00 às 12:00" or "Ter - 14:00-16:00"
+
+    Returns:
+        Sorted list of sessions
+
+    Raises:
+        ValueError: If a block has no recognizable weekday and time range
+    """
+    blocks = set()
+    for text in texts:
+        sessions = parse_schedule_sessions(text)
+        if not sessions:
+            raise ValueError(f"invalid busy block: {text!r} (expected e.g. 'Seg, Qua - 08:00 às 12:00')")
+        blocks.update(sessions)
+    return sorted(blocks)
+
+
+class IntervalIndex:
+    """Sessions by weekday, sorted by start, for overlap lookups"""
+
+    def __init__(self, intervals: Iterable[Tuple[Hashable, Session]]):
+        """
+        Args:
+            intervals: (key, (weekday, start_minute, end_minute)) pairs
+        """
+        by_day = {}
+        for key, (weekday, start, end) in intervals:
+            by_day.setdefault(weekday, []).append((start, end, key))
+        self._days = {}
+        for weekday, entries in by_day.items():
+            entries.sort(key=lambda entry: (entry[0], entry[1]))
+            self._days[weekday] = ([entry[0] for entry in entries], entries,
+                                   max(end - start for start, end, _ in entries))
+
+    def overlapping(self, weekday: int, start: int, end: int) -> Set[Hashable]:
+        """Keys of the intervals sharing time with [start, end) on ``weekday``"""
+        day = self._days.get(weekday)
+        if day is None:
+            return set()
+        starts, entries, longest = day
+        # Only intervals starting in (start - longest, end) can reach into the range
+        first = bisect.bisect_right(starts, start - longest)
+        last = bisect.bisect_left(starts, end)
+        return {key for entry_start, entry_end, key in entries[first:last] if entry_end > start}
+
+
+def conflicts(candidates: Sequence[Candidate]) -> Dict[Hashable, Set[Hashable]]:
+    """IDs of the candidates each candidate clashes with"""
+    index = IntervalIndex((candidate.id, session) for candidate in candidates
+                          for session in candidate.sessions)
+    clashes = {}
+    for candidate in candidates:
+        found = set()
+        for session in candidate.sessions:
+            found |= index.overlapping(*session)
+        found.discard(candidate.id)
+        clashes[candidate.id] = found
+    return clashes
+
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count('1')
+
+
+class TimetablePlanner:
+    """Enumerates and counts clash-free sets of classes"""
+
+    def __init__(self, candidates: Iterable[Candidate], max_cost=None, categories: Iterable[str] = None,
+                 busy: Iterable[Session] = (), required: Iterable[Hashable] = (), min_size: int = 1,
+                 max_size: int = None):
+        """
+        Args:
+            candidates: Classes to combine; classes without sessions are left out,
+                        since their times are unknown
+            max_cost: Budget for the total cost (default: unlimited)
+            categories: Only classes of these categories (default: all)
+            busy: Sessions the student is not available at
+            required: IDs of classes every combination must contain
+            min_size: Fewest classes in a combination (required ones included)
+            max_size: Most classes in a combination (default: unlimited)
+        """
+        by_id = {candidate.id: candidate for candidate in candidates}
+        self.required = tuple(by_id[class_id] for class_id in dict.fromkeys(required) if class_id in by_id)
+        self.min_size = max(0, min_size)
+        self.max_size = max_size
+        self.feasible = len(self.required) == len(set(required))
+
+        # Required classes must fit together and take their time, budget and size up front
+        busy = list(busy)
+        required_ids = {candidate.id for candidate in self.required}
+        if self.required:
+            clashes = conflicts(self.required)
+            busy_index = IntervalIndex(('busy', session) for session in busy)
+            self.feasible &= not any(clashes[class_id] for class_id in required_ids)
+            self.feasible &= not any(busy_index.overlapping(*session)
+                                     for candidate in self.required for session in candidate.sessions)
+            busy += [session for candidate in self.required for session in candidate.sessions]
+        budget = _cents(max_cost) if max_cost is not None else None
+        if budget is not None:
+            budget -= sum(_cents(candidate.cost) for candidate in self.required)
+        if max_size is not None:
+            self.feasible &= len(self.required) <= max_size
+        self.feasible &= budget is None or budget >= 0
+        self._budget = budget
+
+        wanted = set(categories) if categories else None
+        busy_index = IntervalIndex(('busy', session) for session in busy)
+        pool = [candidate for candidate in by_id.values()
+                if candidate.id not in required_ids
+                and candidate.sessions
+                and (wanted is None or candidate.category in wanted)
+                and (budget is None or _cents(candidate.cost) <= budget)
+                and not any(busy_index.overlapping(*session) for session in candidate.sessions)]
+
+        # Bit i is the i-th cheapest candidate
+        pool.sort(key=lambda candidate: (_cents(candidate.cost), str(candidate.id)))
+        self.candidates = pool
+        self._costs = [_cents(candidate.cost) for candidate in pool]
+        position = {candidate.id: i for i, candidate in enumerate(pool)}
+
+        # neighbours[i]: candidates that cannot be taken together with candidate i;
+        # compatible[i]: later candidates that can
+        clashes = conflicts(pool)
+        everything = (1 << len(pool)) - 1
+        self._neighbours = []
+        self._compatible = []
+        for i, candidate in enumerate(pool):
+            mask = 0
+            for class_id in clashes[candidate.id]:
+                mask |= 1 << position[class_id]
+            self._neighbours.append(mask)
+            self._compatible.append(everything & ~mask & ~((1 << (i + 1)) - 1))
+        self._all = everything
+        self._need, self._room = self._slots()
+        # Without a size limit, sizes at or above this are counted together
+        self._fold_size = max(self._need, 1)
+        self._memo = {}
+
+    def _affordable(self, budget: Optional[int]) -> int:
+        """Candidates costing at most ``budget`` (a prefix of the bits)"""
+        if budget is None:
+            return self._all
+        return (1 << bisect.bisect_right(self._costs, budget)) - 1
+
+    def _slots(self) -> Tuple[int, Optional[int]]:
+        """Fewest and most classes to pick beyond the required ones"""
+        picked = len(self.required)
+        return max(0, self.min_size - picked), None if self.max_size is None else self.max_size - picked
+
+    def combinations(self, limit: int = None) -> Iterator[Combination]:
+        """
+        Enumerate the clash-free combinations
+
+        Combinations come in depth-first order: each one is followed by
+        its extensions with more expensive classes.
+
+        Args:
+            limit: Stop after this many combinations
+
+        Yields:
+            Combination with the required classes first
+        """
+        if not self.feasible:
+            return
+        need, room = self._need, self._room
+        required_cost = sum(Decimal(str(candidate.cost)) for candidate in self.required)
+        produced = 0
+        # Depth-first, with an explicit stack of (picked, compatible candidates, budget)
+        stack = [((), self._all, self._budget)]
+        while stack:
+            picked, mask, budget = stack.pop()
+            if len(picked) >= need and (picked or self.required):
+                classes = self.required + tuple(self.candidates[i] for i in picked)
+                yield Combination(classes, required_cost + sum(Decimal(str(self.candidates[i].cost))
+                                                               for i in picked))
+                produced += 1
+                if limit is not None and produced >= limit:
+                    return
+            if room is not None and len(picked) >= room:
+                continue
+            allowed = mask & self._affordable(budget)
+            if len(picked) + _popcount(allowed) < need:
+                continue
+            branches = []
+            while allowed:
+                low = allowed & -allowed
+                i = low.bit_length() - 1
+                branches.append((picked + (i,), mask & self._compatible[i],
+                                 None if budget is None else budget - self._costs[i]))
+                allowed ^= low
+            stack.extend(reversed(branches))
+
+    def _component(self, mask: int) -> int:
+        """Connected component of the lowest candidate in ``mask``"""
+        component = frontier = mask & -mask
+        while frontier:
+            reached = 0
+            while frontier:
+                low = frontier & -frontier
+                reached |= self._neighbours[low.bit_length() - 1]
+                frontier ^= low
+            frontier = reached & mask & ~component
+            component |= frontier
+        return component
+
+    def _most_clashing(self, mask: int, within: int) -> int:
+        """Candidate of ``mask`` with the most clashes inside ``within``"""
+        best, best_degree = None, -1
+        while mask:
+            low = mask & -mask
+            i = low.bit_length() - 1
+            degree = _popcount(self._neighbours[i] & within)
+            if degree > best_degree:
+                best, best_degree = i, degree
+            mask ^= low
+        return best
+
+    def _clique(self, mask: int) -> int:
+        """Greedy maximal clique of ``mask``, grown from its most clashing candidate"""
+        i = self._most_clashing(mask, mask)
+        clique, common = 1 << i, self._neighbours[i] & mask
+        while common:
+            i = self._most_clashing(common, mask)
+            clique |= 1 << i
+            common &= self._neighbours[i]
+        return clique
+
+    def _key(self, size: int, cost: int) -> Optional[Tuple[int, int]]:
+        """
+        Table key of a set, or None if it exceeds the size limit or budget
+
+        Without a size limit, sizes at or above the minimum are folded
+        together; without a budget, costs are not tracked.
+        """
+        if self._room is not None:
+            if size > self._room:
+                return None
+        else:
+            size = min(size, self._fold_size)
+        if self._budget is None:
+            return size, 0
+        return (size, cost) if cost <= self._budget else None
+
+    def _product(self, first: Dict, second: Dict, size: int = 0, cost: int = 0) -> Dict:
+        """Counts of the unions of a set from each table, shifted by (size, cost)"""
+        table = {}
+        for (first_size, first_cost), first_count in first.items():
+            for (second_size, second_cost), second_count in second.items():
+                key = self._key(first_size + second_size + size, first_cost + second_cost + cost)
+                if key is not None:
+                    table[key] = table.get(key, 0) + first_count * second_count
+        return table
+
+    def _count_table(self, mask: int) -> Dict[Tuple[int, int], int]:
+        """Clash-free subsets of ``mask`` (the empty one included), counted by table key"""
+        if not mask:
+            return {(0, 0): 1}
+        table = self._memo.get(mask)
+        if table is not None:
+            return table
+
+        component = self._component(mask)
+        if component != mask:
+            table = self._product(self._count_table(component), self._count_table(mask & ~component))
+        else:
+            # A set holds at most one class of a clique: branch on a clique
+            # around the most clashing candidate (none of it, or each member)
+            clique = self._clique(mask)
+            rest = mask & ~clique
+            table = dict(self._count_table(rest))
+            while clique:
+                low = clique & -clique
+                i = low.bit_length() - 1
+                with_i = self._product({(0, 0): 1}, self._count_table(rest & ~self._neighbours[i]),
+                                       1, self._costs[i])
+                for key, count in with_i.items():
+                    table[key] = table.get(key, 0) + count
+                clique ^= low
+        self._memo[mask] = table
+        return table
+
+    def count(self) -> int:
+        """Number of clash-free combinations (as combinations() would yield them)"""
+        if not self.feasible:
+            return 0
+        table = self._count_table(self._all)
+        # The empty set is only a combination when there are required classes
+        least = self._need if self.required else max(self._need, 1)
+        return sum(count for (size, _), count in table.items() if size >= least)
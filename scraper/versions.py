@@ -0,0 +1,106 @@
+"""
+Slowly-changing history of activities
+
+activity_versions keeps one row per version of an activity, valid from
+valid_from (inclusive) to valid_to (exclusive). The current version of an
+activity ends at OPEN_VERSION_END instead of NULL, so "as of" lookups are a
+plain range condition on the (valid_to, valid_from) index. The scraper only
+writes a new version when a value of the activity actually changed, so
+the table grows with changes rather than with the number of runs.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+# valid_to of current versions
+OPEN_VERSION_END = datetime(9999, 12, 31, 23, 59, 59)
+
+# Columns shown by history queries and compared in change logs
+HISTORY_FIELDS = ('category', 'class_name', 'schedule', 'cost', 'enrollment_deadline',
+                  'vacancies', 'location', 'instructor')
+
+# Stored version: (id, activity_key, valid_from, valid_to, values)
+VersionRow = Tuple[int, str, datetime, datetime, tuple]
+
+
+def diff_versions(current: Dict[str, tuple], incoming: Dict[str, tuple],
+                  delete_missing: bool = True) -> Tuple[List[str], List[str]]:
+    """
+    Find the activities whose current version has to change
+
+    Args:
+        current: Values of the open versions by activity_key
+        incoming: Freshly scraped values by activity_key
+        delete_missing: Whether activities missing from ``incoming`` end
+
+    Returns:
+        Tuple (changed, removed): keys that need a new version (new or
+        changed values) and keys whose version ends without a successor
+    """
+    changed = [key for key, values in incoming.items() if current.get(key) != values]
+    removed = [key for key in current if key not in incoming] if delete_missing else []
+    return changed, removed
+
+
+def compact_versions(rows: Iterable[VersionRow]) -> Tuple[List[Tuple[int, datetime]], List[int]]:
+    """
+    Plan the merge of redundant versions
+
+    Zero-length versions (valid_from == valid_to) are dropped, and a version
+    that continues its predecessor (same values, starting where it ends) is
+    folded into it.
+
+    Args:
+        rows: Versions ordered by activity_key and valid_from
+
+    Returns:
+        Tuple (extend, delete): (id, new valid_to) of versions to lengthen
+        and IDs of versions to delete
+    """
+    extend = {}
+    delete = []
+    previous = None
+    for row in rows:
+        row_id, key, valid_from, valid_to, values = row
+        if valid_from == valid_to:
+            delete.append(row_id)
+            continue
+        if previous is not None and previous[1] == key and previous[3] == valid_from \
+                and previous[4] == values:
+            delete.append(row_id)
+            previous = (previous[0], key, previous[2], valid_to, values)
+            extend[previous[0]] = valid_to
+            continue
+        previous = row
+    return list(extend.items()), delete
+
+
+def changed_fields(fields: Tuple[str, ...], old: tuple, new: tuple) -> List[str]:
+    """Names of the fields whose values differ between two versions"""
+    return [field for field, before, after in zip(fields, old, new) if before != after]
+
+
+def replay_snapshots(snapshots: Iterable[Tuple[datetime, Dict[str, tuple]]]) -> List[Tuple[str, tuple, datetime, datetime]]:
+    """
+    Build the version history of a registration list from successive snapshots
+
+    Args:
+        snapshots: (time, values by activity_key) of each scraped page, oldest first
+
+    Returns:
+        List of (activity_key, values, valid_from, valid_to); versions still
+        current after the last snapshot end at OPEN_VERSION_END
+    """
+    current = {}
+    started = {}
+    history = []
+    for at, snapshot in snapshots:
+        changed, removed = diff_versions(current, snapshot)
+        for key in changed + removed:
+            if key in current:
+                history.append((key, current.pop(key), started.pop(key), at))
+        for key in changed:
+            current[key] = snapshot[key]
+            started[key] = at
+    history.extend((key, values, started[key], OPEN_VERSION_END) for key, values in current.items())
+    return history